@@ -1,8 +1,15 @@
 import logging
-from flask import Flask, render_template, send_from_directory
-from flask_socketio import SocketIO, emit
+import secrets
+import threading
+import time
+from pathlib import Path
+from flask import Flask, Response, abort, redirect, request
+from flask_socketio import SocketIO, emit, join_room, leave_room
 
-from src.game import Game
+from src.lockstep import PROTOCOL_VERSION, LockstepHost
+from src.room_commands import REJECTED, BroadcastLimiter, CommandQueue
+from src.static_assets import REVALIDATE, AssetManifest, catalog_file
+from src.wire import DEFLATE_THRESHOLD, WireCatalog, WireChannel, negotiate
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -12,58 +19,209 @@ app = Flask(__name__, template_folder='tianji-fix-data-and')
 app.config['SECRET_KEY'] = 'a_very_secret_key_for_tianji_bian!'
 socketio = SocketIO(app)
 
+PLAYER_NAMES = ["玩家一", "玩家二"]
+ASSETS_PATH = "tianji-fix-data-and/assets"
+
+# Clients receive either the full state after every change, or (after a successful
+# 'lockstep_join') only the decisions and a checksum per round; see src/lockstep.py.
+STATE_ROOM = 'state'
+LOCKSTEP_ROOM = 'lockstep'
+state_clients = set()
+# Clients that negotiated a wire format (see src/wire.py) get 'game_state_frame' messages
+# instead of 'game_state_update', from one channel per (format, deflate) in the room 'wire:<format>:<deflate>'
+wire_channels = {}
+
 # --- Game Instance ---
 # In a real-world scenario, you'd manage game instances for different rooms/sessions.
 # For this prototype, we'll use a single global game instance.
-game = Game(player_names=["玩家一", "玩家二"], assets_path_str="tianji-fix-data-and/assets")
+def new_host() -> LockstepHost:
+    return LockstepHost(PLAYER_NAMES, ASSETS_PATH, seed=secrets.randbits(32))
+
+host = new_host()
+game = host.game
+catalog = WireCatalog.for_game(game)
+
+# --- Static Content ---
+# Images and pages get content-hashed URLs, served as immutable; see src/static_assets.py.
+# The catalog is versioned by the asset-bundle hash, so it only changes with the cards.
+images = AssetManifest(Path(ASSETS_PATH) / "images", "/assets")
+pages = AssetManifest(Path(app.root_path) / app.template_folder, "/static", paths=["game.html"])
+catalog_document = catalog_file(catalog, images)
+CATALOG_URL = f"/catalog/{catalog.version}.json"
+
+def send_static(static, cache_control=None):
+    """A response for a StaticFile, honoring If-None-Match and Accept-Encoding."""
+    status, headers, body = static.response(request.headers.get('If-None-Match'),
+                                            request.headers.get('Accept-Encoding'), cache_control)
+    return Response(body, status=status, headers=headers)
+# (game, state_version) of the last broadcast, used to skip sending an unchanged state
+last_broadcast = (None, None)
+# The game room's command queue and state-push rate limit
+commands = CommandQueue()
+push_limiter = BroadcastLimiter()
+state_lock = threading.RLock()
 
 @app.route('/')
 def index():
     """Serve the main game page."""
     logging.info("Serving game.html")
-    # render_template will look in the 'templates' folder, which we've set to 'tianji-fix-data-and'
-    return render_template('game.html')
+    # The entry point keeps its URL, so clients revalidate it instead of caching it for good
+    return send_static(pages.file_for('game.html'), cache_control=REVALIDATE)
+
+@app.route('/static/<path:name>')
+def static_page(name):
+    static = pages.get(name)
+    if static is None:
+        abort(404)
+    return send_static(static)
+
+@app.route('/assets/<path:name>')
+def asset(name):
+    static = images.get(name)
+    if static is None:
+        abort(404)
+    return send_static(static)
+
+@app.route('/catalog')
+def current_catalog():
+    """Points clients at the catalog of the current asset bundle."""
+    response = redirect(CATALOG_URL)
+    response.headers['Cache-Control'] = REVALIDATE
+    return response
+
+@app.route('/catalog/<version>.json')
+def catalog_version(version):
+    """The static cards, zones, gates, phases and image URLs that id-only state updates refer to."""
+    if version != catalog.version:
+        abort(404)
+    return send_static(catalog_document)
 
 @socketio.on('connect')
 def handle_connect():
     """Handle a new client connection."""
     logging.info('Client connected')
+    join_room(STATE_ROOM)
+    state_clients.add(request.sid)
 
 @socketio.on('disconnect')
 def handle_disconnect():
     """Handle a client disconnection."""
     logging.info('Client disconnected')
+    state_clients.discard(request.sid)
+    for channel in wire_channels.values():
+        channel.members.discard(request.sid)
+
+# --- Wire Formats ---
+
+def wire_room(channel: WireChannel) -> str:
+    return f"wire:{channel.format}:{int(channel.deflate)}"
+
+@socketio.on('negotiate_wire')
+def handle_negotiate_wire(data):
+    """Picks the best wire format among those the client offers and moves it to that format's channel."""
+    data = data or {}
+    fmt = negotiate(data.get('formats'))
+    deflate = bool(data.get('deflate'))
+    channel = wire_channels.get((fmt, deflate))
+    if channel is None:
+        channel = wire_channels[(fmt, deflate)] = WireChannel(fmt, catalog, deflate)
+    leave_room(STATE_ROOM)
+    state_clients.discard(request.sid)
+    logging.info(f"Client {request.sid} negotiated wire format '{fmt}' (deflate: {deflate}).")
+    emit('wire_format', {"format": fmt, "deflate": deflate, "threshold": DEFLATE_THRESHOLD,
+                         "catalog_version": catalog.version, "catalog_url": CATALOG_URL})
+    with state_lock:
+        join_room(wire_room(channel))
+        channel.members.add(request.sid)
+        snapshot = channel.snapshot()
+        if snapshot is not None:
+            emit('game_state_frame', snapshot)
+
+# --- Lockstep Sync ---
+
+@socketio.on('lockstep_join')
+def handle_lockstep_join(data):
+    """Moves a client that runs the engine locally to lockstep updates, if its protocol and cards match."""
+    data = data or {}
+    if not host.accepts(data.get('protocol'), data.get('assets')):
+        logging.info(f"Lockstep rejected for {request.sid}: protocol or asset bundle mismatch.")
+        emit('lockstep_rejected', {"protocol": PROTOCOL_VERSION, "assets": host.assets_hash})
+        return
+    leave_room(STATE_ROOM)
+    state_clients.discard(request.sid)
+    logging.info(f"Client {request.sid} joined lockstep sync.")
+    with state_lock:
+        join_room(LOCKSTEP_ROOM)
+        if host.started:
+            # Catch up: the start message and every round's decisions so far
+            emit('lockstep_start', host.start_message)
+            for message in host.history:
+                emit('lockstep_round', message)
+
+@socketio.on('lockstep_desync')
+def handle_lockstep_desync(data):
+    """Sends a full snapshot to a client whose checksum diverged and moves it back to full-state updates."""
+    logging.warning(f"Client {request.sid} desynced at round {(data or {}).get('round')}; sending a snapshot.")
+    with state_lock:
+        leave_room(LOCKSTEP_ROOM)
+        join_room(STATE_ROOM)
+        state_clients.add(request.sid)
+        emit('lockstep_snapshot', host.snapshot())
 
 # --- Game Logic Handlers ---
+# Commands run one at a time from the room's queue, in a background worker; see src/room_commands.py.
+# `state_lock` keeps broadcasts and catch-up messages from seeing a round half-way through.
 
 def broadcast_game_state():
-    """Serializes and broadcasts the current game state to all clients."""
-    state_dict = game.game_state.to_dict()
-    socketio.emit('game_state_update', state_dict)
-    logging.info("Game state update broadcasted to all clients.")
+    """Serializes and broadcasts the current game state to all clients, unless it hasn't changed."""
+    global last_broadcast
+    channels = [channel for channel in wire_channels.values() if channel.members]
+    if not state_clients and not channels:
+        return
+    with state_lock:
+        version = game.game_state.state_version
+        if last_broadcast == (game, version):
+            logging.info(f"Game state unchanged (version {version}), skipping broadcast.")
+            return
+        state_dict = game.game_state.to_dict()
+        if state_clients:
+            socketio.emit('game_state_update', state_dict, to=STATE_ROOM)
+        for channel in channels:
+            socketio.emit('game_state_frame', channel.message(state_dict), to=wire_room(channel))
+        last_broadcast = (game, version)
+    logging.info(f"Game state update (version {version}) broadcasted to all clients.")
 
-@socketio.on('start_game')
-def handle_start_game():
-    """Handles the start game event from a client."""
-    logging.info("Received 'start_game' event.")
-    game.setup()
-    # Start the first round immediately after setup
-    game.run_round(0)
-    broadcast_game_state()
+def push_game_state():
+    """Broadcasts the state now, or at the end of the frame interval if a push went out recently."""
+    delay = push_limiter.request()
+    if delay == 0:
+        broadcast_game_state()
+    elif delay is not None:
+        socketio.start_background_task(push_game_state_later, delay)
 
-@socketio.on('next_round')
-def handle_next_round():
-    """Handles the next round event from a client."""
-    logging.info("Received 'next_round' event.")
-    game.run_round(game.game_state.current_turn)
+def push_game_state_later(delay):
+    socketio.sleep(delay)
+    push_limiter.flushed()
     broadcast_game_state()
 
-@socketio.on('reset_game')
-def handle_reset_game():
-    """Handles the reset game event from a client."""
-    global game
-    logging.info("Received 'reset_game' event. Resetting game state.")
-    game = Game(player_names=["玩家一", "玩家二"], assets_path_str="tianji-fix-data-and/assets")
+def start_game():
+    if host.started:
+        logging.info("Game already started; ignoring 'start_game'.")
+        return
+    socketio.emit('lockstep_start', host.start(), to=LOCKSTEP_ROOM)
+    # Start the first round immediately after setup
+    socketio.emit('lockstep_round', host.run_round(), to=LOCKSTEP_ROOM)
+
+def next_round():
+    socketio.emit('lockstep_round', host.run_round(), to=LOCKSTEP_ROOM)
+
+def reset_game():
+    global host, game
+    host = new_host()
+    game = host.game
+    # The next frame on every channel is a full state of the new game
+    for channel in wire_channels.values():
+        channel.reset()
     # Send empty game state to clear the board
     initial_state = {
         "players": [],
@@ -72,6 +230,56 @@ def handle_reset_game():
     }
     socketio.emit('game_state_update', initial_state)
 
+COMMANDS = {'start_game': start_game, 'next_round': next_round, 'reset_game': reset_game}
+
+def run_commands():
+    """Drains the room's command queue, pushing the state after each command."""
+    while (command := commands.next()) is not None:
+        try:
+            with state_lock:
+                COMMANDS[command.name]()
+        except Exception:
+            logging.exception(f"Command '{command.name}' failed.")
+        finally:
+            requesters = commands.complete()
+        wait_ms = (time.monotonic() - command.submitted) * 1000
+        logging.info(f"Ran '{command.name}' for {len(requesters)} requester(s) in {wait_ms:.1f} ms.")
+        for sid, request_ids in requesters.items():
+            socketio.emit('command_done', {"command": command.name, "request_ids": request_ids}, to=sid)
+        push_game_state()
+
+def submit_command(name, data=None):
+    # Clients may tag a command with a request id, echoed back in its command_done/command_rejected
+    request_id = data.get("request_id") if isinstance(data, dict) else None
+    submission = commands.submit(name, request.sid, request_id)
+    # Commands dropped by a reset will never run; their requesters must not wait for them
+    for dropped, requesters in submission.superseded.items():
+        for sid, request_ids in requesters.items():
+            socketio.emit('command_rejected', {"command": dropped, "reason": "superseded",
+                                               "request_ids": request_ids}, to=sid)
+    if submission.status == REJECTED:
+        logging.warning(f"Command queue full; rejected '{name}' from {request.sid}.")
+        emit('command_rejected', {"command": name, "reason": "queue_full", "request_ids": [request_id]})
+    elif submission.start_worker:
+        socketio.start_background_task(run_commands)
+
+@socketio.on('start_game')
+def handle_start_game(data=None):
+    """Handles the start game event from a client."""
+    logging.info("Received 'start_game' event.")
+    submit_command('start_game', data)
+
+@socketio.on('next_round')
+def handle_next_round(data=None):
+    """Handles the next round event from a client."""
+    logging.info("Received 'next_round' event.")
+    submit_command('next_round', data)
+
+@socketio.on('reset_game')
+def handle_reset_game(data=None):
+    """Handles the reset game event from a client."""
+    logging.info("Received 'reset_game' event. Resetting game state.")
+    submit_command('reset_game', data)
 
 if __name__ == '__main__':
     logging.info("Starting Tianji Bian server...")
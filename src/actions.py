@@ -0,0 +1,138 @@
+# src/actions.py
+
+"""
+Legal action enumeration for bots, clients and server-side validation.
+
+Every decision a player can face is expressed as a list of compact integer
+action codes: the action kind in the high bits and an argument in the low 16
+bits (a card handle, a zone index, an option index or a player index). Codes
+are cheap to generate, compare and send over the wire, and `is_legal` lets a
+server check a client's choice without rerunning any rules.
+
+Placements and moves follow from the phase alone. Duel reveals, CHOICE
+options and targets arise mid-resolution, so the caller describes them with a
+`Decision` carrying the options or candidates on offer.
+"""
+
+from enum import IntEnum
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+from .card import Card
+
+# Forward-declare to avoid circular import
+if False:
+    from .game_state import GameState
+    from .player import Player
+
+_ARG_BITS = 16
+_ARG_MASK = (1 << _ARG_BITS) - 1
+
+
+class ActionKind(IntEnum):
+    PLACE_CARD = 1      # arg: card handle
+    MOVE = 2            # arg: destination zone index
+    DUEL_CARD = 3       # arg: card handle
+    CHOOSE_OPTION = 4   # arg: option index
+    CHOOSE_TARGET = 5   # arg: player index
+
+
+class Decision(NamedTuple):
+    """A pending decision that the phase alone doesn't determine."""
+    kind: ActionKind
+    options: List[Dict[str, Any]] | None = None  # CHOOSE_OPTION: the CHOICE effect's options
+    candidates: List['Player'] | None = None  # CHOOSE_TARGET: the players that may be targeted
+
+
+def encode(kind: ActionKind, arg: int) -> int:
+    return (kind << _ARG_BITS) | arg
+
+
+def decode(code: int) -> Tuple[ActionKind, int]:
+    return ActionKind(code >> _ARG_BITS), code & _ARG_MASK
+
+
+def kind_of(code: int) -> ActionKind:
+    return ActionKind(code >> _ARG_BITS)
+
+
+# --- Enumerators ---
+
+def legal_placements(game_state: 'GameState', player: 'Player') -> List[int]:
+    """Every basic card the player may place face down."""
+    register = game_state.card_registry.register
+    return [encode(ActionKind.PLACE_CARD, register(card)) for card in player.hand.of_type('basic')]
+
+
+def legal_moves(game_state: 'GameState', player: 'Player') -> List[int]:
+    """Every zone the player may move to; none once they have moved this round."""
+    if player.has_moved or player.position is None or player.has_status("CANNOT_MOVE") or player.has_status("IMPRISONED"):
+        return []
+    board = game_state.game_board
+    return [encode(ActionKind.MOVE, board.zone_index(zone_id)) for zone_id in board.get_valid_moves(player.position)]
+
+
+def legal_duel_cards(game_state: 'GameState', player: 'Player') -> List[int]:
+    """Every basic card the player may reveal in a Lun Dao duel."""
+    register = game_state.card_registry.register
+    return [encode(ActionKind.DUEL_CARD, register(card)) for card in player.hand.of_type('basic')]
+
+
+def legal_options(game_state: 'GameState', player: 'Player', options: List[Dict[str, Any]]) -> List[int]:
+    """Every CHOICE option whose cost the player can afford."""
+    legal = []
+    for i, option in enumerate(options):
+        costs = option.get("cost", [])
+        # Dynamic cost values can't be checked up front; they are resolved when paid.
+        if all(not isinstance(c.get("value"), int) or player.can_afford(c.get("resource"), c["value"]) for c in costs):
+            legal.append(encode(ActionKind.CHOOSE_OPTION, i))
+    return legal
+
+
+def legal_targets(game_state: 'GameState', player: 'Player', candidates: List['Player']) -> List[int]:
+    """Every candidate player the source player may target."""
+    seat_of = game_state.seat_of
+    return [encode(ActionKind.CHOOSE_TARGET, seat_of(p)) for p in candidates]
+
+
+def legal_actions(game_state: 'GameState', player: 'Player', decision: Decision | None = None) -> List[int]:
+    """The legal actions for the player's pending decision, or for the current phase if none is given."""
+    if player.is_eliminated:
+        return []
+    if decision is not None:
+        if decision.kind == ActionKind.DUEL_CARD:
+            return legal_duel_cards(game_state, player)
+        if decision.kind == ActionKind.CHOOSE_OPTION:
+            return legal_options(game_state, player, decision.options or [])
+        if decision.kind == ActionKind.CHOOSE_TARGET:
+            return legal_targets(game_state, player, decision.candidates or [])
+        if decision.kind == ActionKind.PLACE_CARD:
+            return legal_placements(game_state, player)
+        return legal_moves(game_state, player)
+    if game_state.current_phase == "PLACEMENT":
+        return legal_placements(game_state, player)
+    if game_state.current_phase == "MOVEMENT":
+        return legal_moves(game_state, player)
+    return []
+
+
+def is_legal(game_state: 'GameState', player: 'Player', code: int, decision: Decision | None = None) -> bool:
+    """Validates a client's action for its pending decision (see `legal_actions`) without running any rules."""
+    return code in legal_actions(game_state, player, decision)
+
+
+# --- Decoders ---
+
+def card_for(game_state: 'GameState', code: int) -> Card:
+    return game_state.card_registry.card(code & _ARG_MASK)
+
+
+def zone_for(game_state: 'GameState', code: int) -> str:
+    return game_state.game_board.zone_id_at(code & _ARG_MASK)
+
+
+def player_for(game_state: 'GameState', code: int) -> 'Player':
+    return game_state.players[code & _ARG_MASK]
+
+
+def index_for(code: int) -> int:
+    return code & _ARG_MASK
@@ -1,8 +1,11 @@
 from dataclasses import dataclass, field
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Tuple
+
+from .game_board import DEPARTMENTS
+from .versioning import Versioned
 
 @dataclass
-class Card:
+class Card(Versioned):
     """Represents a single game card, loaded from its JSON definition."""
     card_id: str
     name: str
@@ -18,6 +21,9 @@ class Card:
     strokes: int | None = None
     usage_limit: Dict[str, Any] | None = None
 
+    # Version of the card that `_department_effects` was resolved for (not a dataclass field)
+    _effects_version = -1
+
     @classmethod
     def from_json(cls, data: Dict[str, Any]) -> 'Card':
         """Creates a Card instance from a JSON data dictionary."""
@@ -35,15 +41,34 @@ class Card:
             usage_limit=data.get("usage_limit")
         )
 
+    @property
+    def department_effects(self) -> Tuple[Dict[str, Any] | None, ...]:
+        """
+        The effect the card resolves with in each department, indexed like
+        `game_board.DEPARTMENTS`: the department's variant effect, else the
+        card's default effect, else None. Resolved once (the loader does it at
+        load time) and again only if the card is modified.
+        """
+        if self._effects_version != self._version:
+            variants = self.core_mechanism.get("variants", {})
+            object.__setattr__(self, '_department_effects', tuple(
+                variants.get(dep, {}).get("effect") or self.effect or None for dep in DEPARTMENTS
+            ))
+            object.__setattr__(self, '_effects_version', self._version)
+        return self._department_effects
+
     def __repr__(self) -> str:
         return f"Card(id='{self.card_id}', name='{self.name}')"
 
     def to_dict(self) -> Dict[str, Any]:
-        """Serializes the Card object to a dictionary."""
-        return {
+        """Serializes the Card object to a dictionary. The result is cached and must not be modified."""
+        cached = self._cached_dict()
+        if cached is not None:
+            return cached
+        return self._store_dict({
             "card_id": self.card_id,
             "name": self.name,
             "card_type": self.card_type,
             "strokes": self.strokes,
             "symbol": self.symbol,
-        }
\ No newline at end of file
+        })
\ No newline at end of file
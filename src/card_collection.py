@@ -0,0 +1,124 @@
+import random
+from typing import Dict, Iterable, Iterator, List
+
+from .card import Card
+from . import zobrist
+
+
+class CardCollection:
+    """
+    An ordered collection of cards indexed by card ID, used for player hands.
+
+    Cards are kept in insertion order, so `pop()` takes the most recently added
+    card like a list would. Each card type also has its own bucket, which supports
+    O(1) removal by swapping with the last element and can be passed straight to
+    `random.choice`. Card IDs are assumed to be unique within a collection.
+    `zhash` is the XOR of the Zobrist keys of the card IDs held.
+    """
+
+    def __init__(self, cards: Iterable[Card] | None = None):
+        self._cards: Dict[str, Card] = {}
+        self._buckets: Dict[str, List[Card]] = {}
+        self._bucket_index: Dict[str, int] = {}
+        self._stroke_views: Dict[str, List[Card]] = {}
+        self.version = 0
+        self.zhash = 0
+        if cards:
+            self.extend(cards)
+
+    def __len__(self) -> int:
+        return len(self._cards)
+
+    def __bool__(self) -> bool:
+        return bool(self._cards)
+
+    def __iter__(self) -> Iterator[Card]:
+        return iter(self._cards.values())
+
+    def __contains__(self, card: Card) -> bool:
+        return self._cards.get(card.card_id) is card
+
+    def __repr__(self) -> str:
+        return f"CardCollection({list(self._cards.values())})"
+
+    def get(self, card_id: str) -> Card | None:
+        return self._cards.get(card_id)
+
+    def append(self, card: Card):
+        if card.card_id in self._cards:
+            self._discard_from_bucket(self._cards.pop(card.card_id))
+        else:
+            self.zhash ^= zobrist.key("card", card.card_id)
+        self._cards[card.card_id] = card
+        self.version += 1
+        bucket = self._buckets.setdefault(card.card_type, [])
+        self._bucket_index[card.card_id] = len(bucket)
+        bucket.append(card)
+        self._stroke_views.pop(card.card_type, None)
+
+    def extend(self, cards: Iterable[Card]):
+        for card in cards:
+            self.append(card)
+
+    def remove(self, card: Card):
+        """Removes a specific card. Raises ValueError if it is not in the collection, like list.remove."""
+        if card not in self:
+            raise ValueError(f"{card} is not in the collection")
+        self.remove_by_id(card.card_id)
+
+    def remove_by_id(self, card_id: str) -> Card | None:
+        """Removes and returns the card with the given ID, or None if it is not present."""
+        card = self._cards.pop(card_id, None)
+        if card is not None:
+            self._discard_from_bucket(card)
+            self.zhash ^= zobrist.key("card", card_id)
+            self.version += 1
+        return card
+
+    def pop(self) -> Card:
+        """Removes and returns the most recently added card."""
+        if not self._cards:
+            raise IndexError("pop from empty CardCollection")
+        _, card = self._cards.popitem()
+        self._discard_from_bucket(card)
+        self.zhash ^= zobrist.key("card", card.card_id)
+        self.version += 1
+        return card
+
+    def clear(self):
+        self._cards.clear()
+        self._buckets.clear()
+        self._bucket_index.clear()
+        self._stroke_views.clear()
+        self.zhash = 0
+        self.version += 1
+
+    def shuffle(self):
+        cards = list(self._cards.values())
+        random.shuffle(cards)
+        self._cards = {card.card_id: card for card in cards}
+        self.version += 1
+
+    def of_type(self, card_type: str) -> List[Card]:
+        """
+        Returns the live bucket of cards with the given type.
+        The list is owned by the collection and must not be modified by callers.
+        """
+        return self._buckets.get(card_type, [])
+
+    def sorted_by_strokes(self, card_type: str) -> List[Card]:
+        """Returns the cards of a type ordered by stroke count (fewest first), cached until the bucket changes."""
+        view = self._stroke_views.get(card_type)
+        if view is None:
+            view = sorted(self.of_type(card_type), key=lambda c: (c.strokes is None, c.strokes or 0))
+            self._stroke_views[card_type] = view
+        return view
+
+    def _discard_from_bucket(self, card: Card):
+        bucket = self._buckets[card.card_type]
+        index = self._bucket_index.pop(card.card_id)
+        last = bucket.pop()
+        if last is not card:
+            bucket[index] = last
+            self._bucket_index[last.card_id] = index
+        self._stroke_views.pop(card.card_type, None)
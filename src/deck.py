@@ -0,0 +1,206 @@
+import random
+from array import array
+from enum import Enum
+from typing import Dict, Iterable, Iterator, List, Set
+
+from .card import Card
+
+
+class DeckType(Enum):
+    """The drawable decks in the game. Values match the deck names used in card data."""
+    BASIC = "basic"
+    FUNCTION = "function"
+    DESTINY = "destiny"
+    CELESTIAL_STEM = "celestial_stem"
+    TERRESTRIAL_BRANCH = "terrestrial_branch"
+
+
+class CardRegistry:
+    """Assigns each card a small integer handle so decks can store cards in typed arrays."""
+
+    def __init__(self):
+        self._cards: List[Card] = []
+        self._handles: Dict[int, int] = {}  # id(card) -> handle
+
+    def __len__(self) -> int:
+        return len(self._cards)
+
+    def register(self, card: Card) -> int:
+        """Returns the handle for a card, registering it on first sight."""
+        handle = self._handles.get(id(card))
+        if handle is None:
+            handle = len(self._cards)
+            self._cards.append(card)
+            self._handles[id(card)] = handle
+        return handle
+
+    def card(self, handle: int) -> Card:
+        return self._cards[handle]
+
+    def __getstate__(self):
+        return self._cards
+
+    def __setstate__(self, cards: List[Card]):
+        # Object ids don't survive pickling, so the reverse index is rebuilt.
+        self._cards = cards
+        self._handles = {id(card): handle for handle, card in enumerate(cards)}
+
+
+class Deck:
+    """
+    A draw pile and its discard pile sharing a single array of card handles.
+
+    The draw pile grows up from the start of the buffer, with the top card at
+    `_top - 1`; the discard pile grows down from the end. Reshuffling copies the
+    discard region down behind the draw pile and shuffles it in place, so the
+    buffer is only reallocated when a card from outside the deck is added.
+
+    `remove_by_id` looks cards up in an index of draw pile positions by card
+    id. It is built on the first removal after a shuffle and then kept in step
+    by draws, appends and removals, so removals between shuffles are O(1).
+    """
+    # Card id -> draw pile positions holding that card; None until needed
+    _positions: Dict[str, Set[int]] | None = None
+
+    def __init__(self, deck_type: DeckType, registry: CardRegistry, cards: Iterable[Card] = ()):
+        self.deck_type = deck_type
+        self.registry = registry
+        handles = [registry.register(card) for card in cards]
+        self._buf = array('H', handles)
+        self._top = len(handles)
+        self._discard_count = 0
+        self.version = 0
+
+    @classmethod
+    def from_handles(cls, deck_type: DeckType, registry: CardRegistry,
+                     draw_handles: Iterable[int], discard_handles: Iterable[int]) -> 'Deck':
+        """Builds a deck directly from card handles (draw pile bottom to top, discard pile oldest first)."""
+        deck = cls(deck_type, registry)
+        draw, discard = list(draw_handles), list(discard_handles)
+        deck._buf = array('H', draw + discard[::-1])
+        deck._top = len(draw)
+        deck._discard_count = len(discard)
+        deck._positions = None
+        return deck
+
+    def __len__(self) -> int:
+        """Returns the number of cards left to draw."""
+        return self._top
+
+    def __bool__(self) -> bool:
+        return self._top > 0
+
+    def __iter__(self) -> Iterator[Card]:
+        """Iterates the draw pile from bottom to top."""
+        card = self.registry.card
+        for i in range(self._top):
+            yield card(self._buf[i])
+
+    def __repr__(self) -> str:
+        return f"Deck({self.deck_type.value}, draw={self._top}, discard={self._discard_count})"
+
+    @property
+    def discard_count(self) -> int:
+        return self._discard_count
+
+    def discard_pile(self) -> List[Card]:
+        """Returns the discarded cards, oldest first."""
+        return [self.registry.card(handle) for handle in self.discard_handles()]
+
+    def draw_handles(self) -> array:
+        """Returns a copy of the draw pile's handles, bottom to top."""
+        return self._buf[:self._top]
+
+    def discard_handles(self) -> List[int]:
+        """Returns the discard pile's handles, oldest first."""
+        end = len(self._buf)
+        return [self._buf[i] for i in range(end - 1, end - 1 - self._discard_count, -1)]
+
+    def draw(self) -> Card:
+        """Removes and returns the top card of the draw pile."""
+        if not self._top:
+            raise IndexError(f"draw from empty {self.deck_type.value} deck")
+        self._top -= 1
+        self.version += 1
+        card = self.registry.card(self._buf[self._top])
+        if self._positions is not None:
+            self._positions[card.card_id].discard(self._top)
+        return card
+
+    pop = draw
+
+    def append(self, card: Card):
+        """Places a card on top of the draw pile."""
+        self._ensure_capacity()
+        self._buf[self._top] = self.registry.register(card)
+        if self._positions is not None:
+            self._positions.setdefault(card.card_id, set()).add(self._top)
+        self._top += 1
+        self.version += 1
+
+    def discard(self, card: Card):
+        """Adds a card to the discard pile."""
+        self._ensure_capacity()
+        self._discard_count += 1
+        self._buf[len(self._buf) - self._discard_count] = self.registry.register(card)
+        self.version += 1
+
+    def remove_by_id(self, card_id: str) -> Card | None:
+        """Removes a card from the draw pile by ID, moving the top card into its slot."""
+        positions = self._index().get(card_id)
+        if not positions:
+            return None
+        # The lowest position, as a scan from the bottom would find
+        i = min(positions)
+        positions.remove(i)
+        card = self.registry.card(self._buf[i])
+        self._top -= 1
+        if i != self._top:
+            moved = self._buf[self._top]
+            self._buf[i] = moved
+            moved_positions = self._positions[self.registry.card(moved).card_id]
+            moved_positions.discard(self._top)
+            moved_positions.add(i)
+        self.version += 1
+        return card
+
+    def _index(self) -> Dict[str, Set[int]]:
+        if self._positions is None:
+            self._positions = {}
+            card = self.registry.card
+            for i in range(self._top):
+                self._positions.setdefault(card(self._buf[i]).card_id, set()).add(i)
+        return self._positions
+
+    def shuffle(self):
+        """Shuffles the draw pile in place."""
+        self._shuffle_range(self._top)
+
+    def reshuffle(self):
+        """Moves the discard pile under the draw pile and shuffles everything, in place."""
+        buf, src = self._buf, len(self._buf) - self._discard_count
+        # Copying forward is safe: the source slot is never below the destination.
+        for i in range(self._discard_count):
+            buf[self._top + i] = buf[src + i]
+        self._top += self._discard_count
+        self._discard_count = 0
+        self._shuffle_range(self._top)
+
+    def _shuffle_range(self, n: int):
+        # Fisher-Yates over buf[0:n]
+        self.version += 1
+        self._positions = None
+        buf, rand = self._buf, random.random
+        for i in range(n - 1, 0, -1):
+            j = int(rand() * (i + 1))
+            buf[i], buf[j] = buf[j], buf[i]
+
+    def _ensure_capacity(self):
+        if self._top + self._discard_count < len(self._buf):
+            return
+        old_len = len(self._buf)
+        self._buf.extend([0] * max(old_len, 8))
+        # Keep the discard region at the end of the grown buffer.
+        new_len = len(self._buf)
+        for i in range(1, self._discard_count + 1):
+            self._buf[new_len - i] = self._buf[old_len - i]
@@ -1,16 +1,41 @@
 import logging
-from typing import Dict, Any, List
+from typing import Callable, Dict, Any, List
+
+from . import actions as act
+from .events import EventKind, cause_index, resource_index
+from .interning import FrozenDict, IdentityCache
+from .lobby import GroupDeltas
 
 # Forward-declare GameState to avoid circular import
 if False:
     from game_state import GameState
     from player import Player
 
+# Leaf actions whose resource changes are recorded as events
+RESOURCE_ACTIONS = {"GAIN_RESOURCE", "LOSE_RESOURCE", "DEAL_DAMAGE", "PAY_COST", "TRANSFER_RESOURCE"}
+
+# Targets whose resource changes can be batched in a large lobby (see lobby.GroupDeltas)
+GROUP_TARGETS = {"ALL_PLAYERS", "OPPONENT_ALL"}
+
+# Priorities of interned (immutable) effects, keyed by identity
+_PRIORITIES = IdentityCache()
+
 class EffectEngine:
     """Parses and executes card effect actions based on a priority queue."""
 
-    def __init__(self, game_state: 'GameState'):
+    def __init__(self, game_state: 'GameState', decide: Callable[['Player', List[int]], int] | None = None):
         self.game_state = game_state
+        # Asks the deciding player's policy to pick one of the legal action codes.
+        # Without one, the first legal action is taken.
+        self.decide = decide or (lambda player, actions: actions[0])
+        # Optional EventRecorder (see events.py)
+        self.recorder = None
+        # Large-lobby mode: group resource changes are accumulated and applied in one pass
+        # (not while recording, which attributes every change to its action), and
+        # same-zone targets come from the zone buckets of the movement phase.
+        self.batch_group_targets = False
+        self.zone_buckets: Dict[str, List['Player']] | None = None
+        self._group_deltas = GroupDeltas()
         self.effect_queue = []
         self.action_handlers = {
             "GAIN_RESOURCE": self._handle_gain_resource,
@@ -50,6 +75,7 @@ class EffectEngine:
         for item in self.effect_queue:
             logging.info(f"Resolving effect for {item['source_player'].name} (Priority: {self._get_effect_priority(item['effect'])})")
             self._execute_resolved_effect(item['effect'], item['source_player'], item['skip_costs'])
+        self._group_deltas.flush(self.game_state.players)
 
         # Clear the queue after resolution
         self.effect_queue = []
@@ -62,6 +88,12 @@ class EffectEngine:
         Tier 2 (Rules-Change-Layer): 2
         Tier 3 (Standard-Layer): 1
         """
+        if isinstance(effect, FrozenDict):
+            return _PRIORITIES.get(effect, self._compute_effect_priority)
+        return self._compute_effect_priority(effect)
+
+    @staticmethod
+    def _compute_effect_priority(effect: Dict[str, Any]) -> int:
         actions = effect.get("actions", [])
         for action_data in actions:
             action_type = action_data.get("action")
@@ -91,6 +123,7 @@ class EffectEngine:
 
         # 2. Pay Costs
         if not skip_costs and "cost" in effect:
+            self._group_deltas.settle(source_player)
             if not self._pay_costs(effect["cost"], source_player):
                 logging.warning(f"{source_player.name} could not pay costs. Effect aborted.")
                 return
@@ -108,6 +141,10 @@ class EffectEngine:
         # 4. Store for future reference (e.g., COPY_EFFECT)
         self.game_state.last_resolved_effect = effect
 
+        if self.recorder is not None:
+            self.recorder.record(self.game_state, EventKind.EFFECT_RESOLVED, player=source_player,
+                                 amount=self._get_effect_priority(effect), detail=len(actions))
+
     def execute_action(self, action_data: Dict[str, Any], source_player: 'Player'):
         """Executes a single action from an effect block using the handler map."""
         action_type = action_data.get("action")
@@ -118,24 +155,43 @@ class EffectEngine:
         logging.debug(f"Executing Action: {action_type} for {source_player.name}")
         if handler == self._handle_unimplemented:
             handler(params, source_player, action_type=action_type)
+        elif self.recorder is not None and action_type in RESOURCE_ACTIONS:
+            before = [(p.gold, p.health, p.yin_yang) for p in self.game_state.players]
+            handler(params, source_player)
+            self._record_resource_changes(before, source_player, action_type)
         else:
             handler(params, source_player)
 
+    def _record_resource_changes(self, before: List[tuple], source_player: 'Player', cause: str):
+        """Records one RESOURCE_CHANGE event per player and resource changed by a single action."""
+        for player, old in zip(self.game_state.players, before):
+            for resource, old_value, new_value in zip(("gold", "health", "yin_yang"), old,
+                                                      (player.gold, player.health, player.yin_yang)):
+                if new_value != old_value:
+                    self.recorder.record(self.game_state, EventKind.RESOURCE_CHANGE, player=player, other=source_player,
+                                         resource=resource_index(resource), amount=new_value - old_value,
+                                         detail=cause_index(cause))
+
     def _get_targets(self, target_str: str, source_player: 'Player') -> List['Player']:
         """Resolves a target string into a list of Player objects."""
         if target_str == "SELF":
             return [source_player]
 
-        opponents = [p for p in self.game_state.players if p != source_player]
-
         if target_str == "OPPONENT_ALL":
-            return opponents
+            return [p for p in self.game_state.players if p != source_player]
 
         if target_str == "OPPONENT_CHOICE_SINGLE":
-            # In a real game, this would prompt the source_player for a choice.
-            # For now, we'll default to the first opponent as a placeholder.
-            logging.info("OPPONENT_CHOICE_SINGLE is not interactive. Defaulting to first opponent.")
-            return [opponents[0]] if opponents else []
+            # A rules variant for large lobbies narrows the choice to the players in the same zone, if there are any
+            local = self.zone_buckets and self.game_state.rules.local_choice_targets
+            opponents = self._get_targets("OTHER_PLAYERS_IN_SAME_ZONE", source_player) if local else []
+            if not opponents:
+                opponents = [p for p in self.game_state.players if p != source_player]
+            if not opponents:
+                return []
+            # The policy may look at anyone's resources
+            self._group_deltas.flush(self.game_state.players)
+            choice = self.decide(source_player, act.legal_targets(self.game_state, source_player, opponents))
+            return [act.player_for(self.game_state, choice)]
 
         if target_str == "ALL_PLAYERS":
             return self.game_state.players
@@ -143,6 +199,8 @@ class EffectEngine:
         if target_str == "OTHER_PLAYERS_IN_SAME_ZONE":
             if source_player.position is None:
                 return []
+            if self.zone_buckets is not None:
+                return [p for p in self.zone_buckets.get(source_player.position, ()) if p != source_player]
             return [
                 p for p in self.game_state.players
                 if p != source_player and p.position == source_player.position
@@ -171,9 +229,25 @@ class EffectEngine:
                 return 0
         return 0 # Default for unexpected types
 
+    def _defer_group_change(self, target_str: str, resource: str, value: Any, source_player: 'Player',
+                            sign: int = 1) -> bool:
+        """
+        In a large lobby, accumulates a resource change aimed at a group target
+        instead of applying it to each player. Returns True if it was deferred.
+        """
+        if not self.batch_group_targets or self.recorder is not None or target_str not in GROUP_TARGETS:
+            return False
+        delta = sign * self._resolve_value(value, source_player)
+        self._group_deltas.add(resource, delta, exclude=source_player if target_str == "OPPONENT_ALL" else None)
+        logging.debug(f"Target: {target_str}, Resource: {resource}, Value: {delta:+} (batched)")
+        return True
+
     # --- Resource Handlers ---
     def _handle_gain_resource(self, params: Dict[str, Any], source_player: 'Player'):
-        targets = self._get_targets(params.get("target", "SELF"), source_player)
+        target_str = params.get("target", "SELF")
+        if self._defer_group_change(target_str, params.get("resource"), params.get("value"), source_player):
+            return
+        targets = self._get_targets(target_str, source_player)
         value = self._resolve_value(params.get("value"), source_player)
         resource = params.get("resource")
 
@@ -182,7 +256,10 @@ class EffectEngine:
             logging.debug(f"Target: {target.name}, Resource: {resource}, Value: +{value}")
 
     def _handle_lose_resource(self, params: Dict[str, Any], source_player: 'Player'):
-        targets = self._get_targets(params.get("target", "SELF"), source_player)
+        target_str = params.get("target", "SELF")
+        if self._defer_group_change(target_str, params.get("resource"), params.get("value"), source_player, sign=-1):
+            return
+        targets = self._get_targets(target_str, source_player)
         value = self._resolve_value(params.get("value"), source_player)
         resource = params.get("resource")
 
@@ -191,7 +268,10 @@ class EffectEngine:
             logging.debug(f"Target: {target.name}, Resource: {resource}, Value: -{value}")
 
     def _handle_deal_damage(self, params: Dict[str, Any], source_player: 'Player'):
-        targets = self._get_targets(params.get("target", "OPPONENT_CHOICE_SINGLE"), source_player)
+        target_str = params.get("target", "OPPONENT_CHOICE_SINGLE")
+        if self._defer_group_change(target_str, "health", params.get("value"), source_player, sign=-1):
+            return
+        targets = self._get_targets(target_str, source_player)
         value = self._resolve_value(params.get("value"), source_player)
 
         for target in targets:
@@ -223,13 +303,22 @@ class EffectEngine:
 
     def _handle_choice(self, params: Dict[str, Any], source_player: 'Player'):
         options = params.get("options", [])
-        if options:
-            logging.info("Player has a choice. For prototype, auto-selecting first valid option.")
-            first_option = options[0]
-            if "effect" in first_option:
-                self._execute_resolved_effect(first_option["effect"], source_player, skip_costs=True)
-        else:
+        if not options:
             logging.warning("CHOICE action has no options.")
+            return
+
+        self._group_deltas.settle(source_player)
+        legal = act.legal_options(self.game_state, source_player, options)
+        if not legal:
+            logging.warning(f"{source_player.name} cannot afford any option of this CHOICE.")
+            return
+
+        option = options[act.index_for(self.decide(source_player, legal))]
+        logging.info(f"{source_player.name} chooses: {option.get('description', 'option')}")
+        if option.get("cost") and not self._pay_costs(option["cost"], source_player):
+            return
+        if "effect" in option:
+            self._execute_resolved_effect(option["effect"], source_player, skip_costs=True)
 
     def _handle_modify_rule(self, params: Dict[str, Any], source_player: 'Player'):
         rule_id = params.get("rule_id")
@@ -274,6 +363,7 @@ class EffectEngine:
         resource = params.get("resource")
         value = self._resolve_value(params.get("value"), source_player)
 
+        self._group_deltas.settle(source_player)
         if not source_player.can_afford(resource, value):
             raise ValueError(f"{source_player.name} cannot afford cost: {value} {resource}")
 
@@ -364,4 +454,8 @@ class EffectEngine:
             value = self._resolve_value(cost_data.get("value"), source_player)
             source_player.change_resource(resource, -value)
             logging.debug(f"Cost Paid: {source_player.name} paid {value} {resource}.")
+            if self.recorder is not None and value:
+                self.recorder.record(self.game_state, EventKind.RESOURCE_CHANGE, player=source_player,
+                                     other=source_player, resource=resource_index(resource), amount=-value,
+                                     detail=cause_index("PAY_COST"))
         return True
\ No newline at end of file
@@ -0,0 +1,82 @@
+# src/event_query.py
+
+"""
+Aggregates recorded events chunk by chunk, so memory stays bounded by the
+chunk size no matter how many games were recorded.
+
+Usage:
+    python -m src.event_query events/ --kind RESOURCE_CHANGE --resource gold --group-by detail
+    python -m src.event_query events/ --kind DUEL --group-by round --value amount
+"""
+
+import argparse
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from .events import CAUSES, EventKind, FIELDS, GATES, PHASES, RESOURCES, iter_chunks, np, resource_index
+
+FIELD_NAMES = [name for name, _, _ in FIELDS]
+
+
+def aggregate(directory: str, group_by: str = "kind", value: str = "amount", kind: EventKind | None = None,
+              resource: str | None = None, prefix: str = "events") -> Dict[int, Tuple[int, int]]:
+    """Returns {group value: (event count, sum of `value`)} over the matching events."""
+    fields = sorted({group_by, value, "kind", "resource"})
+    totals: Dict[int, List[int]] = defaultdict(lambda: [0, 0])
+    resource_id = resource_index(resource) if resource else None
+
+    for chunk in iter_chunks(directory, prefix, fields):
+        if np is not None:
+            mask = np.ones(len(chunk["kind"]), dtype=bool)
+            if kind is not None:
+                mask &= chunk["kind"] == kind
+            if resource_id is not None:
+                mask &= chunk["resource"] == resource_id
+            groups, inverse, counts = np.unique(chunk[group_by][mask], return_inverse=True, return_counts=True)
+            sums = np.bincount(inverse, weights=chunk[value][mask].astype(np.int64), minlength=len(groups))
+            for group, count, total in zip(groups.tolist(), counts.tolist(), sums.tolist()):
+                totals[group][0] += count
+                totals[group][1] += int(total)
+        else:
+            for k, r, g, v in zip(chunk["kind"], chunk["resource"], chunk[group_by], chunk[value]):
+                if (kind is None or k == kind) and (resource_id is None or r == resource_id):
+                    entry = totals[g]
+                    entry[0] += 1
+                    entry[1] += v
+    return {group: (count, total) for group, (count, total) in sorted(totals.items())}
+
+
+def label(field: str, group: int, kind: EventKind | None) -> str:
+    """Human-readable name for an encoded group value."""
+    tables = {"phase": PHASES, "resource": RESOURCES}
+    if field == "kind":
+        return EventKind(group).name
+    if field in tables and 0 <= group < len(tables[field]):
+        return tables[field][group]
+    if field == "detail" and kind == EventKind.RESOURCE_CHANGE and 0 <= group < len(CAUSES):
+        return CAUSES[group]
+    if field == "detail" and kind == EventKind.GATE_TRIGGER and 0 <= group < len(GATES):
+        return GATES[group]
+    return str(group)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate recorded game events.")
+    parser.add_argument('directory')
+    parser.add_argument('--prefix', default='events')
+    parser.add_argument('--kind', choices=[k.name for k in EventKind], default=None)
+    parser.add_argument('--resource', choices=[r for r in RESOURCES if r], default=None)
+    parser.add_argument('--group-by', choices=FIELD_NAMES, default='kind')
+    parser.add_argument('--value', choices=FIELD_NAMES, default='amount')
+    args = parser.parse_args()
+
+    kind = EventKind[args.kind] if args.kind else None
+    result = aggregate(args.directory, args.group_by, args.value, kind, args.resource, args.prefix)
+    print(f"| {args.group_by} | events | sum({args.value}) | mean |")
+    print("| :--- | ---: | ---: | ---: |")
+    for group, (count, total) in result.items():
+        print(f"| {label(args.group_by, group, kind)} | {count} | {total} | {total / count:.2f} |")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+# src/events.py
+
+"""
+A columnar recorder for game events: effects resolved, resource changes
+(including every gold transfer), Lun Dao duels, gate triggers and eliminations.
+
+Events are appended to preallocated typed buffers, one per field, and written
+out in fixed-size chunks as `.npz` files (one `.npy` member per field). The
+buffers are standard-library arrays with the same layout as the matching NumPy
+dtypes, and the `.npy` headers are written directly, so recording needs no
+third-party package while the files still load with `numpy.load`. Readers get
+one chunk at a time (see `iter_chunks`), using NumPy arrays when NumPy is
+installed and plain arrays otherwise.
+
+String-valued fields are stored as indices into the tables below (`PHASES`,
+`CAUSES`, `GATES`, `RESOURCES`).
+"""
+
+import ast
+import io
+import sys
+import zipfile
+from array import array
+from enum import IntEnum
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+from . import qimen as qm
+
+try:
+    import numpy as np
+except ImportError:  # Optional: only speeds up reading
+    np = None
+
+# Forward-declare to avoid circular import
+if False:
+    from .game_state import GameState
+    from .player import Player
+
+
+class EventKind(IntEnum):
+    EFFECT_RESOLVED = 1   # player: source; amount: priority; detail: actions in the effect
+    RESOURCE_CHANGE = 2   # player: changed; other: source; resource; amount: delta; detail: cause index
+    DUEL = 3              # player: challenger; other: defender; amount: gold won; detail: winner seat or -1
+    GATE_TRIGGER = 4      # player; detail: gate index
+    ELIMINATION = 5       # player; amount: health at elimination
+
+
+PHASES = ("SETUP", "TIME", "PLACEMENT", "MOVEMENT", "INTERPRETATION", "RESOLUTION", "UPKEEP")
+RESOURCES = ("", "gold", "health", "yin_yang")
+GATES = tuple(qm.GATE_EFFECTS)
+CAUSES = (
+    "OTHER", "TIAN_REWARD", "DI_PENALTY", "ZHONG_GONG_TAX", "DUEL_STAKE",
+    "GAIN_RESOURCE", "LOSE_RESOURCE", "DEAL_DAMAGE", "PAY_COST", "TRANSFER_RESOURCE", "CHOICE",
+    "COPY_EFFECT", "DRAW_CARD", "DISCARD_CARD", "MOVE", "APPLY_STATUS", "REMOVE_STATUS",
+)
+
+_PHASE_INDEX = {name: i for i, name in enumerate(PHASES)}
+_CAUSE_INDEX = {name: i for i, name in enumerate(CAUSES)}
+_RESOURCE_INDEX = {name: i for i, name in enumerate(RESOURCES)}
+
+# (field, array typecode, numpy dtype). Typecodes are chosen for their fixed sizes on
+# every mainstream platform; `_check_layout` guards the assumption.
+FIELDS: Tuple[Tuple[str, str, str], ...] = (
+    ("game", "I", "<u4"),
+    ("round", "H", "<u2"),
+    ("phase", "B", "|u1"),
+    ("kind", "B", "|u1"),
+    ("player", "h", "<i2"),
+    ("other", "h", "<i2"),
+    ("resource", "B", "|u1"),
+    ("amount", "i", "<i4"),
+    ("detail", "i", "<i4"),
+)
+
+
+def _check_layout():
+    for name, typecode, dtype in FIELDS:
+        if array(typecode).itemsize != int(dtype[2:]):
+            raise RuntimeError(f"Unexpected item size for event field '{name}' on this platform.")
+
+
+def cause_index(cause: str) -> int:
+    return _CAUSE_INDEX.get(cause, 0)
+
+
+def resource_index(resource: str) -> int:
+    return _RESOURCE_INDEX.get(resource, 0)
+
+
+class EventRecorder:
+    """
+    Appends events to per-field buffers and writes a `.npz` chunk whenever
+    `chunk_size` events have accumulated (and on `flush`/`close`).
+
+    Set `game_id` before each game so events from many games can share files.
+    A directory that already holds chunks with the same prefix is refused,
+    since readers would mix the two runs, unless `overwrite` deletes them.
+    """
+
+    def __init__(self, directory: str, prefix: str = "events", chunk_size: int = 1 << 16, overwrite: bool = False):
+        _check_layout()
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        existing = chunk_paths(directory, prefix)
+        if existing and not overwrite:
+            raise FileExistsError(f"{directory} already holds {len(existing)} '{prefix}' chunk(s); "
+                                  f"use another directory or prefix, or pass overwrite=True")
+        for path in existing:
+            path.unlink()
+        self.prefix = prefix
+        self.chunk_size = chunk_size
+        self.game_id = 0
+        self.chunks_written = 0
+        self.events_written = 0
+        self._buffers = {name: array(typecode, bytes(array(typecode).itemsize * chunk_size))
+                         for name, typecode, _ in FIELDS}
+        self._columns = [self._buffers[name] for name, _, _ in FIELDS]
+        self._size = 0
+
+    def __enter__(self) -> 'EventRecorder':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self) -> int:
+        """Events buffered and not yet written."""
+        return self._size
+
+    def record(self, game_state: 'GameState', kind: EventKind, player: 'Player | None' = None,
+               other: 'Player | None' = None, resource: int = 0, amount: int = 0, detail: int = 0):
+        i = self._size
+        values = (self.game_id, game_state.current_turn, _PHASE_INDEX.get(game_state.current_phase, 0), kind,
+                  seat_of(game_state, player), seat_of(game_state, other), resource, amount, detail)
+        for column, value in zip(self._columns, values):
+            column[i] = value
+        self._size = i + 1
+        if self._size == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if not self._size:
+            return
+        path = self.directory / f"{self.prefix}-{self.chunks_written:05d}.npz"
+        columns = {name: (dtype, self._buffers[name][:self._size]) for name, _, dtype in FIELDS}
+        _write_npz(path, columns)
+        self.chunks_written += 1
+        self.events_written += self._size
+        self._size = 0
+
+    def close(self):
+        self.flush()
+
+
+def seat_of(game_state: 'GameState', player: 'Player | None') -> int:
+    if player is None:
+        return -1
+    try:
+        return game_state.seat_of(player)
+    except KeyError:
+        return -1
+
+
+# --- .npz I/O without NumPy ---
+
+def _npy_bytes(dtype: str, values: array) -> bytes:
+    header = repr({"descr": dtype, "fortran_order": False, "shape": (len(values),)}).encode("latin1")
+    # Magic, version 1.0, header padded so the data starts on a 64-byte boundary
+    padding = 64 - (10 + len(header) + 1) % 64
+    header += b" " * padding + b"\n"
+    data = values
+    if sys.byteorder == "big" and values.itemsize > 1:
+        data = array(values.typecode, values)
+        data.byteswap()
+    return b"\x93NUMPY\x01\x00" + len(header).to_bytes(2, "little") + header + data.tobytes()
+
+
+def _write_npz(path: Path, columns: Dict[str, Tuple[str, array]]):
+    temp_path = path.with_suffix(".tmp")
+    with zipfile.ZipFile(temp_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, (dtype, values) in columns.items():
+            zf.writestr(f"{name}.npy", _npy_bytes(dtype, values))
+    temp_path.replace(path)
+
+
+def _read_npy(data: bytes) -> array:
+    header_len = int.from_bytes(data[8:10], "little")
+    header = ast.literal_eval(data[10:10 + header_len].decode("latin1"))
+    typecode = next(t for _, t, d in FIELDS if d == header["descr"])
+    values = array(typecode)
+    values.frombytes(data[10 + header_len:])
+    if sys.byteorder == "big" and values.itemsize > 1:
+        values.byteswap()
+    return values
+
+
+def chunk_paths(directory: str, prefix: str = "events") -> List[Path]:
+    return sorted(Path(directory).glob(f"{prefix}-[0-9][0-9][0-9][0-9][0-9].npz"))
+
+
+def iter_chunks(directory: str, prefix: str = "events", fields: List[str] | None = None) -> Iterator[Dict[str, Any]]:
+    """Yields one chunk at a time as {field: array}, loading only the requested fields."""
+    wanted = fields or [name for name, _, _ in FIELDS]
+    for path in chunk_paths(directory, prefix):
+        if np is not None:
+            with np.load(path) as npz:
+                yield {name: npz[name] for name in wanted}
+        else:
+            with zipfile.ZipFile(path) as zf:
+                yield {name: _read_npy(zf.read(f"{name}.npy")) for name in wanted}
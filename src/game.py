@@ -1,85 +1,184 @@
-import random
 import logging
 import math
+from operator import itemgetter
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Tuple
 
+from .game_board import DEPARTMENTS, UNPLACED_SORT_KEY
 from .game_loader import GameLoader
 from .game_state import GameState
 from .player import Player
 from .card import Card
+from .deck import Deck, DeckType
 from .effect_engine import EffectEngine
+from .events import EventKind, EventRecorder, cause_index, resource_index
+from .policy import DecisionPolicy, PrototypePolicy
+from .rules import RulesConfig
+from . import actions as act
 from . import five_elements as fe
+from . import lobby
 from . import qimen as qm
 
 class Game:
     """Orchestrates the setup and execution of the game."""
 
+    PHASES = ("TIME", "PLACEMENT", "MOVEMENT", "INTERPRETATION", "RESOLUTION", "UPKEEP")
+
     @property
     def active_players(self) -> List[Player]:
-        """Returns a list of players who are not eliminated."""
-        return [p for p in self.game_state.players if not p.is_eliminated]
-
-    def __init__(self, player_names: List[str], assets_path_str: str):
-        self.game_state = GameState()
+        """
+        The players who are not eliminated, in seat order. This is a live list
+        that is replaced, never modified, when a player is eliminated, so phases
+        can iterate it while eliminations happen. Callers must not modify it.
+        """
+        players = self.game_state.players
+        if self._active_source is not players or self._active_seats != len(players):
+            self._sync_active_players()
+        return self._active
+
+    def __init__(self, player_names: List[str], assets_path_str: str | None, policy: DecisionPolicy | None = None,
+                 rules: RulesConfig | None = None, large_lobby: bool = False):
+        self.game_state = GameState(rules=rules or RulesConfig())
+        # Large-lobby execution mode, for games with hundreds of players (see lobby.py)
+        self.large_lobby = large_lobby
         self.player_names = player_names
-        self.loader = GameLoader(Path(assets_path_str))
-        self.effect_engine = EffectEngine(self.game_state)
+        # Games built around an existing state (see `from_state`) never load assets
+        self.loader = GameLoader(Path(assets_path_str)) if assets_path_str is not None else None
+        # Decision policy used for every player without their own entry in `policies`
+        self.default_policy = policy or PrototypePolicy()
+        self.policies: Dict[str, DecisionPolicy] = {}
+        self.effect_engine = EffectEngine(self.game_state, decide=self.decide)
+        self.effect_engine.batch_group_targets = large_lobby
+        self.recorder: EventRecorder | None = None
+        # (seat, action code) of every decision made, in order, while set to a list (see lockstep.py)
+        self.decision_log: List[Tuple[int, int]] | None = None
+        # Live active-player list and the players whose health crossed zero since the last
+        # elimination check; see `active_players` and `_apply_eliminations`.
+        self._active: List[Player] = []
+        self._active_source: List[Player] | None = None
+        self._active_seats = 0
+        self._depleted: List[Player] = []
+
+    @classmethod
+    def from_state(cls, game_state: GameState, policy: DecisionPolicy | None = None) -> 'Game':
+        """Creates a game that plays on an existing state, e.g., a simulation branch."""
+        game = cls([p.name for p in game_state.players], None, policy=policy)
+        game.use_state(game_state)
+        return game
+
+    def set_recorder(self, recorder: EventRecorder | None):
+        """Sends the events of this game (and its effect engine) to a recorder, or stops recording with None."""
+        self.recorder = recorder
+        self.effect_engine.recorder = recorder
+
+    def _record(self, kind: EventKind, **fields):
+        if self.recorder is not None:
+            self.recorder.record(self.game_state, kind, **fields)
+
+    def _record_gold(self, player: Player, amount: int, cause: str, source: Player | None = None):
+        if self.recorder is not None and amount:
+            self.recorder.record(self.game_state, EventKind.RESOURCE_CHANGE, player=player, other=source,
+                                 resource=resource_index("gold"), amount=amount, detail=cause_index(cause))
+
+    def set_policy(self, player_id: str, policy: DecisionPolicy):
+        """Assigns a decision policy to a single player."""
+        self.policies[player_id] = policy
+
+    def decide(self, player: Player, actions: List[int]) -> int:
+        """Asks the player's policy to pick one of the legal action codes."""
+        policy = self.policies.get(player.player_id, self.default_policy)
+        choice = policy.choose(self.game_state, player, actions)
+        if choice not in actions:
+            logging.warning(f"Policy for {player.name} returned illegal action {choice}. Using {actions[0]} instead.")
+            choice = actions[0]
+        if self.decision_log is not None:
+            self.decision_log.append((self.game_state.seat_of(player), choice))
+        return choice
+
+    @property
+    def rules(self) -> RulesConfig:
+        return self.game_state.rules
+
+    def use_state(self, game_state: GameState):
+        """Points the game and its effect engine at a different GameState (e.g., a thawed branch)."""
+        self.game_state = game_state
+        self.effect_engine.game_state = game_state
+        self.effect_engine.zone_buckets = None
 
     def setup(self, test_cards: List[str] = None):
         """Initializes the game state, with an option to inject specific test cards."""
         logging.info("--- Setting up a new game of Tianji Bian ---")
 
         all_decks = self.loader.load_all_cards()
-        self.game_state.basic_deck = all_decks.get("basic", [])
-        self.game_state.celestial_stem_deck = all_decks.get("celestial_stem", [])
-        self.game_state.terrestrial_branch_deck = all_decks.get("terrestrial_branch", [])
-
-        random.shuffle(self.game_state.basic_deck)
-        random.shuffle(self.game_state.celestial_stem_deck)
-        random.shuffle(self.game_state.terrestrial_branch_deck)
+        for deck_type in (DeckType.BASIC, DeckType.CELESTIAL_STEM, DeckType.TERRESTRIAL_BRANCH):
+            cards = all_decks.get(deck_type.value, [])
+            if self.large_lobby and deck_type == DeckType.BASIC:
+                cards = cards * lobby.deck_copies(len(self.player_names), self.rules.hand_size, len(cards))
+            deck = Deck(deck_type, self.game_state.card_registry, cards)
+            deck.shuffle()
+            self.game_state.decks[deck_type] = deck
 
         for i, name in enumerate(self.player_names):
-            self.game_state.players.append(Player(player_id=str(i + 1), name=name))
+            self.game_state.players.append(Player(player_id=str(i + 1), name=name,
+                                                  health=self.rules.starting_health, gold=self.rules.starting_gold))
 
         # Set up the game fund based on player count
-        self.game_state.game_fund = len(self.game_state.players) * 100
+        self.game_state.game_fund = len(self.game_state.players) * self.rules.fund_per_player
         logging.info(f"Game fund initialized to: {self.game_state.game_fund}")
 
         # Set initial Qi Men gate layout
         self._update_qimen_gates()
 
-        # Manually set player positions for specific testing
-        ren_zones = [zone.zone_id for zone in self.game_state.game_board.zones.values() if zone.department == 'ren']
-        tian_zones = [zone.zone_id for zone in self.game_state.game_board.zones.values() if zone.department == 'tian']
+        if self.large_lobby:
+            starts = lobby.starting_zones(self.game_state.game_board, len(self.game_state.players))
+            for player, zone_id in zip(self.game_state.players, starts):
+                player.position = zone_id
+        else:
+            # Manually set player positions for specific testing
+            ren_zones = [zone.zone_id for zone in self.game_state.game_board.zones.values() if zone.department == 'ren']
+            tian_zones = [zone.zone_id for zone in self.game_state.game_board.zones.values() if zone.department == 'tian']
 
-        if ren_zones:
-            self.game_state.players[0].position = ren_zones[0]
-        if tian_zones and len(self.game_state.players) > 1:
-            self.game_state.players[1].position = tian_zones[0]
-        if ren_zones and len(self.game_state.players) > 2:
-             self.game_state.players[2].position = ren_zones[1]
+            if ren_zones:
+                self.game_state.players[0].position = ren_zones[0]
+            if tian_zones and len(self.game_state.players) > 1:
+                self.game_state.players[1].position = tian_zones[0]
+            if ren_zones and len(self.game_state.players) > 2:
+                 self.game_state.players[2].position = ren_zones[1]
 
 
         if test_cards:
             for i, player in enumerate(self.game_state.players):
                 if i < len(test_cards):
                     card_id_to_find = test_cards[i]
-                    test_card = next((c for c in self.game_state.basic_deck if c.card_id == card_id_to_find), None)
+                    test_card = self.game_state.basic_deck.remove_by_id(card_id_to_find)
                     if test_card:
                         player.add_card_to_hand(test_card)
-                        self.game_state.basic_deck.remove(test_card)
 
         for player in self.game_state.players:
-            while len(player.hand) < 7:
-                self._reshuffle_if_needed('basic')
-                if not self.game_state.basic_deck:
-                    logging.warning(f"Cannot draw more cards for {player.name}, deck is empty.")
-                    break
-                player.add_card_to_hand(self.game_state.basic_deck.pop())
+            self._deal_hand(player)
 
         logging.info("Game setup complete.")
 
+    def _deal_hand(self, player: Player):
+        """Draws basic cards until the player holds a full hand."""
+        deck = self.game_state.basic_deck
+        duplicates = 0
+        while len(player.hand) < self.rules.hand_size:
+            self._reshuffle_if_needed(DeckType.BASIC)
+            if not deck:
+                logging.warning(f"Cannot draw more cards for {player.name}, deck is empty.")
+                break
+            card = deck.draw()
+            if player.hand.get(card.card_id) is not None:
+                # Only a large lobby deals from several copies of the deck; a hand holds one of each card
+                deck.discard(card)
+                duplicates += 1
+                if duplicates > len(self.game_state.card_registry):
+                    logging.warning(f"Cannot draw more distinct cards for {player.name}.")
+                    break
+                continue
+            player.add_card_to_hand(card)
+
     def run_game(self, num_rounds: int = 1):
         """Runs the main game loop for a specified number of rounds."""
         logging.info(f"--- Starting Game Run ({num_rounds} round(s)) ---")
@@ -101,12 +200,20 @@ class Game:
         self.game_state.current_turn = round_number
         logging.info(f"***** Round {self.game_state.current_turn} *****")
 
-        self._execute_time_phase()
-        self._execute_placement_phase()
-        self._execute_movement_phase()
-        self._execute_interpretation_phase()
-        self._execute_resolution_phase()
-        self._execute_upkeep_phase()
+        for phase in self.PHASES:
+            self._run_phase(phase)
+
+    def resume_round(self, phase: str):
+        """
+        Finishes the current round starting from `phase`. Players who already
+        placed or moved this round are skipped, so a round interrupted at a
+        decision point can be picked up again on a copy of its state.
+        """
+        for name in self.PHASES[self.PHASES.index(phase):]:
+            self._run_phase(name)
+
+    def _run_phase(self, phase: str):
+        getattr(self, f"_execute_{phase.lower()}_phase")()
 
     def _execute_time_phase(self):
         self.game_state.set_phase("TIME")
@@ -119,21 +226,21 @@ class Game:
         # 1. Discard previous Gan-Zhi cards
         if self.game_state.current_celestial_stem:
             logging.info(f"弃置天干牌: {self.game_state.current_celestial_stem.name}")
-            self.game_state.celestial_stem_discard_pile.append(self.game_state.current_celestial_stem)
+            self.game_state.celestial_stem_deck.discard(self.game_state.current_celestial_stem)
         if self.game_state.current_terrestrial_branch:
             logging.info(f"弃置地支牌: {self.game_state.current_terrestrial_branch.name}")
-            self.game_state.terrestrial_branch_discard_pile.append(self.game_state.current_terrestrial_branch)
+            self.game_state.terrestrial_branch_deck.discard(self.game_state.current_terrestrial_branch)
 
         # 2. Draw new stem and branch cards, reshuffling if necessary
-        self._reshuffle_if_needed('celestial_stem')
-        self._reshuffle_if_needed('terrestrial_branch')
+        self._reshuffle_if_needed(DeckType.CELESTIAL_STEM)
+        self._reshuffle_if_needed(DeckType.TERRESTRIAL_BRANCH)
 
         if not self.game_state.celestial_stem_deck or not self.game_state.terrestrial_branch_deck:
             logging.error("Celestial Stem or Terrestrial Branch deck (and discard) is empty. Cannot proceed.")
             return # This is a critical failure, game cannot continue
 
-        self.game_state.current_celestial_stem = self.game_state.celestial_stem_deck.pop()
-        self.game_state.current_terrestrial_branch = self.game_state.terrestrial_branch_deck.pop()
+        self.game_state.current_celestial_stem = self.game_state.celestial_stem_deck.draw()
+        self.game_state.current_terrestrial_branch = self.game_state.terrestrial_branch_deck.draw()
         logging.info(f"新干支牌: {self.game_state.current_celestial_stem.name}, {self.game_state.current_terrestrial_branch.name}")
 
         # 3. Determine beneficial and harmful elements
@@ -146,6 +253,7 @@ class Game:
 
         # 4. Update all zones on the board
         zone_updates = []
+        rules = self.rules
         for zone in self.game_state.game_board.zones.values():
             # Reset previous values
             zone.gold_reward = 0
@@ -156,19 +264,19 @@ class Game:
 
             if zone.department == 'tian':
                 if is_beneficial:
-                    zone.gold_reward += 5
-                    zone_updates.append(f"{zone.zone_id}(天部): +5金币")
+                    zone.gold_reward += rules.tian_beneficial_reward
+                    zone_updates.append(f"{zone.zone_id}(天部): +{rules.tian_beneficial_reward}金币")
                 if is_harmful: # Stagnation rule overrides reward
                     zone.gold_reward = 0
                     zone_updates.append(f"{zone.zone_id}(天部): 停滞无奖励")
 
             elif zone.department == 'di':
                 if is_beneficial:
-                    zone.gold_penalty -= 3
-                    zone_updates.append(f"{zone.zone_id}(地部): 惩罚-3")
+                    zone.gold_penalty -= rules.di_beneficial_relief
+                    zone_updates.append(f"{zone.zone_id}(地部): 惩罚-{rules.di_beneficial_relief}")
                 if is_harmful:
-                    zone.gold_penalty += 5
-                    zone_updates.append(f"{zone.zone_id}(地部): 惩罚+5")
+                    zone.gold_penalty += rules.di_harmful_penalty
+                    zone_updates.append(f"{zone.zone_id}(地部): 惩罚+{rules.di_harmful_penalty}")
                 zone.gold_penalty = max(0, zone.gold_penalty) # Cannot be negative
 
         if zone_updates:
@@ -178,10 +286,11 @@ class Game:
         self.game_state.set_phase("PLACEMENT")
         logging.info("--- Phase: PLACEMENT ---")
         for player in self.active_players:
-            # Players randomly choose a basic card from their hand to play.
-            basic_cards_in_hand = [c for c in player.hand if c.card_type == 'basic']
-            if basic_cards_in_hand:
-                card_to_play = random.choice(basic_cards_in_hand)
+            if player.played_card:
+                continue
+            placements = act.legal_placements(self.game_state, player)
+            if placements:
+                card_to_play = act.card_for(self.game_state, self.decide(player, placements))
                 player.play_card(card_to_play.card_id)
                 logging.info(f"{player.name} 放置卡牌: {card_to_play.name} (面朝下)")
                 logging.info(f"{player.name} 手牌数量: {len(player.hand)}")
@@ -193,18 +302,14 @@ class Game:
         logging.info("--- Phase: MOVEMENT ---")
 
         # Simplified: players move one by one in the current player order
+        arrivals = []
         for player in self.active_players:
-            # In a full game, we'd check if the player can move (e.g., not stunned)
-            valid_moves = self.game_state.game_board.get_valid_moves(player.position)
-            if not valid_moves:
-                logging.info(f"{player.name} 在 {player.position} 没有可移动的位置")
+            destination = self._move_player(player)
+            if destination is None:
+                continue
+            if self.large_lobby:
+                arrivals.append(player)
                 continue
-
-            # Players randomly choose a valid move.
-            destination = random.choice(valid_moves)
-            original_position = player.position
-            player.position = destination
-            logging.info(f"{player.name} 从 {original_position} 移动到 {destination}")
 
             # Check for "Lun Dao"
             other_players_in_zone = [
@@ -219,27 +324,72 @@ class Game:
             else:
                 logging.info(f"{player.name} 移动到空区域")
 
+        if self.large_lobby:
+            self._run_zone_lun_dao(arrivals)
+
         # After all movements are complete, trigger Qi Men gate effects
         self._trigger_gate_effects()
 
+    def _move_player(self, player: Player) -> str | None:
+        """Asks a player who has not moved this round for a move and makes it. Returns the destination, if any."""
+        if player.has_moved:
+            return None
+        if player.has_status("CANNOT_MOVE") or player.has_status("IMPRISONED"):
+            player.has_moved = True
+            logging.info(f"{player.name} 无法移动")
+            return None
+
+        moves = act.legal_moves(self.game_state, player)
+        if not moves:
+            player.has_moved = True
+            logging.info(f"{player.name} 在 {player.position} 没有可移动的位置")
+            return None
+
+        # Marked only after the decision, so a policy that snapshots the state (MCTS) still sees the move as open
+        code = self.decide(player, moves)
+        player.has_moved = True
+        destination = act.zone_for(self.game_state, code)
+        original_position = player.position
+        player.position = destination
+        logging.info(f"{player.name} 从 {original_position} 移动到 {destination}")
+        return destination
+
+    def _run_zone_lun_dao(self, arrivals: List[Player]):
+        """
+        Large-lobby Lun Dao: once everyone has moved, players are bucketed by
+        zone and in each zone (in board order) the arrivals challenge distinct
+        occupants, so no player duels more than once per round.
+        """
+        buckets = lobby.zone_buckets(self.game_state.players)
+        # Positions don't change again this round, so effects can use the same buckets
+        self.effect_engine.zone_buckets = buckets
+        arrived = {id(p) for p in arrivals}
+        for zone_id in self.game_state.game_board.zones:
+            occupants = buckets.get(zone_id)
+            if not occupants or len(occupants) < 2:
+                continue
+            for challenger, defender in lobby.pair_duels(occupants, arrived):
+                logging.info(f"触发论道: {challenger.name} vs {defender.name}")
+                self._trigger_lun_dao(challenger, defender)
+
     def _trigger_lun_dao(self, challenger: Player, defender: Player):
         logging.info(f"--- 论道事件触发: {challenger.name} vs {defender.name} ---")
 
-        # Players randomly choose a basic card from their hand for the duel.
-        challenger_cards = [c for c in challenger.hand if c.card_type == 'basic']
-        defender_cards = [c for c in defender.hand if c.card_type == 'basic']
+        challenger_cards = act.legal_duel_cards(self.game_state, challenger)
+        defender_cards = act.legal_duel_cards(self.game_state, defender)
 
         if not challenger_cards or not defender_cards:
             logging.warning("论道无法进行，一方或双方缺少基本卡牌")
             return
 
-        challenger_card = random.choice(challenger_cards)
-        defender_card = random.choice(defender_cards)
+        challenger_card = act.card_for(self.game_state, self.decide(challenger, challenger_cards))
+        defender_card = act.card_for(self.game_state, self.decide(defender, defender_cards))
 
         logging.info(f"{challenger.name} 展示: {challenger_card.name} ({challenger_card.strokes}笔画)")
         logging.info(f"{defender.name} 展示: {defender_card.name} ({defender_card.strokes}笔画)")
 
         winner, loser = (None, None)
+        amount = 0
         if challenger_card.strokes < defender_card.strokes:
             winner, loser = challenger, defender
             logging.info(f"{challenger.name} 笔画数更少，获胜！")
@@ -250,20 +400,25 @@ class Game:
             logging.info("笔画数相同，平局！")
 
         if winner:
-            amount = min(loser.gold, 5) # Cannot take more than the loser has
+            amount = min(loser.gold, self.rules.duel_stake) # Cannot take more than the loser has
             loser.change_resource("gold", -amount)
             winner.change_resource("gold", amount)
+            self._record_gold(loser, -amount, "DUEL_STAKE", source=winner)
+            self._record_gold(winner, amount, "DUEL_STAKE", source=loser)
             logging.info(f"{winner.name} 从 {loser.name} 处获得 {amount}金币")
             logging.info(f"{winner.name} 金币: {winner.gold}, {loser.name} 金币: {loser.gold}")
             self._check_player_elimination(loser)
         else:
             logging.info("论道平局，双方相安无事")
 
+        self._record(EventKind.DUEL, player=challenger, other=defender, amount=amount,
+                     detail=self.game_state.seat_of(winner) if winner else -1)
+
         # Discard the used cards
         challenger.hand.remove(challenger_card)
-        self.game_state.basic_discard_pile.append(challenger_card)
+        self.game_state.basic_deck.discard(challenger_card)
         defender.hand.remove(defender_card)
-        self.game_state.basic_discard_pile.append(defender_card)
+        self.game_state.basic_deck.discard(defender_card)
         logging.info("论道使用的卡牌已弃置")
 
     def _trigger_gate_effects(self):
@@ -282,6 +437,7 @@ class Game:
                 gate_display_name = gate_info.get("name", gate_name)
                 logging.info(f"{player.name} 在 {palace.upper()}宫，触发: {gate_display_name}")
                 gate_effects_triggered.append(f"{player.name}: {gate_display_name}")
+                self._record(EventKind.GATE_TRIGGER, player=player, detail=qm.gate_index(gate_name))
                 
                 gate_effect = qm.get_effect_for_gate(gate_name)
                 if gate_effect:
@@ -296,8 +452,7 @@ class Game:
         self.effect_engine.resolve_effects()
 
         # After gate effects, check for elimination
-        for player in self.active_players:
-            self._check_player_elimination(player)
+        self._apply_eliminations()
 
     def _update_qimen_gates(self):
         """Updates the gate layout on the board based on the current Ju number."""
@@ -313,49 +468,37 @@ class Game:
         self.game_state.set_phase("INTERPRETATION")
         logging.info("--- Phase: INTERPRETATION ---")
 
-        players_with_cards = [p for p in self.active_players if p.played_card]
-
-        # Define department priority for sorting
-        department_priority = {"tian": 0, "ren": 1, "di": 2, "zhong": 99}
-
-        def get_interpretation_sort_key(player: Player):
-            zone = self.game_state.game_board.get_zone(player.position)
-            if not zone:
-                # Players in invalid positions resolve last
-                return (99, 99)
-            luoshu = zone.luoshu_number
-            dept_prio = department_priority.get(zone.department, 99)
-            return (luoshu, dept_prio)
-
-        # Sort players according to the game rules
-        players_with_cards.sort(key=get_interpretation_sort_key)
+        # Sort players according to the game rules: by Luo Shu number, then tian, ren, di, zhong.
+        # Keys are precomputed per zone; the sort is stable, so ties keep seat order.
+        board = self.game_state.game_board
+        revealed = []
+        for player in self.active_players:
+            if player.played_card:
+                slot = board.interpretation_slot(player.position)
+                revealed.append((slot[0] if slot else UNPLACED_SORT_KEY, player, slot))
+        revealed.sort(key=itemgetter(0))
 
         logging.info("Players reveal and queue their card effects according to board position.")
-        for player in players_with_cards:
+        for _, player, slot in revealed:
             card = player.played_card
             logging.info(f"{player.name} (at {player.position}) reveals {card.name}!")
 
-            player_zone = self.game_state.game_board.get_zone(player.position)
-            # This check is somewhat redundant due to the sort key, but safe to keep
-            if not player_zone:
+            if slot is None:
+                # Players in invalid positions sort last and are skipped
                 logging.warning(f"Player {player.name} is at an invalid position {player.position}, skipping interpretation.")
                 continue
 
-            variant_key = player_zone.department
-            variant_effect = card.core_mechanism.get("variants", {}).get(variant_key, {}).get("effect")
-            effect_to_queue = variant_effect if variant_effect else card.effect
-
+            effect_to_queue = card.department_effects[slot[1]]
             if effect_to_queue:
                 self.effect_engine.queue_effect(effect_to_queue, player)
             else:
-                logging.warning(f"Card {card.name} has no valid effect for department '{variant_key}' or a default effect.")
+                logging.warning(f"Card {card.name} has no valid effect for department '{DEPARTMENTS[slot[1]]}' or a default effect.")
 
         # After all effects are queued, resolve them based on priority
         self.effect_engine.resolve_effects()
 
         # After effects resolve, check for elimination
-        for player in self.active_players:
-            self._check_player_elimination(player)
+        self._apply_eliminations()
 
     def _execute_resolution_phase(self):
         self.game_state.set_phase("RESOLUTION")
@@ -372,6 +515,7 @@ class Game:
                 reward = zone.gold_reward
                 if reward > 0:
                     player.change_resource("gold", reward)
+                    self._record_gold(player, reward, "TIAN_REWARD")
                     self.game_state.game_fund -= reward
                     logging.info(f"{player.name} 在天部获得 {reward}金币. 基金剩余: {self.game_state.game_fund}")
                 else:
@@ -383,6 +527,7 @@ class Game:
                 if penalty > 0:
                     paid_amount = min(player.gold, penalty)
                     player.change_resource("gold", -paid_amount)
+                    self._record_gold(player, -paid_amount, "DI_PENALTY")
                     self.game_state.game_fund += paid_amount
                     logging.info(f"{player.name} 在地部支付 {paid_amount}金币惩罚. 基金剩余: {self.game_state.game_fund}")
                 else:
@@ -390,14 +535,15 @@ class Game:
 
             # Zhong Gong Penalty
             elif zone.department == 'zhong':
-                penalty = math.ceil(player.gold * 0.10)
+                rate = self.rules.zhong_gong_tax_rate
+                penalty = math.ceil(player.gold * rate)
                 player.change_resource("gold", -penalty)
+                self._record_gold(player, -penalty, "ZHONG_GONG_TAX")
                 self.game_state.game_fund += penalty
-                logging.info(f"{player.name} 在中宫支付 {penalty}金币(10%)惩罚. 基金剩余: {self.game_state.game_fund}")
+                logging.info(f"{player.name} 在中宫支付 {penalty}金币({rate:.0%})惩罚. 基金剩余: {self.game_state.game_fund}")
 
         # After all transactions, check for elimination
-        for player in self.active_players:
-            self._check_player_elimination(player)
+        self._apply_eliminations()
 
     def _execute_upkeep_phase(self):
         self.game_state.set_phase("UPKEEP")
@@ -412,50 +558,73 @@ class Game:
             player.tick_statuses()
             if player.played_card:
                 # For now, assume all played cards are basic cards.
-                self.game_state.basic_discard_pile.append(player.played_card)
+                self.game_state.basic_deck.discard(player.played_card)
                 player.played_card = None
+            player.has_moved = False
         logging.info("玩家弃置已使用的卡牌")
         
         # Advance to next player after upkeep phase
-        self.game_state.advance_to_next_player()
+        if self.large_lobby:
+            self.effect_engine.zone_buckets = None
+            self.game_state.advance_round(lobby.JU_ROUNDS)
+        else:
+            self.game_state.advance_to_next_player()
         logging.info(f"推进到下一位玩家: {self.game_state.get_active_player().name}")
         logging.info(f"当前局数: 阳遁第{self.game_state.ju_number}局, 回合: {self.game_state.current_turn}")
 
-    def _check_player_elimination(self, player: Player):
-        """Checks if a player should be eliminated and updates their status."""
+    def _sync_active_players(self):
+        """Rebuilds the active list for the current players, e.g., after setup or a state switch."""
+        players = self.game_state.players
+        self._active = [p for p in players if not p.is_eliminated]
+        self._active_source = players
+        self._active_seats = len(players)
+        # Players already at zero health (e.g., in a snapshot taken mid-phase) are still due a check
+        self._depleted = [p for p in self._active if p.health <= 0]
+        for player in players:
+            player._on_health_depleted = self._mark_depleted
+
+    def _mark_depleted(self, player: Player):
+        self._depleted.append(player)
+
+    def _apply_eliminations(self):
+        """Runs the elimination check for the players whose health crossed zero since the last call."""
+        self.active_players  # Make sure the listeners belong to the current state
+        if not self._depleted:
+            return
+        depleted, self._depleted = self._depleted, []
+        if len(depleted) > 1:
+            depleted.sort(key=self.game_state.seat_of)
+        eliminated = [p for p in depleted if self._check_player_elimination(p, update_active=False)]
+        if eliminated:
+            # One rebuild for the whole batch keeps mass eliminations in a large lobby O(n)
+            self._active = [p for p in self._active if not p.is_eliminated]
+
+    def _check_player_elimination(self, player: Player, update_active: bool = True) -> bool:
+        """Checks if a player should be eliminated and updates their status. Returns True if they were."""
         if player.is_eliminated:
-            return # Already eliminated
+            return False # Already eliminated
 
         # Elimination condition: Health is 0 or less.
         # Rule 13.1 also mentions gold, but we'll start with health.
         if player.health <= 0:
             player.is_eliminated = True
+            if update_active:
+                self._active = [p for p in self.active_players if p is not player]
+            self._record(EventKind.ELIMINATION, player=player, amount=player.health)
             logging.warning(f"PLAYER ELIMINATED: {player.name} has been eliminated (Health: {player.health}).")
             # In a full game, we might trigger "on elimination" effects here.
+            return True
+        return False
 
-    def _get_deck_and_discard(self, deck_type: str) -> (List[Card], List[Card]):
-        gs = self.game_state
-        if deck_type == 'basic':
-            return gs.basic_deck, gs.basic_discard_pile
-        elif deck_type == 'function':
-            return gs.function_deck, gs.function_discard_pile
-        elif deck_type == 'celestial_stem':
-            return gs.celestial_stem_deck, gs.celestial_stem_discard_pile
-        elif deck_type == 'terrestrial_branch':
-            return gs.terrestrial_branch_deck, gs.terrestrial_branch_discard_pile
-        logging.warning(f"Unknown deck type requested: {deck_type}")
-        return None, None
-
-    def _reshuffle_if_needed(self, deck_type: str):
-        deck, discard_pile = self._get_deck_and_discard(deck_type)
+    def _reshuffle_if_needed(self, deck_type: DeckType):
+        deck = self.game_state.decks.get(deck_type)
         if deck is None:
+            logging.warning(f"Unknown deck type requested: {deck_type}")
             return
 
         if not deck:
-            if len(discard_pile) > 0:
-                logging.info(f"Deck '{deck_type}' is empty. Reshuffling discard pile.")
-                deck.extend(discard_pile)
-                random.shuffle(deck)
-                discard_pile.clear()
+            if deck.discard_count > 0:
+                logging.info(f"Deck '{deck_type.value}' is empty. Reshuffling discard pile.")
+                deck.reshuffle()
             else:
-                logging.warning(f"Deck '{deck_type}' and its discard pile are both empty. Cannot draw.")
\ No newline at end of file
+                logging.warning(f"Deck '{deck_type.value}' and its discard pile are both empty. Cannot draw.")
@@ -1,5 +1,8 @@
+import logging
 from dataclasses import dataclass, field
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
+
+from .versioning import Versioned
 
 # Defines the circular adjacency of the eight palaces (Ba Gua)
 PALACE_ADJACENCY = {
@@ -13,8 +16,15 @@ PALACE_ADJACENCY = {
     "qian": ["dui", "kan"],
 }
 
+# Departments in interpretation order within a Luo Shu number; card effects are
+# stored per department in this order (see Card.department_effects)
+DEPARTMENTS = ("tian", "ren", "di", "zhong")
+DEPARTMENT_INDEX = {dep: i for i, dep in enumerate(DEPARTMENTS)}
+# Sort key for players without a valid zone: after every zone
+UNPLACED_SORT_KEY = 1 << 30
+
 @dataclass
-class Zone:
+class Zone(Versioned):
     """Represents a single area on the board."""
     zone_id: str  # e.g., "li_tian"
     palace: str   # e.g., "li"
@@ -25,8 +35,11 @@ class Zone:
     gold_penalty: int = 0
 
     def to_dict(self) -> Dict[str, Any]:
-        """Serializes the Zone object to a dictionary."""
-        return {
+        """Serializes the Zone object to a dictionary. The result is cached and must not be modified."""
+        cached = self._cached_dict()
+        if cached is not None:
+            return cached
+        return self._store_dict({
             "zone_id": self.zone_id,
             "palace": self.palace,
             "department": self.department,
@@ -34,11 +47,13 @@ class Zone:
             "five_element": self.five_element,
             "gold_reward": self.gold_reward,
             "gold_penalty": self.gold_penalty,
-        }
+        })
 
 @dataclass
-class GameBoard:
+class GameBoard(Versioned):
     """Represents the game board, including all zones and dynamic elements."""
+    _AGGREGATED_FIELDS = frozenset({"zones"})
+
     zones: Dict[str, Zone] = field(default_factory=dict)
     qimen_gates: Dict[str, str] = field(default_factory=dict) # Maps palace -> gate_id, e.g., {"li": "sheng_men"}
 
@@ -46,6 +61,18 @@ class GameBoard:
         """Initializes the board with all 24 zones if not already provided."""
         if not self.zones:
             self._create_zones()
+        # Stable zone numbering, used for compact action codes
+        self._zone_ids: List[str] = list(self.zones)
+        self._zone_indices: Dict[str, int] = {zone_id: i for i, zone_id in enumerate(self._zone_ids)}
+        # Zone id -> (interpretation sort key, department index): Luo Shu number first, then department.
+        # A board thawed from a snapshot thaws zones on access; `peek` reads these static fields without thawing
+        peek = getattr(self.zones, "peek", self.zones.__getitem__)
+        self._interpretation_slots: Dict[str, Tuple[int, int]] = {}
+        for zone_id in self._zone_ids:
+            zone = peek(zone_id)
+            self._interpretation_slots[zone_id] = (
+                zone.luoshu_number * len(DEPARTMENTS) + DEPARTMENT_INDEX[zone.department],
+                DEPARTMENT_INDEX[zone.department])
 
     def _create_zones(self):
         """Creates the 24 zones of the game board based on the rules."""
@@ -84,9 +111,26 @@ class GameBoard:
             five_element="earth"
         )
 
+    @property
+    def version(self) -> int:
+        # Zones not yet thawed from a snapshot are unchanged; thawing one only ever raises the sum
+        thawed = getattr(self.zones, "thawed", None)
+        zones = [zone for _, zone in thawed()] if thawed is not None else self.zones.values()
+        return self._version + sum(zone._version for zone in zones)
+
     def get_zone(self, zone_id: str) -> Zone | None:
         return self.zones.get(zone_id)
 
+    def zone_index(self, zone_id: str) -> int:
+        return self._zone_indices[zone_id]
+
+    def zone_id_at(self, index: int) -> str:
+        return self._zone_ids[index]
+
+    def interpretation_slot(self, zone_id: str) -> Tuple[int, int] | None:
+        """(sort key, department index) of a zone, or None for an invalid position."""
+        return self._interpretation_slots.get(zone_id)
+
     def get_palace_for_zone(self, zone_id: str) -> str | None:
         zone = self.get_zone(zone_id)
         return zone.palace if zone else None
@@ -138,8 +182,11 @@ class GameBoard:
         return [move for move in valid_moves if move in self.zones]
 
     def to_dict(self) -> Dict[str, Any]:
-        """Serializes the GameBoard object to a dictionary."""
-        return {
+        """Serializes the GameBoard object to a dictionary, reusing the cached dicts of unchanged zones."""
+        cached = self._cached_dict()
+        if cached is not None:
+            return cached
+        return self._store_dict({
             "zones": {zone_id: zone.to_dict() for zone_id, zone in self.zones.items()},
             "qimen_gates": self.qimen_gates,
-        }
\ No newline at end of file
+        })
\ No newline at end of file
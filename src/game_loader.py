@@ -1,8 +1,13 @@
+import hashlib
 import json
 from pathlib import Path
 from typing import List, Dict
 
 from .card import Card
+from .interning import intern_effect
+
+# Card logic fields rebuilt into shared immutable nodes (see interning.py)
+INTERNED_FIELDS = ("core_mechanism", "effect", "triggers", "usage_limit")
 
 class GameLoader:
     """Handles loading all game data from the file system."""
@@ -36,15 +41,18 @@ class GameLoader:
             print(f"Error: Card data path not found at '{card_data_path}'")
             return decks
 
-        # Find all json files recursively
-        json_files = list(card_data_path.rglob("*.json"))
+        json_files = self._card_files(card_data_path)
         print(f"Found {len(json_files)} card files to load.")
 
         for file_path in json_files:
             try:
                 with open(file_path, 'r', encoding='utf-8') as f:
                     data = json.load(f)
+                    for key in INTERNED_FIELDS:
+                        if key in data:
+                            data[key] = intern_effect(data[key])
                     card = Card.from_json(data)
+                    card.department_effects  # Resolve the per-department dispatch now rather than mid-game
 
                     card_type = card.card_type
                     if card_type in decks:
@@ -70,4 +78,40 @@ class GameLoader:
         print(f"Loaded {len(decks['terrestrial_branch'])} terrestrial branch cards.")
         print("------------------------------------------")
 
-        return decks
\ No newline at end of file
+        return decks
+
+    def bundle_hash(self) -> str:
+        """
+        Digest of the card files `load_all_cards` would read, in the order it
+        reads them, with paths relative to the assets directory. Two loaders
+        with the same bundle hash deal the same decks from the same seed.
+        """
+        card_data_path = self.assets_path / "data" / "cards"
+        digest = hashlib.blake2b(digest_size=8)
+        if card_data_path.is_dir():
+            for path in self._card_files(card_data_path):
+                digest.update(path.relative_to(self.assets_path).as_posix().encode("utf-8"))
+                digest.update(path.read_bytes())
+        return digest.hexdigest()
+
+    def _card_files(self, card_data_path: Path) -> List[Path]:
+        """
+        The card files listed in `card_manifest.json` (written by
+        `tools/generate_card_data.py`), or all json files under the card
+        directory if there is no manifest or it is stale. The manifest records
+        the mtime of every card directory; any file added, removed or renamed
+        since it was written changes one of them.
+        """
+        manifest_path = self.assets_path / "data" / "card_manifest.json"
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            directories = manifest["directories"]
+            if all((card_data_path / d).stat().st_mtime_ns == mtime for d, mtime in directories.items()):
+                return [card_data_path / entry["path"] for entry in manifest["cards"].values()]
+            print("Card manifest is stale; scanning the card directory.")
+        except FileNotFoundError:
+            pass
+        except (json.JSONDecodeError, KeyError) as e:
+            print(f"Warning: Ignoring unreadable card manifest {manifest_path}: {e}")
+        return sorted(card_data_path.rglob("*.json"))
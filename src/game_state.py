@@ -3,27 +3,25 @@ from dataclasses import dataclass, field
 from typing import List, Dict, Any
 
 from .card import Card
+from .deck import CardRegistry, Deck, DeckType
 from .player import Player
 from .game_board import GameBoard
+from .rules import RulesConfig
+from .versioning import Versioned
+from . import zobrist
 
 @dataclass
-class GameState:
+class GameState(Versioned):
     """Manages the entire state of the game."""
+    _HASHED_FIELDS = frozenset({"current_celestial_stem", "current_terrestrial_branch", "ju_number", "current_phase"})
+    _AGGREGATED_FIELDS = frozenset({"players", "game_board"})
+
     players: List[Player] = field(default_factory=list)
     game_board: GameBoard = field(default_factory=GameBoard)
 
-    # Deck piles
-    basic_deck: List[Card] = field(default_factory=list)
-    function_deck: List[Card] = field(default_factory=list)
-    destiny_deck: List[Card] = field(default_factory=list)
-    celestial_stem_deck: List[Card] = field(default_factory=list)
-    terrestrial_branch_deck: List[Card] = field(default_factory=list)
-
-    # Discard piles
-    basic_discard_pile: List[Card] = field(default_factory=list)
-    function_discard_pile: List[Card] = field(default_factory=list)
-    celestial_stem_discard_pile: List[Card] = field(default_factory=list)
-    terrestrial_branch_discard_pile: List[Card] = field(default_factory=list)
+    # Decks (each holds its own discard pile), addressed by DeckType
+    card_registry: CardRegistry = field(default_factory=CardRegistry)
+    decks: Dict[DeckType, Deck] = field(default_factory=dict)
 
     # Game flow & state
     game_fund: int = 0
@@ -35,16 +33,84 @@ class GameState:
     active_player_index: int = 0
     starting_player_index: int = 0  # Track which player started the current Ju
 
+    # Balance constants (immutable, shared between branches of the same game)
+    rules: RulesConfig = field(default_factory=RulesConfig)
+
     # Rule and effect tracking
     active_rules: Dict[str, Any] = field(default_factory=dict)
     last_resolved_effect: Dict[str, Any] | None = None
     interrupt_flags: Dict[str, bool] = field(default_factory=dict)
     effect_queue: List[Dict[str, Any]] = field(default_factory=list)
 
+    def __post_init__(self):
+        """Creates an empty deck for every deck type that was not provided."""
+        for deck_type in DeckType:
+            if deck_type not in self.decks:
+                self.decks[deck_type] = Deck(deck_type, self.card_registry)
+
+    @property
+    def basic_deck(self) -> Deck:
+        return self.decks[DeckType.BASIC]
+
+    @property
+    def function_deck(self) -> Deck:
+        return self.decks[DeckType.FUNCTION]
+
+    @property
+    def destiny_deck(self) -> Deck:
+        return self.decks[DeckType.DESTINY]
+
+    @property
+    def celestial_stem_deck(self) -> Deck:
+        return self.decks[DeckType.CELESTIAL_STEM]
+
+    @property
+    def terrestrial_branch_deck(self) -> Deck:
+        return self.decks[DeckType.TERRESTRIAL_BRANCH]
+
+    @property
+    def state_version(self) -> int:
+        """
+        A cheap change counter for the serialized state. It only sums integer
+        counters (no serialization), so servers and caches can compare it freely.
+        """
+        return self._version + self.game_board.version + sum(p.version for p in self.players)
+
+    version = state_version
+
+    @property
+    def hash(self) -> int:
+        """
+        64-bit Zobrist hash of the game-relevant state: positions, bucketed
+        resources, hands, statuses, the current stem and branch, the Ju number
+        and the phase. Maintained incrementally by the mutators; equal states
+        hash equally in every process.
+        """
+        h = self._zhash
+        for player in self.players:
+            h ^= player.hash
+        return h
+
+    def _zobrist_key(self, name: str, value: Any) -> int:
+        if isinstance(value, Card):
+            value = value.card_id
+        return zobrist.key("state", name, value)
+
     def get_player(self, player_id: str) -> Player | None:
         """Finds a player by their ID."""
         return next((p for p in self.players if p.player_id == player_id), None)
 
+    # id(player) -> index in `players`; validated on every lookup, so copies and reseating are safe
+    _seats = None
+
+    def seat_of(self, player: Player) -> int:
+        """The index of a player in `players` in O(1)."""
+        seat = self._seats.get(id(player)) if self._seats is not None else None
+        if seat is None or seat >= len(self.players) or self.players[seat] is not player:
+            self._seats = {id(p): i for i, p in enumerate(self.players)}
+            seat = self._seats[id(player)]
+        return seat
+
     def get_active_player(self) -> Player:
         """Returns the player whose turn it is."""
         return self.players[self.active_player_index]
@@ -65,6 +131,18 @@ class GameState:
             self.current_turn += 1
             logging.info(f"--- Starting Round {self.current_turn} ---")
 
+    def advance_round(self, rounds_per_ju: int):
+        """
+        Large-lobby counterpart of `advance_to_next_player`: the starting seat
+        still rotates, but Ju advances every `rounds_per_ju` rounds instead of
+        once per full cycle of seats, which would stall the gates in a big game.
+        """
+        self.active_player_index = (self.active_player_index + 1) % len(self.players)
+        if self.current_turn % rounds_per_ju == 0:
+            self.ju_number += 1
+            self.starting_player_index = self.active_player_index
+            logging.info(f"*** New Ju: {self.ju_number}. Qi Men Gates will shift. ***")
+
     def set_phase(self, phase_name: str):
         """Sets the current game phase."""
         self.current_phase = phase_name
@@ -74,8 +152,15 @@ class GameState:
         return f"GameState(Turn={self.current_turn}, Phase='{self.current_phase}', ActivePlayer='{self.get_active_player().name}')"
 
     def to_dict(self) -> Dict[str, Any]:
-        """Serializes the entire GameState object to a dictionary."""
-        return {
+        """
+        Serializes the entire GameState object to a dictionary, reusing the cached
+        dicts of unchanged players, zones and cards. The result must not be modified.
+        """
+        cached = self._cached_dict()
+        if cached is not None:
+            return cached
+        return self._store_dict({
+            "state_version": self.state_version,
             "players": [p.to_dict() for p in self.players],
             "game_board": self.game_board.to_dict(),
             "current_turn": self.current_turn,
@@ -85,4 +170,4 @@ class GameState:
             "game_fund": self.game_fund,
             "current_celestial_stem": self.current_celestial_stem.to_dict() if self.current_celestial_stem else None,
             "current_terrestrial_branch": self.current_terrestrial_branch.to_dict() if self.current_terrestrial_branch else None,
-        }
\ No newline at end of file
+        })
\ No newline at end of file
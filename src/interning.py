@@ -0,0 +1,120 @@
+# src/interning.py
+
+"""
+Hash-consing of card effect data.
+
+Card definitions repeat many identical subtrees: the same action objects
+(`GAIN_RESOURCE SELF gold 5`, `DRAW_CARD SELF function 1`, ...) appear in the
+tian/di/ren variants of many cards and in the Qi Men gate effects. `Interner`
+rebuilds a JSON tree bottom-up into immutable nodes (`FrozenDict` for objects,
+tuples for arrays) and returns the one shared node for every structurally equal
+subtree. Dict key order is not significant; the first occurrence's order is kept.
+
+Because interned nodes never change and equal subtrees are the same object,
+values derived from them can be cached by identity (`IdentityCache`).
+"""
+
+import sys
+from typing import Any, Callable, Dict, Tuple
+
+
+class FrozenDict(dict):
+    """A read-only, hashable dict. Supports the full read API of `dict`."""
+
+    __slots__ = ("_hash",)
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("Interned effect data is immutable; copy it with dict() before modifying.")
+
+    __setitem__ = __delitem__ = __ior__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+
+    def __hash__(self) -> int:
+        try:
+            return self._hash
+        except AttributeError:
+            self._hash = hash(frozenset(self.items()))
+            return self._hash
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+    def __copy__(self) -> 'FrozenDict':
+        return self
+
+    def __deepcopy__(self, memo) -> 'FrozenDict':
+        return self
+
+    def __repr__(self) -> str:
+        return f"FrozenDict({dict.__repr__(self)})"
+
+
+def _scalar_key(value: Any) -> Tuple[type, Any]:
+    # 1, 1.0 and True compare equal but must stay distinct values
+    return (type(value), value)
+
+
+class Interner:
+    """Canonicalizes JSON-like trees into shared immutable nodes."""
+
+    def __init__(self):
+        # Structural key -> node. Children are already canonical, so a container's
+        # key only needs their identities. The table keeps every node alive, so
+        # those ids are never reused.
+        self._nodes: Dict[Tuple, Any] = {}
+        self.hits = 0
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def intern(self, value: Any) -> Any:
+        if isinstance(value, dict):
+            items = [(sys.intern(k) if type(k) is str else k, self.intern(v)) for k, v in value.items()]
+            key = ("d", frozenset((k, self._child_key(v)) for k, v in items))
+            factory = lambda: FrozenDict(items)
+        elif isinstance(value, (list, tuple)):
+            items = [self.intern(v) for v in value]
+            key = ("l", tuple(self._child_key(v) for v in items))
+            factory = lambda: tuple(items)
+        elif type(value) is str:
+            return sys.intern(value)
+        else:
+            return value
+
+        node = self._nodes.get(key)
+        if node is None:
+            node = self._nodes[key] = factory()
+        else:
+            self.hits += 1
+        return node
+
+    @staticmethod
+    def _child_key(node: Any) -> Any:
+        return id(node) if isinstance(node, (dict, tuple)) else _scalar_key(node)
+
+
+class IdentityCache:
+    """
+    Values derived from immutable nodes, keyed by node identity. Each entry
+    keeps its node alive, so an id cannot be reused by another object.
+    """
+
+    def __init__(self):
+        self._entries: Dict[int, Tuple[Any, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, node: Any, compute: Callable[[Any], Any]) -> Any:
+        entry = self._entries.get(id(node))
+        if entry is None:
+            entry = self._entries[id(node)] = (node, compute(node))
+        return entry[1]
+
+
+# Shared by the card loader and the gate effects, so their common subtrees are one object.
+EFFECTS = Interner()
+
+
+def intern_effect(value: Any) -> Any:
+    return EFFECTS.intern(value)
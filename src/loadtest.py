@@ -0,0 +1,342 @@
+# src/loadtest.py
+
+"""
+Load generator for the Socket.IO server (server.py).
+
+Each concurrency level connects that many simulated clients, split over one
+or more processes that each run them on an asyncio loop. A client:
+
+- connects (timed as the `connect` event) and, with `--format`, negotiates
+  a wire format, which moves it into that format's room;
+- sends `next_round` and `start_game` as Poisson processes at the given
+  per-client rates, each tagged with a request id, timing each until the
+  server's `command_done` (or `command_rejected`) that echoes its id; sends
+  coalesced into one command complete with it;
+- counts the state pushes it receives (`game_state_update` or
+  `game_state_frame`) and their bytes.
+
+Before each level a control client resets the game and starts it. The report
+lists per-command latency percentiles and throughput for every level, then
+the saturation point: the first level whose p99 command latency exceeds the
+budget, whose server turns away more than `--max-reject` percent of the
+commands sent (a full queue answers fast, so latency alone hides it), or
+whose completed-command throughput grows by less than `--min-gain` over the
+previous level while more commands are sent.
+
+Usage (with the server running, e.g. `python server.py`):
+    python -m src.loadtest --concurrency 50 200 1000 2000 --duration 20 --processes 4
+
+Needs the asyncio Socket.IO client: pip install "python-socketio[asyncio_client]"
+Thousands of clients need as many file descriptors; each process raises its
+soft limit to the hard limit (see `ulimit -n`).
+"""
+
+import argparse
+import asyncio
+import dataclasses
+import random
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Sequence, Tuple
+
+try:
+    import socketio
+except ImportError:  # Optional: only needed to actually run a load test
+    socketio = None
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+COMMANDS = ("start_game", "next_round")
+STATE_EVENTS = ("game_state_update", "game_state_frame")
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of `values` (sorted or not); NaN if there are none."""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))  # ceil(n * q / 100)
+    return ordered[int(rank) - 1]
+
+
+@dataclass
+class LoadConfig:
+    url: str = "http://127.0.0.1:5000"
+    duration: float = 20.0  # Seconds of traffic per level, after the ramp
+    ramp: float = 5.0  # Seconds over which a level's clients connect
+    next_round_rate: float = 0.2  # Commands per client per second
+    start_rate: float = 0.02
+    wire_format: str | None = None  # Negotiate this format; None stays on 'game_state_update'
+    deflate: bool = False
+    transports: Tuple[str, ...] = ("websocket",)
+    seed: int = 0
+
+
+@dataclass
+class LevelResult:
+    """What the clients of one level (or one process of it) observed; merged across processes."""
+    clients: int = 0
+    duration: float = 0.0
+    connect_failures: int = 0
+    sent: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    completed: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    rejected: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    # event -> round-trip latencies in milliseconds
+    latencies: Dict[str, List[float]] = field(default_factory=lambda: defaultdict(list))
+    state_messages: int = 0
+    state_bytes: int = 0
+
+    def merge(self, other: 'LevelResult'):
+        self.clients += other.clients
+        self.duration = max(self.duration, other.duration)
+        self.connect_failures += other.connect_failures
+        for mine, theirs in ((self.sent, other.sent), (self.completed, other.completed),
+                             (self.rejected, other.rejected)):
+            for name, count in theirs.items():
+                mine[name] += count
+        for name, values in other.latencies.items():
+            self.latencies[name].extend(values)
+        self.state_messages += other.state_messages
+        self.state_bytes += other.state_bytes
+
+    def to_plain(self) -> 'LevelResult':
+        """A copy with plain dicts, which (unlike the defaultdict factories) pickles across processes."""
+        return dataclasses.replace(self, sent=dict(self.sent), completed=dict(self.completed),
+                                   rejected=dict(self.rejected), latencies=dict(self.latencies))
+
+    def row(self) -> Dict[str, Any]:
+        seconds = self.duration or float("nan")
+        sent, rejected = sum(self.sent.values()), sum(self.rejected.values())
+        commands = [v for name in COMMANDS for v in self.latencies.get(name, [])]
+        row = {
+            "clients": self.clients,
+            "failed": self.connect_failures,
+            "sent/s": sent / seconds,
+            "done/s": sum(self.completed.values()) / seconds,
+            "rejected": rejected,
+            "reject %": 100 * rejected / sent if sent else 0.0,
+            "pushes/s": self.state_messages / seconds,
+            "KB/s": self.state_bytes / 1024 / seconds,
+            "connect p50": percentile(self.latencies.get("connect", []), 50),
+        }
+        for q in PERCENTILES:
+            row[f"p{q} ms"] = percentile(commands, q)
+        return row
+
+
+class LatencyTracker:
+    """
+    Matches command replies to sends. Every send carries a request id, and the
+    server's `command_done`/`command_rejected` lists the ids of the sends that
+    command absorbed, so a send queued behind a running command waits for its
+    own reply.
+    """
+
+    def __init__(self, result: LevelResult):
+        self.result = result
+        self._outstanding: Dict[int, Tuple[str, float]] = {}  # request id -> (command, send time)
+        self._next_id = 0
+
+    def sent(self, name: str, now: float) -> int:
+        """Records a send and returns the request id to send with it."""
+        request_id = self._next_id
+        self._next_id += 1
+        self._outstanding[request_id] = (name, now)
+        self.result.sent[name] += 1
+        return request_id
+
+    def done(self, request_ids: Sequence[int], now: float):
+        for name, sent in self._resolve(request_ids):
+            self.result.latencies[name].append((now - sent) * 1000)
+            self.result.completed[name] += 1
+
+    def rejected(self, request_ids: Sequence[int], now: float):
+        for name, sent in self._resolve(request_ids):
+            self.result.latencies[f"{name} (rejected)"].append((now - sent) * 1000)
+            self.result.rejected[name] += 1
+
+    def _resolve(self, request_ids: Sequence[int]) -> List[Tuple[str, float]]:
+        # Unknown ids (sent before the level, or answered twice) are ignored
+        entries = (self._outstanding.pop(request_id, None) for request_id in request_ids)
+        return [entry for entry in entries if entry is not None]
+
+
+def _payload_size(data: Any) -> int:
+    if isinstance(data, (bytes, bytearray)):
+        return len(data)
+    return len(str(data))  # Approximation for JSON events, which arrive already parsed
+
+
+async def simulated_client(index: int, config: LoadConfig, result: LevelResult, start_at: float,
+                           traffic_at: float, stop_at: float):
+    rng = random.Random(config.seed * 1_000_003 + index)
+    await asyncio.sleep(max(0.0, start_at - time.monotonic()))
+    client = socketio.AsyncClient(reconnection=False)
+    tracker = LatencyTracker(result)
+
+    def on_state(data):
+        result.state_messages += 1
+        result.state_bytes += _payload_size(data)
+
+    for event in STATE_EVENTS:
+        client.on(event, on_state)
+    client.on('command_done', lambda data: tracker.done(data.get("request_ids", []), time.monotonic()))
+    client.on('command_rejected', lambda data: tracker.rejected(data.get("request_ids", []), time.monotonic()))
+
+    began = time.monotonic()
+    try:
+        await client.connect(config.url, transports=list(config.transports))
+    except Exception:
+        result.connect_failures += 1
+        return
+    result.latencies["connect"].append((time.monotonic() - began) * 1000)
+    try:
+        if config.wire_format:
+            await client.emit('negotiate_wire', {"formats": [config.wire_format], "deflate": config.deflate})
+        # Commands only flow once every client of the level is connected
+        await asyncio.sleep(max(0.0, traffic_at - time.monotonic()))
+        rates = {"next_round": config.next_round_rate, "start_game": config.start_rate}
+        total_rate = sum(rates.values())
+        while total_rate > 0:
+            await asyncio.sleep(rng.expovariate(total_rate))
+            if time.monotonic() >= stop_at:
+                break
+            name = "next_round" if rng.random() * total_rate < rates["next_round"] else "start_game"
+            request_id = tracker.sent(name, time.monotonic())
+            await client.emit(name, {"request_id": request_id})
+        # Give the last commands time to complete
+        await asyncio.sleep(max(0.0, stop_at - time.monotonic()) + 1.0)
+    finally:
+        await client.disconnect()
+
+
+async def run_clients(config: LoadConfig, count: int, first_index: int, ramp_start: float) -> LevelResult:
+    """`count` clients on this process's event loop. `ramp_start` is a `time.time()`, shared across processes."""
+    result = LevelResult(clients=count)
+    start = time.monotonic() + max(0.0, ramp_start - time.time())
+    traffic_at = start + config.ramp
+    stop_at = traffic_at + config.duration
+    await asyncio.gather(*(simulated_client(first_index + i, config, result,
+                                            start + config.ramp * i / max(1, count), traffic_at, stop_at)
+                           for i in range(count)))
+    result.duration = config.duration
+    return result
+
+
+def _raise_fd_limit():
+    if resource is not None:
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft < hard:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def run_process(config: LoadConfig, count: int, first_index: int, ramp_start: float) -> LevelResult:
+    _raise_fd_limit()
+    return asyncio.run(run_clients(config, count, first_index, ramp_start)).to_plain()
+
+
+async def prepare_game(config: LoadConfig):
+    """Resets the game and starts a new one, so every level plays rounds of a live game."""
+    client = socketio.AsyncClient(reconnection=False)
+    done = asyncio.Event()
+    client.on('command_done', lambda data: data["command"] == "start_game" and done.set())
+    await client.connect(config.url, transports=list(config.transports))
+    try:
+        await client.emit('reset_game')
+        await client.emit('start_game')
+        await asyncio.wait_for(done.wait(), timeout=30)
+    finally:
+        await client.disconnect()
+
+
+def run_level(config: LoadConfig, clients: int, processes: int) -> LevelResult:
+    asyncio.run(prepare_game(config))
+    # Every process starts its ramp at the same wall-clock time, after the pool has spun up
+    ramp_start = time.time() + 1.0
+    if processes <= 1:
+        return run_process(config, clients, 0, ramp_start)
+    shares = [clients // processes + (1 if i < clients % processes else 0) for i in range(processes)]
+    result = LevelResult()
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [pool.submit(run_process, config, share, sum(shares[:i]), ramp_start)
+                   for i, share in enumerate(shares) if share]
+        for future in futures:
+            result.merge(future.result())
+    return result
+
+
+def find_saturation(rows: Sequence[Dict[str, Any]], slo_ms: float, min_gain: float,
+                    max_reject: float = 1.0) -> Dict[str, Any] | None:
+    """
+    The first row whose p99 latency exceeds `slo_ms` (or whose clients failed
+    to connect), whose rejected share of sent commands exceeds `max_reject`
+    percent, or whose completed throughput grew by less than `min_gain`
+    (relative) over the previous row while more commands were sent. None if
+    the server kept up at every level.
+    """
+    previous = None
+    for row in rows:
+        if row["failed"] or row["p99 ms"] > slo_ms or row["reject %"] > max_reject:
+            return row
+        if previous is not None and row["sent/s"] > previous["sent/s"] * (1 + min_gain) \
+                and row["done/s"] < previous["done/s"] * (1 + min_gain):
+            return row
+        previous = row
+    return None
+
+
+def format_report(rows: Sequence[Dict[str, Any]], saturation: Dict[str, Any] | None, slo_ms: float) -> str:
+    header = list(rows[0]) if rows else []
+    lines = ["| " + " | ".join(header) + " |", "|" + " ---: |" * len(header)]
+    for row in rows:
+        lines.append("| " + " | ".join(f"{v:.1f}" if isinstance(v, float) else str(v) for v in row.values()) + " |")
+    if saturation is None:
+        lines.append(f"\nNo saturation: p99 stayed under {slo_ms:.0f} ms, few commands were rejected "
+                     f"and throughput kept up at every level.")
+    else:
+        lines.append(f"\nSaturation at {saturation['clients']} clients "
+                     f"(p99 {saturation['p99 ms']:.1f} ms, {saturation['done/s']:.1f} commands/s completed, "
+                     f"{saturation['reject %']:.1f}% rejected).")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive server.py with simulated Socket.IO clients.")
+    parser.add_argument('--url', type=str, default=LoadConfig.url)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[10, 50, 200, 1000])
+    parser.add_argument('--duration', type=float, default=LoadConfig.duration, help="Seconds per level")
+    parser.add_argument('--ramp', type=float, default=LoadConfig.ramp, help="Seconds to connect a level's clients")
+    parser.add_argument('--next-round-rate', type=float, default=LoadConfig.next_round_rate,
+                        help="next_round commands per client per second")
+    parser.add_argument('--start-rate', type=float, default=LoadConfig.start_rate,
+                        help="start_game commands per client per second")
+    parser.add_argument('--format', type=str, default=None, help="Wire format to negotiate (tjb1, msgpack, json)")
+    parser.add_argument('--deflate', action='store_true')
+    parser.add_argument('--processes', type=int, default=1)
+    parser.add_argument('--slo-ms', type=float, default=250.0, help="p99 command latency budget")
+    parser.add_argument('--min-gain', type=float, default=0.1)
+    parser.add_argument('--max-reject', type=float, default=1.0, help="Rejected percentage of sent commands")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    if socketio is None:
+        parser.error('The asyncio Socket.IO client is not installed: pip install "python-socketio[asyncio_client]"')
+
+    config = LoadConfig(url=args.url, duration=args.duration, ramp=args.ramp, next_round_rate=args.next_round_rate,
+                        start_rate=args.start_rate, wire_format=args.format, deflate=args.deflate, seed=args.seed)
+    rows = []
+    for clients in args.concurrency:
+        row = run_level(config, clients, args.processes).row()
+        print(f"{clients} clients: {row['done/s']:.1f} commands/s, p99 {row['p99 ms']:.1f} ms, "
+              f"{row['reject %']:.1f}% rejected", flush=True)
+        rows.append(row)
+    print(format_report(rows, find_saturation(rows, args.slo_ms, args.min_gain, args.max_reject), args.slo_ms))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+# src/lobby.py
+
+"""
+Large-lobby execution mode, for event-style games with hundreds of players.
+
+The default engine is written for a table of a few players: every mover scans
+all players for a Lun Dao opponent, every group effect touches each player in
+turn and Ju only advances once every seat has started a round. A game created
+with `Game(..., large_lobby=True)` keeps the per-round cost close to O(n):
+
+- Setup deals from enough copies of the basic deck for every hand and spreads
+  the players over all zones of the board.
+- After all players have moved, they are bucketed by zone once. In each zone,
+  the players who arrived this round challenge distinct occupants in seat
+  order (`pair_duels`), so a player duels at most once per round.
+- The same buckets answer same-zone targets in the effect engine (and, with
+  `RulesConfig.local_choice_targets`, narrow single-opponent choices to the
+  zone; that is a rules change, so it is off by default), and resource
+  changes aimed at `ALL_PLAYERS` / `OPPONENT_ALL` are accumulated in
+  `GroupDeltas` and applied in one pass.
+- Ju advances every `JU_ROUNDS` rounds rather than once per cycle of seats.
+
+Benchmark (per-round time should stay roughly flat per player):
+    python -m src.lobby --players 50 200 500 --rounds 20
+"""
+
+import argparse
+import math
+import statistics
+import time
+from typing import Dict, Iterable, List, Set, Tuple
+
+# Forward-declare to avoid circular import
+if False:
+    from .game_board import GameBoard
+    from .player import Player
+
+# Rounds per Ju in a large lobby, the cycle of a four-seat table
+JU_ROUNDS = 4
+
+
+def deck_copies(players: int, hand_size: int, deck_size: int) -> int:
+    """Copies of the basic deck needed to deal every hand twice over."""
+    if deck_size == 0:
+        return 1
+    return max(1, math.ceil(2 * players * hand_size / deck_size))
+
+
+def starting_zones(board: 'GameBoard', players: int) -> List[str]:
+    """Starting zone of each seat: the zones of the board in order, round-robin."""
+    zone_ids = list(board.zones)
+    return [zone_ids[i % len(zone_ids)] for i in range(players)]
+
+
+def zone_buckets(players: Iterable['Player']) -> Dict[str, List['Player']]:
+    """Groups players by position, keeping seat order within each zone."""
+    buckets: Dict[str, List['Player']] = {}
+    for player in players:
+        if player.position is not None:
+            buckets.setdefault(player.position, []).append(player)
+    return buckets
+
+
+def pair_duels(occupants: List['Player'], arrived: Set[int]) -> List[Tuple['Player', 'Player']]:
+    """
+    Lun Dao pairings in one zone. Each player who arrived this round (by id)
+    challenges the first occupant in seat order who is not yet in a duel.
+    Eliminated players are skipped. Runs in O(len(occupants)).
+    """
+    candidates = [p for p in occupants if not p.is_eliminated]
+    busy: Set[int] = set()
+    pairs = []
+    next_defender = 0
+    for challenger in candidates:
+        if id(challenger) not in arrived or id(challenger) in busy:
+            continue
+        # Everyone skipped here is either busy or the challenger, who is busy after this duel
+        while next_defender < len(candidates) and (
+                candidates[next_defender] is challenger or id(candidates[next_defender]) in busy):
+            next_defender += 1
+        if next_defender == len(candidates):
+            break
+        defender = candidates[next_defender]
+        busy.update((id(challenger), id(defender)))
+        pairs.append((challenger, defender))
+    return pairs
+
+
+class GroupDeltas:
+    """
+    Resource changes aimed at every player (`ALL_PLAYERS`) or every player but
+    the source (`OPPONENT_ALL`), accumulated instead of applied one player at a
+    time: k group effects in an n-player game cost O(k + n) instead of O(k * n).
+    `settle` brings a single player up to date before one of their resources is
+    read; `flush` applies everything pending to all players.
+    """
+
+    def __init__(self):
+        self._totals: Dict[str, int] = {}
+        # id(player) -> resource -> part of the totals already applied to (or not meant for) the player
+        self._settled: Dict[int, Dict[str, int]] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self._totals)
+
+    def add(self, resource: str, delta: int, exclude: 'Player | None' = None):
+        self._totals[resource] = self._totals.get(resource, 0) + delta
+        if exclude is not None:
+            settled = self._settled.setdefault(id(exclude), {})
+            settled[resource] = settled.get(resource, 0) + delta
+
+    def settle(self, player: 'Player'):
+        if not self._totals:
+            return
+        settled = self._settled.setdefault(id(player), {})
+        for resource, total in self._totals.items():
+            delta = total - settled.get(resource, 0)
+            if delta:
+                player.change_resource(resource, delta)
+            settled[resource] = total
+
+    def flush(self, players: Iterable['Player']):
+        if not self._totals:
+            return
+        for player in players:
+            self.settle(player)
+        self._totals.clear()
+        self._settled.clear()
+
+
+# --- Benchmark ---
+
+def benchmark(sizes: List[int], rounds: int, seed: int, assets_path: str, policy_spec: str) -> List[Dict[str, float]]:
+    """Plays one large-lobby game per size and reports the median wall time of a round."""
+    from .simulation import play_game
+    from .tournament import make_policy
+
+    rows = []
+    for size in sizes:
+        stamps = []
+        play_game([make_policy(policy_spec) for _ in range(size)], assets_path, seed, max_rounds=rounds,
+                  large_lobby=True, on_round=lambda game, number: stamps.append(time.perf_counter()))
+        # The first stamp only marks the end of round 1, so round times start with round 2
+        round_times = [b - a for a, b in zip(stamps, stamps[1:])]
+        median = statistics.median(round_times) if round_times else float("nan")
+        rows.append({"players": size, "rounds": len(stamps), "round_ms": median * 1000,
+                     "player_round_us": median * 1e6 / size})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time rounds of large-lobby games.")
+    parser.add_argument('--players', type=int, nargs='+', default=[50, 100, 200, 500])
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--assets', type=str, default='tianji-fix-data-and/assets')
+    parser.add_argument('--policy', type=str, default='heuristic')
+    args = parser.parse_args()
+
+    print("| players | rounds | ms / round | us / player-round |")
+    print("|---|---|---|---|")
+    for row in benchmark(args.players, args.rounds, args.seed, args.assets, args.policy):
+        print(f"| {row['players']} | {row['rounds']} | {row['round_ms']:.2f} | {row['player_round_us']:.1f} |")
+
+
+if __name__ == '__main__':
+    main()
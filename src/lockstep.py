@@ -0,0 +1,200 @@
+# src/lockstep.py
+
+"""
+Lockstep synchronization: send inputs, not state.
+
+Given the card data, the rules, the seed of the module-level RNG (which drives
+deck shuffles) and the players' decisions, the engine always produces the same
+game. A lockstep client runs the same engine locally, so instead of the full
+state after every round the server sends:
+
+    start     {"protocol", "seed", "assets", "players", "rules", "large_lobby", "checksum"}
+    round     {"round", "decisions", "checksum"}
+    snapshot  {"round", "state", "checksum"}     only to a client that reports a desync
+
+`assets` is the asset-bundle hash (`GameLoader.bundle_hash`); a client whose
+cards differ must stay on full-state updates. `decisions` is the flat list
+[seat, code, seat, code, ...] of the action codes chosen in the round, in the
+order the engine asked for them. `checksum` identifies the state after setup or
+after the round. A client that computes a different checksum (or is asked for a
+decision it was not sent) has desynced; it asks for a snapshot, which carries
+the `to_dict` serialization, and switches to full-state updates.
+
+The engine's RNG state is swapped in around every engine call (`EngineRandom`),
+so other code in the server process that uses `random` cannot desync a game.
+Policies used by the host must not draw from the module-level RNG for the same
+reason; `LockstepHost` gives its default policy a generator of its own.
+"""
+
+import random
+import struct
+from collections import deque
+from contextlib import contextmanager
+from hashlib import blake2b
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Sequence, Tuple
+
+from .game import Game
+from .game_loader import GameLoader
+from .policy import DecisionPolicy, PrototypePolicy
+from .rules import RulesConfig
+
+# Forward-declare to avoid circular import
+if False:
+    from .game_state import GameState
+    from .player import Player
+
+PROTOCOL_VERSION = 1
+
+
+class DesyncError(Exception):
+    """A replayed round diverged from the host's."""
+
+
+def state_checksum(game_state: 'GameState') -> str:
+    """
+    16 hex digits identifying the state: its Zobrist hash plus the exact
+    resources, fund and pile sizes (the Zobrist hash only sees resource buckets).
+    """
+    values = [game_state.game_fund, game_state.ju_number, game_state.current_turn]
+    for player in game_state.players:
+        values += (player.health, player.gold, player.yin_yang)
+    for deck in game_state.decks.values():
+        values += (len(deck), deck.discard_count)
+    digest = blake2b(game_state.hash.to_bytes(8, "little"), digest_size=8)
+    digest.update(struct.pack(f"<{len(values)}q", *values))
+    return digest.hexdigest()
+
+
+class EngineRandom:
+    """The module-level RNG state of one game, active only inside `active()`."""
+
+    def __init__(self, seed: int):
+        self.state = random.Random(seed).getstate()
+
+    @contextmanager
+    def active(self) -> Iterator[None]:
+        outer = random.getstate()
+        random.setstate(self.state)
+        try:
+            yield
+        finally:
+            self.state = random.getstate()
+            random.setstate(outer)
+
+
+def _flatten(decisions: Sequence[Tuple[int, int]]) -> List[int]:
+    return [value for decision in decisions for value in decision]
+
+
+class ReplayPolicy(DecisionPolicy):
+    """Answers the engine's decisions from a host's decision list, checking each against the local state."""
+
+    def __init__(self):
+        self.pending: Deque[Tuple[int, int]] = deque()
+
+    def feed(self, decisions: Sequence[int]):
+        self.pending.extend(zip(decisions[::2], decisions[1::2]))
+
+    def choose(self, game_state: 'GameState', player: 'Player', actions: List[int]) -> int:
+        if not self.pending:
+            raise DesyncError(f"No decision was sent for {player.name}")
+        seat, code = self.pending.popleft()
+        if seat != game_state.seat_of(player) or code not in actions:
+            raise DesyncError(f"Decision ({seat}, {code}) does not fit {player.name}'s legal actions")
+        return code
+
+
+class LockstepHost:
+    """Runs the authoritative game and produces the lockstep messages for it."""
+
+    def __init__(self, player_names: List[str], assets_path: str, seed: int, rules: RulesConfig | None = None,
+                 policy: DecisionPolicy | None = None, large_lobby: bool = False):
+        self.seed = seed
+        self.rng = EngineRandom(seed)
+        policy = policy or PrototypePolicy(rng=random.Random(seed))
+        self.game = Game(player_names, assets_path, policy=policy, rules=rules, large_lobby=large_lobby)
+        self.game.decision_log = []
+        self.assets_hash = self.game.loader.bundle_hash()
+        self.round = 0
+        self.start_message: Dict[str, Any] | None = None
+        # Every round message so far, for clients that join a running game
+        self.history: List[Dict[str, Any]] = []
+
+    @property
+    def started(self) -> bool:
+        return self.start_message is not None
+
+    def start(self) -> Dict[str, Any]:
+        with self.rng.active():
+            self.game.setup()
+        self.start_message = {
+            "protocol": PROTOCOL_VERSION,
+            "seed": self.seed,
+            "assets": self.assets_hash,
+            "players": list(self.game.player_names),
+            "rules": self.game.rules.to_dict(),
+            "large_lobby": self.game.large_lobby,
+            "checksum": state_checksum(self.game.game_state),
+        }
+        return self.start_message
+
+    def run_round(self) -> Dict[str, Any]:
+        self.round += 1
+        with self.rng.active():
+            self.game.run_round(self.round)
+        message = {
+            "round": self.round,
+            "decisions": _flatten(self.game.decision_log),
+            "checksum": state_checksum(self.game.game_state),
+        }
+        self.game.decision_log.clear()
+        self.history.append(message)
+        return message
+
+    def snapshot(self) -> Dict[str, Any]:
+        state = self.game.game_state
+        return {"round": self.round, "state": state.to_dict(), "checksum": state_checksum(state)}
+
+    def accepts(self, protocol: int, assets_hash: str) -> bool:
+        """Whether a client speaking `protocol` with card data `assets_hash` can follow this game in lockstep."""
+        return protocol == PROTOCOL_VERSION and assets_hash == self.assets_hash
+
+
+class LockstepClient:
+    """
+    Reference client: replays the host's rounds on a local engine. `start` and
+    `apply_round` return False on a desync, after which the client should
+    request a snapshot.
+    """
+
+    def __init__(self, assets_path: str):
+        self.assets_path = assets_path
+        self.assets_hash = GameLoader(Path(assets_path)).bundle_hash()
+        self.policy = ReplayPolicy()
+        self.game: Game | None = None
+        self.rng: EngineRandom | None = None
+
+    def start(self, message: Dict[str, Any]) -> bool:
+        if message["protocol"] != PROTOCOL_VERSION or message["assets"] != self.assets_hash:
+            return False
+        self.rng = EngineRandom(message["seed"])
+        self.game = Game(message["players"], self.assets_path, policy=self.policy,
+                         rules=RulesConfig.from_dict(message["rules"]), large_lobby=message["large_lobby"])
+        with self.rng.active():
+            self.game.setup()
+        return self.checksum == message["checksum"]
+
+    def apply_round(self, message: Dict[str, Any]) -> bool:
+        self.policy.pending.clear()
+        self.policy.feed(message["decisions"])
+        try:
+            with self.rng.active():
+                self.game.run_round(message["round"])
+        except DesyncError:
+            return False
+        return not self.policy.pending and self.checksum == message["checksum"]
+
+    @property
+    def checksum(self) -> str:
+        return state_checksum(self.game.game_state)
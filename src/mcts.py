@@ -0,0 +1,275 @@
+# src/mcts.py
+
+"""
+A Monte Carlo tree search bot that plugs into the decision-policy hook.
+
+The search is open loop: tree nodes are keyed by the bot's own action codes
+rather than by game states, so the hidden and random parts of the game (deck
+order, other players' choices) are resampled on every iteration. Each
+iteration thaws the root snapshot, resumes the interrupted round from the
+decision point, lets the bot walk the tree at each of its own decisions and
+plays out a few more rounds with a cheap rollout policy.
+
+Only placement and movement decisions are searched. Duel cards, CHOICE
+options and targets are settled inside a single effect and go to `fallback`.
+
+With `workers > 0` the search is root parallel: each worker process grows its
+own tree from the same snapshot for the same time budget, and the root
+statistics are summed. The local tree is kept and, when the next decision
+follows the chosen action, its subtree becomes the next root.
+
+An optional `TranspositionTable` caches rollout results by the state hash
+reached at the end of the interrupted round. Once a state has enough samples,
+iterations that reach it again use the cached mean instead of playing on.
+"""
+
+import logging
+import math
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from .actions import ActionKind, kind_of
+from .game import Game
+from .persistent_state import PersistentGameState
+from .policy import DecisionPolicy, HeuristicPolicy
+from .simulation import quiet_logging
+from .transposition import TranspositionTable
+from . import zobrist
+
+# Forward-declare to avoid circular import
+if False:
+    from .game_state import GameState
+    from .player import Player
+
+SEARCHED_KINDS = (ActionKind.PLACE_CARD, ActionKind.MOVE)
+
+# Rollouts a transposition-table entry needs before it replaces further rollouts
+TABLE_MIN_SAMPLES = 8
+
+
+class _Node:
+    __slots__ = ("children", "visits", "value")
+
+    def __init__(self):
+        self.children: Dict[int, _Node] = {}
+        self.visits = 0
+        self.value = 0.0
+
+
+@dataclass
+class SearchStats:
+    iterations: int = 0
+    nodes: int = 0          # Tree nodes created during the search
+    elapsed: float = 0.0
+    reused_visits: int = 0  # Visits inherited from the previous decision's subtree
+    table_hits: int = 0     # Iterations scored from the transposition table
+    # Root action -> visits, summed over all processes
+    root_visits: Dict[int, int] = field(default_factory=dict)
+
+    @property
+    def nodes_per_second(self) -> float:
+        return self.nodes / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def iterations_per_second(self) -> float:
+        return self.iterations / self.elapsed if self.elapsed else 0.0
+
+
+class _TreePolicy(DecisionPolicy):
+    """Walks the tree at the searching player's decisions during one iteration."""
+
+    def __init__(self, root: _Node, c: float, rng: random.Random, fallback: DecisionPolicy, stats: SearchStats):
+        self.node: _Node | None = root
+        self.path: List[_Node] = [root]
+        self.c = c
+        self.rng = rng
+        self.fallback = fallback
+        self.stats = stats
+
+    def choose(self, game_state: 'GameState', player: 'Player', actions: List[int]) -> int:
+        if kind_of(actions[0]) not in SEARCHED_KINDS:
+            return self.fallback.choose(game_state, player, actions)
+        node = self.node
+        if node is None:
+            # Below the tree: plain rollout
+            return self.rng.choice(actions)
+
+        untried = [a for a in actions if a not in node.children]
+        if untried:
+            action = self.rng.choice(untried)
+            child = node.children[action] = _Node()
+            self.stats.nodes += 1
+            self.path.append(child)
+            self.node = None
+            return action
+
+        log_n = math.log(node.visits or 1)
+        def ucb(a: int) -> float:
+            child = node.children[a]
+            return child.value / child.visits + self.c * math.sqrt(log_n / child.visits)
+        action = max(actions, key=ucb)
+        self.node = node.children[action]
+        self.path.append(self.node)
+        return action
+
+
+def _reward(game_state: 'GameState', player_id: str) -> float:
+    """The searching player's share of the table's combined health and gold, in [0, 1]."""
+    def score(p: 'Player') -> int:
+        return 0 if p.is_eliminated else max(0, p.health) + max(0, p.gold)
+    total = sum(score(p) for p in game_state.players)
+    me = game_state.get_player(player_id)
+    return score(me) / total if total else 0.0
+
+
+def _search(root: _Node, snapshot: PersistentGameState, player_id: str, deadline: float, max_iterations: int | None,
+            rollout_rounds: int, c: float, rng: random.Random, stats: SearchStats,
+            table: TranspositionTable | None = None):
+    rollout_policy = HeuristicPolicy(rng)
+    phase = snapshot.current_phase
+    perspective = zobrist.key("perspective", player_id)
+    with quiet_logging():
+        while time.perf_counter() < deadline and (max_iterations is None or stats.iterations < max_iterations):
+            tree_policy = _TreePolicy(root, c, rng, rollout_policy, stats)
+            game = Game.from_state(snapshot.thaw(), policy=rollout_policy)
+            game.set_policy(player_id, tree_policy)
+            game.resume_round(phase)
+
+            reward = None
+            if table is not None:
+                state_key = game.game_state.hash ^ perspective
+                entry = table.get(state_key)
+                if entry is not None and entry[0] >= TABLE_MIN_SAMPLES:
+                    reward = entry[1] / entry[0]
+                    stats.table_hits += 1
+            if reward is None:
+                for _ in range(rollout_rounds):
+                    game.run_round(game.game_state.current_turn + 1)
+                reward = _reward(game.game_state, player_id)
+                if table is not None:
+                    samples, total = entry or (0, 0.0)
+                    table.store(state_key, (samples + 1, total + reward), weight=samples + 1)
+            for node in tree_policy.path:
+                node.visits += 1
+                node.value += reward
+            stats.iterations += 1
+
+
+def _worker_search(snapshot: PersistentGameState, player_id: str, time_budget: float, max_iterations: int | None,
+                   rollout_rounds: int, c: float, seed: int,
+                   table_capacity: int | None) -> Tuple[Dict[int, Tuple[int, float]], SearchStats]:
+    """Runs an independent search in a pool process and returns its root statistics."""
+    rng = random.Random(seed)
+    random.seed(seed)  # Deck shuffles use the module-level generator
+    root, stats = _Node(), SearchStats()
+    start = time.perf_counter()
+    table = TranspositionTable(table_capacity) if table_capacity else None
+    _search(root, snapshot, player_id, start + time_budget, max_iterations, rollout_rounds, c, rng, stats, table)
+    stats.elapsed = time.perf_counter() - start
+    return {a: (child.visits, child.value) for a, child in root.children.items()}, stats
+
+
+class MCTSPolicy(DecisionPolicy):
+    """
+    Chooses placements and moves by Monte Carlo tree search within a time budget.
+
+    Args:
+        time_budget: Seconds of search per decision.
+        workers: Extra processes for root-parallel search (0 searches in-process only).
+        max_iterations: Optional cap on iterations per process, e.g., for reproducible tests.
+        rollout_rounds: Full rounds played after the current one before scoring.
+        exploration: The UCB1 exploration constant.
+        table: Optional transposition table, which may be shared with other bots and simulators.
+            Worker processes each use a private table of the same capacity.
+    """
+
+    def __init__(self, time_budget: float = 0.5, workers: int = 0, max_iterations: int | None = None,
+                 rollout_rounds: int = 2, exploration: float = 1.4, fallback: DecisionPolicy | None = None,
+                 rng: random.Random | None = None, table: TranspositionTable | None = None):
+        self.time_budget = time_budget
+        self.workers = workers
+        self.max_iterations = max_iterations
+        self.rollout_rounds = rollout_rounds
+        self.exploration = exploration
+        self.rng = rng or random.Random()
+        self.fallback = fallback or HeuristicPolicy(self.rng)
+        self.table = table
+        self.last_stats: SearchStats | None = None
+        self._trees: Dict[str, _Node] = {}   # player_id -> subtree to reuse at the next decision
+        self._pool: ProcessPoolExecutor | None = None
+
+    def close(self):
+        """Shuts down the worker pool, if one was started."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def choose(self, game_state: 'GameState', player: 'Player', actions: List[int]) -> int:
+        if len(actions) == 1:
+            return actions[0]
+        if kind_of(actions[0]) not in SEARCHED_KINDS or game_state.current_phase not in ("PLACEMENT", "MOVEMENT"):
+            return self.fallback.choose(game_state, player, actions)
+
+        root = self._reusable_root(player.player_id, actions)
+        stats = SearchStats(reused_visits=root.visits)
+        snapshot = PersistentGameState.freeze(game_state)
+
+        futures = []
+        if self.workers > 0:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            futures = [
+                self._pool.submit(_worker_search, snapshot, player.player_id, self.time_budget, self.max_iterations,
+                                  self.rollout_rounds, self.exploration, self.rng.randrange(2 ** 32),
+                                  self.table.capacity if self.table is not None else None)
+                for _ in range(self.workers)
+            ]
+
+        # Rollouts shuffle decks with the module-level generator, which the real game draws from too (and
+        # lockstep replays): search on a private seed, as the workers do, and leave the game's sequence untouched
+        seed = self.rng.randrange(2 ** 32)
+        saved = random.getstate()
+        random.seed(seed)
+        start = time.perf_counter()
+        try:
+            _search(root, snapshot, player.player_id, start + self.time_budget, self.max_iterations,
+                    self.rollout_rounds, self.exploration, random.Random(seed), stats, self.table)
+        finally:
+            random.setstate(saved)
+
+        visits = {a: (child.visits, child.value) for a, child in root.children.items()}
+        for future in futures:
+            worker_visits, worker_stats = future.result()
+            stats.iterations += worker_stats.iterations
+            stats.nodes += worker_stats.nodes
+            stats.table_hits += worker_stats.table_hits
+            for a, (n, v) in worker_visits.items():
+                local_n, local_v = visits.get(a, (0, 0.0))
+                visits[a] = (local_n + n, local_v + v)
+        stats.elapsed = time.perf_counter() - start
+        stats.root_visits = {a: n for a, (n, _) in visits.items()}
+        self.last_stats = stats
+
+        legal = [a for a in actions if a in visits]
+        if not legal:
+            return self.fallback.choose(game_state, player, actions)
+        best = max(legal, key=lambda a: (visits[a][0], visits[a][1]))
+        self._trees[player.player_id] = root.children.get(best) or _Node()
+
+        logging.info(f"MCTS for {player.name}: {stats.iterations} iterations ({stats.iterations_per_second:.0f}/s), "
+                     f"{stats.nodes} new nodes ({stats.nodes_per_second:.0f}/s), "
+                     f"reused {stats.reused_visits} visits")
+        return best
+
+    def _reusable_root(self, player_id: str, actions: List[int]) -> _Node:
+        """Returns the subtree below the previous decision if it was explored for this kind of decision."""
+        node = self._trees.pop(player_id, None)
+        if node is None or not node.children:
+            return _Node()
+        if any(a not in actions for a in node.children):
+            # The tree was grown for a different decision (e.g., the game took a path no iteration sampled)
+            return _Node()
+        return node
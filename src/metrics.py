@@ -0,0 +1,298 @@
+# src/metrics.py
+
+"""
+Streaming aggregation of game metrics in bounded memory.
+
+Every statistic here is updated one game at a time and can be merged with
+another partial aggregate of the same kind, so pool workers can each summarize
+their own games and the parent combines the results. Memory does not grow with
+the number of games:
+
+- `RunningStats`: count, mean and variance (Welford), min and max.
+- `QuantileSketch`: a DDSketch-style log-bucket histogram. Quantiles are within
+  `relative_accuracy` of the true value, and merging two sketches just adds
+  their bucket counts.
+- `MetricsAggregate`: the per-game metrics written to `latest_metrics.json`,
+  plus per-card counters.
+"""
+
+import math
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Sequence
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class RunningStats:
+    """Welford's online mean and variance, mergeable with Chan's parallel update."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, x: float):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+
+    def merge(self, other: 'RunningStats'):
+        if not other.count:
+            return
+        if not self.count:
+            self.count, self.mean, self.m2, self.min, self.max = other.count, other.mean, other.m2, other.min, other.max
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stdev(self) -> float:
+        return math.sqrt(self.variance)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"count": self.count, "mean": self.mean, "m2": self.m2,
+                "min": self.min if self.count else None, "max": self.max if self.count else None}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'RunningStats':
+        stats = cls()
+        stats.count, stats.mean, stats.m2 = data["count"], data["mean"], data["m2"]
+        if stats.count:
+            stats.min, stats.max = data["min"], data["max"]
+        return stats
+
+
+class QuantileSketch:
+    """
+    Relative-error quantile sketch over log-spaced buckets (DDSketch).
+
+    Positive and negative values have their own buckets and zero has a plain
+    counter. When a side exceeds `max_buckets`, its buckets closest to zero are
+    collapsed together, which keeps memory bounded while preserving the
+    accuracy of the upper quantiles.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_buckets: int = 2048):
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.positive: Dict[int, int] = defaultdict(int)
+        self.negative: Dict[int, int] = defaultdict(int)
+        self.zero = 0
+        self.count = 0
+
+    def _index(self, x: float) -> int:
+        return math.ceil(math.log(x) / self._log_gamma)
+
+    def _value(self, index: int) -> float:
+        return 2 * self._gamma ** index / (self._gamma + 1)
+
+    def add(self, x: float, count: int = 1):
+        self.count += count
+        if x > 0:
+            self.positive[self._index(x)] += count
+            self._collapse(self.positive)
+        elif x < 0:
+            self.negative[self._index(-x)] += count
+            self._collapse(self.negative)
+        else:
+            self.zero += count
+
+    def merge(self, other: 'QuantileSketch'):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different accuracies.")
+        for index, count in other.positive.items():
+            self.positive[index] += count
+        for index, count in other.negative.items():
+            self.negative[index] += count
+        self.zero += other.zero
+        self.count += other.count
+        self._collapse(self.positive)
+        self._collapse(self.negative)
+
+    def quantile(self, q: float) -> float | None:
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        # Negative values from most to least negative: largest magnitude index first
+        for index in sorted(self.negative, reverse=True):
+            seen += self.negative[index]
+            if seen > rank:
+                return -self._value(index)
+        seen += self.zero
+        if seen > rank:
+            return 0.0
+        for index in sorted(self.positive):
+            seen += self.positive[index]
+            if seen > rank:
+                return self._value(index)
+        return self._value(max(self.positive)) if self.positive else 0.0
+
+    def percentiles(self, quantiles: Sequence[float] = QUANTILES) -> Dict[str, float | None]:
+        return {f"p{round(q * 100)}": self.quantile(q) for q in quantiles}
+
+    def _collapse(self, store: Dict[int, int]):
+        if len(store) <= self.max_buckets:
+            return
+        indices = sorted(store)
+        excess = indices[:len(store) - self.max_buckets + 1]
+        total = sum(store.pop(i) for i in excess)
+        store[excess[-1]] += total
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"relative_accuracy": self.relative_accuracy, "max_buckets": self.max_buckets, "zero": self.zero,
+                "positive": {str(k): v for k, v in self.positive.items()},
+                "negative": {str(k): v for k, v in self.negative.items()}}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'QuantileSketch':
+        sketch = cls(data["relative_accuracy"], data["max_buckets"])
+        sketch.zero = data["zero"]
+        sketch.positive.update({int(k): v for k, v in data["positive"].items()})
+        sketch.negative.update({int(k): v for k, v in data["negative"].items()})
+        sketch.count = sketch.zero + sum(sketch.positive.values()) + sum(sketch.negative.values())
+        return sketch
+
+
+class Metric:
+    """A RunningStats and a QuantileSketch over the same values."""
+
+    def __init__(self):
+        self.stats = RunningStats()
+        self.sketch = QuantileSketch()
+
+    def add(self, x: float):
+        self.stats.add(x)
+        self.sketch.add(x)
+
+    def merge(self, other: 'Metric'):
+        self.stats.merge(other.stats)
+        self.sketch.merge(other.sketch)
+
+    def summary(self) -> Dict[str, Any]:
+        if not self.stats.count:
+            return {"mean": None, "stdev": None, "min": None, "max": None, **self.sketch.percentiles()}
+        # Bucket midpoints can fall just outside the observed range; the exact extremes are known.
+        percentiles = {name: min(max(value, self.stats.min), self.stats.max)
+                       for name, value in self.sketch.percentiles().items()}
+        return {"mean": self.stats.mean, "stdev": self.stats.stdev, "min": self.stats.min, "max": self.stats.max,
+                **percentiles}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"stats": self.stats.to_dict(), "sketch": self.sketch.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Metric':
+        metric = cls()
+        metric.stats = RunningStats.from_dict(data["stats"])
+        metric.sketch = QuantileSketch.from_dict(data["sketch"])
+        return metric
+
+
+@dataclass
+class GameRecord:
+    """What one finished game contributes to the aggregate."""
+    rounds: int
+    outcomes: List[float]            # Per seat, 1 for the winner (shared on ties)
+    gold: List[int]                  # Final gold per seat
+    health: List[int]                # Final health per seat
+    plays: List[Dict[str, int]]      # Cards placed per seat: card_id -> count
+    gold_curve: List[float] = field(default_factory=list)  # Mean gold / starting gold after each round
+
+
+class MetricsAggregate:
+    """Mergeable summary of any number of games."""
+
+    CURVE_LENGTH = 10
+
+    def __init__(self):
+        self.games = 0
+        self.game_length = Metric()
+        self.final_gold = Metric()
+        self.final_health = Metric()
+        self.card_plays: Dict[str, int] = defaultdict(int)   # Total placements
+        self.card_games: Dict[str, int] = defaultdict(int)   # Player-games in which the card was placed
+        self.card_wins: Dict[str, float] = defaultdict(float)  # ...and that player won
+        self.resource_curve = [RunningStats() for _ in range(self.CURVE_LENGTH)]
+
+    def add_game(self, record: GameRecord):
+        self.games += 1
+        self.game_length.add(record.rounds)
+        for seat, plays in enumerate(record.plays):
+            self.final_gold.add(record.gold[seat])
+            self.final_health.add(record.health[seat])
+            for card_id, count in plays.items():
+                if count:
+                    self.card_plays[card_id] += count
+                    self.card_games[card_id] += 1
+                    self.card_wins[card_id] += record.outcomes[seat]
+        for stats, value in zip(self.resource_curve, record.gold_curve):
+            stats.add(value)
+
+    def merge(self, other: 'MetricsAggregate'):
+        self.games += other.games
+        self.game_length.merge(other.game_length)
+        self.final_gold.merge(other.final_gold)
+        self.final_health.merge(other.final_health)
+        for card_id in other.card_plays:
+            self.card_plays[card_id] += other.card_plays[card_id]
+            self.card_games[card_id] += other.card_games[card_id]
+            self.card_wins[card_id] += other.card_wins[card_id]
+        for mine, theirs in zip(self.resource_curve, other.resource_curve):
+            mine.merge(theirs)
+
+    def to_metrics_json(self) -> Dict[str, Any]:
+        """The `latest_metrics.json` shape, plus distribution summaries with percentiles."""
+        return {
+            "card_winrate": {cid: round(self.card_wins[cid] / self.card_games[cid], 3) for cid in sorted(self.card_games)},
+            "card_usage": {cid: self.card_plays[cid] for cid in sorted(self.card_plays)},
+            "avg_game_length": self.game_length.stats.mean,
+            "resource_curve": [stats.mean for stats in self.resource_curve if stats.count],
+            "games": self.games,
+            "game_length": self.game_length.summary(),
+            "final_gold": self.final_gold.summary(),
+            "final_health": self.final_health.summary(),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """A lossless partial aggregate, e.g., to send from a worker or to store and merge later."""
+        return {
+            "games": self.games,
+            "game_length": self.game_length.to_dict(),
+            "final_gold": self.final_gold.to_dict(),
+            "final_health": self.final_health.to_dict(),
+            "card_plays": dict(self.card_plays),
+            "card_games": dict(self.card_games),
+            "card_wins": dict(self.card_wins),
+            "resource_curve": [stats.to_dict() for stats in self.resource_curve],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'MetricsAggregate':
+        aggregate = cls()
+        aggregate.games = data["games"]
+        aggregate.game_length = Metric.from_dict(data["game_length"])
+        aggregate.final_gold = Metric.from_dict(data["final_gold"])
+        aggregate.final_health = Metric.from_dict(data["final_health"])
+        aggregate.card_plays.update(data["card_plays"])
+        aggregate.card_games.update(data["card_games"])
+        aggregate.card_wins.update(data["card_wins"])
+        aggregate.resource_curve = [RunningStats.from_dict(d) for d in data["resource_curve"]]
+        return aggregate
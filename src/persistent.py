@@ -0,0 +1,274 @@
+# src/persistent.py
+
+"""
+Small persistent (immutable, structurally shared) collections used by the
+branching game-state representation. Every "modifying" method returns a new
+collection that shares all untouched nodes with the original.
+"""
+
+from typing import Any, Iterable, Iterator, Tuple
+
+_BITS = 5
+_WIDTH = 1 << _BITS
+_MASK = _WIDTH - 1
+_HASH_MASK = (1 << 64) - 1
+
+
+# --- Persistent Map (hash array mapped trie) ---
+
+class _Node:
+    __slots__ = ("bitmap", "entries")
+
+    def __init__(self, bitmap: int, entries: tuple):
+        self.bitmap = bitmap
+        self.entries = entries  # Each entry is a (key, value, hash) leaf tuple or a sub-node
+
+
+class _Collision:
+    __slots__ = ("hash", "pairs")
+
+    def __init__(self, key_hash: int, pairs: tuple):
+        self.hash = key_hash
+        self.pairs = pairs
+
+
+_EMPTY_NODE = _Node(0, ())
+
+
+def _split(a: tuple, b: tuple, shift: int) -> _Node:
+    ia = (a[2] >> shift) & _MASK
+    ib = (b[2] >> shift) & _MASK
+    if ia == ib:
+        return _Node(1 << ia, (_split(a, b, shift + _BITS),))
+    entries = (a, b) if ia < ib else (b, a)
+    return _Node((1 << ia) | (1 << ib), entries)
+
+
+def _assoc(node, key_hash: int, key: Any, value: Any, shift: int):
+    """Returns (new_node, added) with the key set; new_node is `node` itself if nothing changed."""
+    if isinstance(node, _Collision):
+        if key_hash == node.hash:
+            for i, (k, v) in enumerate(node.pairs):
+                if k == key:
+                    if v is value:
+                        return node, False
+                    return _Collision(key_hash, node.pairs[:i] + ((key, value),) + node.pairs[i + 1:]), False
+            return _Collision(key_hash, node.pairs + ((key, value),)), True
+        # Push the collision node one level down and insert next to it
+        wrapper = _Node(1 << ((node.hash >> shift) & _MASK), (node,))
+        return _assoc(wrapper, key_hash, key, value, shift)
+
+    bit = 1 << ((key_hash >> shift) & _MASK)
+    idx = (node.bitmap & (bit - 1)).bit_count()
+    entries = node.entries
+    if not node.bitmap & bit:
+        return _Node(node.bitmap | bit, entries[:idx] + ((key, value, key_hash),) + entries[idx:]), True
+
+    entry = entries[idx]
+    if isinstance(entry, tuple):
+        k, v, h = entry
+        if h == key_hash and k == key:
+            if v is value:
+                return node, False
+            new_entry, added = (key, value, key_hash), False
+        elif h == key_hash:
+            new_entry, added = _Collision(key_hash, ((k, v), (key, value))), True
+        else:
+            new_entry, added = _split(entry, (key, value, key_hash), shift + _BITS), True
+    else:
+        new_entry, added = _assoc(entry, key_hash, key, value, shift + _BITS)
+        if new_entry is entry:
+            return node, False
+    return _Node(node.bitmap, entries[:idx] + (new_entry,) + entries[idx + 1:]), added
+
+
+def _iter_items(node) -> Iterator[Tuple[Any, Any]]:
+    if isinstance(node, _Collision):
+        yield from node.pairs
+        return
+    for entry in node.entries:
+        if isinstance(entry, tuple):
+            yield entry[0], entry[1]
+        else:
+            yield from _iter_items(entry)
+
+
+class PMap:
+    """A persistent hash map. `set()` copies only the O(log32 n) nodes on the key's path."""
+
+    __slots__ = ("_root", "_count")
+
+    def __init__(self, items: Iterable[Tuple[Any, Any]] | dict = ()):
+        self._root = _EMPTY_NODE
+        self._count = 0
+        for key, value in (items.items() if isinstance(items, dict) else items):
+            self._root, added = _assoc(self._root, hash(key) & _HASH_MASK, key, value, 0)
+            self._count += added
+
+    @classmethod
+    def _make(cls, root, count: int) -> 'PMap':
+        pmap = cls.__new__(cls)
+        pmap._root = root
+        pmap._count = count
+        return pmap
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[Any]:
+        for key, _ in _iter_items(self._root):
+            yield key
+
+    def __contains__(self, key: Any) -> bool:
+        missing = object()
+        return self.get(key, missing) is not missing
+
+    def __getitem__(self, key: Any) -> Any:
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            raise KeyError(key)
+        return value
+
+    def __repr__(self) -> str:
+        return f"PMap({dict(self.items())})"
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        key_hash = hash(key) & _HASH_MASK
+        node, shift = self._root, 0
+        while True:
+            if isinstance(node, _Collision):
+                for k, v in node.pairs:
+                    if k == key:
+                        return v
+                return default
+            bit = 1 << ((key_hash >> shift) & _MASK)
+            if not node.bitmap & bit:
+                return default
+            entry = node.entries[(node.bitmap & (bit - 1)).bit_count()]
+            if isinstance(entry, tuple):
+                return entry[1] if entry[2] == key_hash and entry[0] == key else default
+            node, shift = entry, shift + _BITS
+
+    def set(self, key: Any, value: Any) -> 'PMap':
+        root, added = _assoc(self._root, hash(key) & _HASH_MASK, key, value, 0)
+        if root is self._root:
+            return self
+        return PMap._make(root, self._count + added)
+
+    def items(self) -> Iterator[Tuple[Any, Any]]:
+        return _iter_items(self._root)
+
+    def keys(self) -> Iterator[Any]:
+        return iter(self)
+
+    def values(self) -> Iterator[Any]:
+        for _, value in _iter_items(self._root):
+            yield value
+
+
+# --- Persistent Vector (32-way trie) ---
+
+def _new_path(shift: int, value: Any) -> tuple:
+    return (value,) if shift == 0 else (_new_path(shift - _BITS, value),)
+
+
+def _push(node: tuple, shift: int, index: int, value: Any) -> tuple:
+    if shift == 0:
+        return node + (value,)
+    child = (index >> shift) & _MASK
+    if child < len(node):
+        return node[:child] + (_push(node[child], shift - _BITS, index, value),) + node[child + 1:]
+    return node + (_new_path(shift - _BITS, value),)
+
+
+def _replace(node: tuple, shift: int, index: int, value: Any) -> tuple:
+    child = (index >> shift) & _MASK
+    if shift == 0:
+        return node[:child] + (value,) + node[child + 1:]
+    return node[:child] + (_replace(node[child], shift - _BITS, index, value),) + node[child + 1:]
+
+
+def _drop_last(node: tuple, shift: int, index: int) -> tuple:
+    if shift == 0:
+        return node[:-1]
+    child = (index >> shift) & _MASK
+    new_child = _drop_last(node[child], shift - _BITS, index)
+    return node[:child] + ((new_child,) if new_child else ())
+
+
+class PVector:
+    """A persistent vector. `append()`, `set()` and `pop()` copy only the nodes on one root-to-leaf path."""
+
+    __slots__ = ("_root", "_size", "_shift")
+
+    def __init__(self, items: Iterable[Any] = ()):
+        level = tuple(items)
+        self._size = len(level)
+        self._shift = 0
+        # Build bottom-up: chunk values into leaves, then leaves into branches.
+        level = tuple(level[i:i + _WIDTH] for i in range(0, len(level), _WIDTH)) or ((),)
+        while len(level) > 1:
+            level = tuple(level[i:i + _WIDTH] for i in range(0, len(level), _WIDTH))
+            self._shift += _BITS
+        self._root = level[0]
+
+    @classmethod
+    def _make(cls, root: tuple, size: int, shift: int) -> 'PVector':
+        vector = cls.__new__(cls)
+        vector._root = root
+        vector._size = size
+        vector._shift = shift
+        return vector
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __bool__(self) -> bool:
+        return self._size > 0
+
+    def __iter__(self) -> Iterator[Any]:
+        def walk(node: tuple, shift: int):
+            if shift == 0:
+                yield from node
+            else:
+                for child in node:
+                    yield from walk(child, shift - _BITS)
+        return walk(self._root, self._shift)
+
+    def __getitem__(self, index: int) -> Any:
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("PVector index out of range")
+        node, shift = self._root, self._shift
+        while shift > 0:
+            node = node[(index >> shift) & _MASK]
+            shift -= _BITS
+        return node[index & _MASK]
+
+    def __repr__(self) -> str:
+        return f"PVector({list(self)})"
+
+    def append(self, value: Any) -> 'PVector':
+        if self._size == _WIDTH << self._shift:
+            root = (self._root, _new_path(self._shift, value))
+            return PVector._make(root, self._size + 1, self._shift + _BITS)
+        return PVector._make(_push(self._root, self._shift, self._size, value), self._size + 1, self._shift)
+
+    def set(self, index: int, value: Any) -> 'PVector':
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("PVector index out of range")
+        return PVector._make(_replace(self._root, self._shift, index, value), self._size, self._shift)
+
+    def pop(self) -> Tuple[Any, 'PVector']:
+        """Returns the last value and a vector without it."""
+        if not self._size:
+            raise IndexError("pop from empty PVector")
+        last = self[-1]
+        root, shift = _drop_last(self._root, self._shift, self._size - 1), self._shift
+        while shift > 0 and len(root) == 1:
+            root, shift = root[0], shift - _BITS
+        return last, PVector._make(root if self._size > 1 else (), self._size - 1, shift if self._size > 1 else 0)
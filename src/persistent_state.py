@@ -0,0 +1,371 @@
+# src/persistent_state.py
+
+"""
+An immutable, structurally shared representation of GameState for exploring
+"what if" branches of the same game side by side.
+
+Snapshots hold players and zones in persistent maps and decks in persistent
+vectors, so a branch that changes one player or one zone shares everything else
+with its parent. `TimelineAdapter` runs the regular `Game` phase methods against
+a snapshot: it thaws the snapshot into a working GameState, runs the phase, and
+freezes the result again, reusing the frozen node of every object the phase did
+not change.
+
+Thawing is lazy where it pays: the zones and decks of a working GameState are
+`_ThawingMap`s, which thaw an entry on first access, and `freeze` only looks
+at the entries that were thawed. A phase that moves one player thaws the zones
+it reads, not the board. Players are thawed eagerly, since every phase visits
+every seat, so a branch costs O(players + touched zones and decks) in time and
+O(changes) in memory. The Time phase rewrites every zone's rewards and so
+always touches the whole board.
+"""
+
+import dataclasses
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from .card import Card
+from .deck import CardRegistry, Deck, DeckType
+from .game_board import GameBoard, Zone
+from .game_state import GameState
+from .card_collection import CardCollection
+from .persistent import PMap, PVector
+from .player import Player
+from .rules import RulesConfig
+from .status_store import StatusStore
+
+# Forward-declare Game to avoid circular import
+if False:
+    from .game import Game
+
+
+@dataclass(frozen=True)
+class FrozenPlayer:
+    player_id: str
+    name: str
+    health: int
+    gold: int
+    yin_yang: int
+    position: str | None
+    is_eliminated: bool
+    hand: Tuple[Card, ...]
+    status_effects: Tuple[Dict[str, Any], ...]
+    played_card: Card | None
+    has_moved: bool
+
+    @classmethod
+    def from_player(cls, player: Player) -> 'FrozenPlayer':
+        return cls(
+            player_id=player.player_id,
+            name=player.name,
+            health=player.health,
+            gold=player.gold,
+            yin_yang=player.yin_yang,
+            position=player.position,
+            is_eliminated=player.is_eliminated,
+            hand=tuple(player.hand),
+            status_effects=tuple(player.status_effects.to_list()),
+            played_card=player.played_card,
+            has_moved=player.has_moved,
+        )
+
+    def thaw(self) -> Player:
+        player = Player(
+            player_id=self.player_id,
+            name=self.name,
+            health=self.health,
+            gold=self.gold,
+            yin_yang=self.yin_yang,
+            position=self.position,
+            is_eliminated=self.is_eliminated,
+            hand=CardCollection(self.hand),
+            status_effects=StatusStore([dict(s) for s in self.status_effects]),
+            played_card=self.played_card,
+            has_moved=self.has_moved,
+        )
+        player._frozen_from = (self, player.version)
+        return player
+
+
+@dataclass(frozen=True)
+class FrozenZone:
+    zone_id: str
+    palace: str
+    department: str
+    luoshu_number: int
+    five_element: str
+    gold_reward: int
+    gold_penalty: int
+
+    @classmethod
+    def from_zone(cls, zone: Zone) -> 'FrozenZone':
+        return cls(**{f.name: getattr(zone, f.name) for f in dataclasses.fields(cls)})
+
+    def thaw(self) -> Zone:
+        zone = Zone(self.zone_id, self.palace, self.department, self.luoshu_number, self.five_element,
+                    self.gold_reward, self.gold_penalty)
+        zone._frozen_from = (self, zone.version)
+        return zone
+
+
+@dataclass(frozen=True)
+class FrozenDeck:
+    draw: PVector      # Card handles, bottom to top
+    discard: PVector   # Card handles, oldest first
+
+    @classmethod
+    def from_deck(cls, deck: Deck) -> 'FrozenDeck':
+        return cls(PVector(deck.draw_handles()), PVector(deck.discard_handles()))
+
+    def thaw(self, deck_type: DeckType, registry: CardRegistry) -> Deck:
+        deck = Deck.from_handles(deck_type, registry, self.draw, self.discard)
+        deck._frozen_from = (self, deck.version)
+        return deck
+
+
+def _thaw_zone(zone_id: str, frozen: FrozenZone) -> Zone:
+    return frozen.thaw()
+
+
+def _thaw_deck(registry: CardRegistry, deck_type: DeckType, frozen: FrozenDeck) -> Deck:
+    return frozen.thaw(deck_type, registry)
+
+
+class _ThawingMap(dict):
+    """
+    A working dict (GameBoard.zones, GameState.decks) over a snapshot's PMap:
+    each entry is thawed on first access. Iteration follows the snapshot's
+    order (then any keys added since) and thaws everything; `thawed` and
+    `peek` don't.
+    """
+
+    def __init__(self, frozen: PMap, order: Iterable[Any], thaw: Callable[[Any, Any], Any]):
+        super().__init__()
+        self._frozen = frozen
+        self._order = tuple(order)
+        self._thaw = thaw
+
+    def __missing__(self, key: Any) -> Any:
+        frozen = self._frozen.get(key)
+        if frozen is None:
+            raise KeyError(key)
+        value = self._thaw(key, frozen)
+        dict.__setitem__(self, key, value)
+        return value
+
+    def __contains__(self, key: Any) -> bool:
+        return dict.__contains__(self, key) or key in self._frozen
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        return self[key] if key in self else default
+
+    def _keys(self) -> List[Any]:
+        return list(self._order) + [key for key in dict.keys(self) if key not in self._frozen]
+
+    def __len__(self) -> int:
+        return len(self._keys())
+
+    def __iter__(self):
+        return iter(self._keys())
+
+    def keys(self) -> List[Any]:
+        return self._keys()
+
+    def values(self) -> List[Any]:
+        return [self[key] for key in self._keys()]
+
+    def items(self) -> List[Tuple[Any, Any]]:
+        return [(key, self[key]) for key in self._keys()]
+
+    def thawed(self) -> List[Tuple[Any, Any]]:
+        """The entries thawed (or assigned) so far: the only ones that can differ from the snapshot."""
+        return list(dict.items(self))
+
+    def peek(self, key: Any) -> Any:
+        """The working object if thawed, else the frozen node; for reading fields both have."""
+        return dict.get(self, key) or self._frozen[key]
+
+    def __reduce_ex__(self, protocol):
+        # Copies and pickles get a plain dict with everything thawed
+        return dict, (self.items(),)
+
+
+def _touched(mapping: Dict[Any, Any]) -> Iterable[Tuple[Any, Any]]:
+    thawed = getattr(mapping, "thawed", None)
+    return thawed() if thawed is not None else mapping.items()
+
+
+def _reuse(obj: Any) -> Any | None:
+    """Returns the frozen node an object was thawed from, if the object hasn't changed since."""
+    frozen_from = getattr(obj, "_frozen_from", None)
+    if frozen_from is not None and frozen_from[1] == obj.version:
+        return frozen_from[0]
+    return None
+
+
+@dataclass(frozen=True)
+class PersistentGameState:
+    """An immutable GameState. Branching is free; every change copies only the touched path."""
+    registry: CardRegistry
+    player_order: Tuple[str, ...]
+    players: PMap          # player_id -> FrozenPlayer
+    zone_order: Tuple[str, ...]  # Board order, which zone indices in action codes refer to
+    zones: PMap            # zone_id -> FrozenZone
+    qimen_gates: PMap      # palace -> gate
+    decks: PMap            # DeckType -> FrozenDeck
+    game_fund: int = 0
+    current_celestial_stem: Card | None = None
+    current_terrestrial_branch: Card | None = None
+    ju_number: int = 1
+    current_turn: int = 1
+    current_phase: str = "SETUP"
+    active_player_index: int = 0
+    starting_player_index: int = 0
+    active_rules: PMap = dataclasses.field(default_factory=PMap)
+    last_resolved_effect: Dict[str, Any] | None = None
+    rules: RulesConfig = dataclasses.field(default_factory=RulesConfig)
+
+    @classmethod
+    def freeze(cls, game_state: GameState) -> 'PersistentGameState':
+        """
+        Creates a snapshot of a GameState. If the state was thawed from a snapshot,
+        every player, zone and deck that hasn't changed since is shared with it.
+        """
+        base: PersistentGameState | None = getattr(game_state, "_frozen_from", None)
+        player_order = tuple(p.player_id for p in game_state.players)
+
+        if base is not None and base.player_order == player_order:
+            players = base.players
+        else:
+            players = PMap()
+        for player in game_state.players:
+            frozen = _reuse(player)
+            if frozen is None or players.get(player.player_id) is not frozen:
+                players = players.set(player.player_id, frozen or FrozenPlayer.from_player(player))
+
+        zones = base.zones if base is not None else PMap()
+        for zone_id, zone in _touched(game_state.game_board.zones):
+            frozen = _reuse(zone)
+            if frozen is None or zones.get(zone_id) is not frozen:
+                zones = zones.set(zone_id, frozen or FrozenZone.from_zone(zone))
+
+        decks = base.decks if base is not None else PMap()
+        for deck_type, deck in _touched(game_state.decks):
+            frozen = _reuse(deck)
+            if frozen is None or decks.get(deck_type) is not frozen:
+                decks = decks.set(deck_type, frozen or FrozenDeck.from_deck(deck))
+
+        gates = game_state.game_board.qimen_gates
+        if base is not None and dict(base.qimen_gates.items()) == gates:
+            qimen_gates = base.qimen_gates
+        else:
+            qimen_gates = PMap(gates)
+
+        if base is not None and dict(base.active_rules.items()) == game_state.active_rules:
+            active_rules = base.active_rules
+        else:
+            active_rules = PMap(game_state.active_rules)
+
+        return cls(
+            registry=game_state.card_registry,
+            player_order=player_order,
+            players=players,
+            zone_order=tuple(game_state.game_board.zones),
+            zones=zones,
+            qimen_gates=qimen_gates,
+            decks=decks,
+            game_fund=game_state.game_fund,
+            current_celestial_stem=game_state.current_celestial_stem,
+            current_terrestrial_branch=game_state.current_terrestrial_branch,
+            ju_number=game_state.ju_number,
+            current_turn=game_state.current_turn,
+            current_phase=game_state.current_phase,
+            active_player_index=game_state.active_player_index,
+            starting_player_index=game_state.starting_player_index,
+            active_rules=active_rules,
+            last_resolved_effect=game_state.last_resolved_effect,
+            rules=game_state.rules,
+        )
+
+    def thaw(self) -> GameState:
+        """Creates a mutable working GameState from this snapshot. The snapshot itself is never modified."""
+        board = GameBoard(
+            zones=_ThawingMap(self.zones, self.zone_order, _thaw_zone),
+            qimen_gates=dict(self.qimen_gates.items()),
+        )
+        game_state = GameState(
+            players=[self.players[player_id].thaw() for player_id in self.player_order],
+            game_board=board,
+            card_registry=self.registry,
+            decks=_ThawingMap(self.decks, self.decks.keys(), partial(_thaw_deck, self.registry)),
+            game_fund=self.game_fund,
+            current_celestial_stem=self.current_celestial_stem,
+            current_terrestrial_branch=self.current_terrestrial_branch,
+            ju_number=self.ju_number,
+            current_turn=self.current_turn,
+            current_phase=self.current_phase,
+            active_player_index=self.active_player_index,
+            starting_player_index=self.starting_player_index,
+            active_rules=dict(self.active_rules.items()),
+            last_resolved_effect=self.last_resolved_effect,
+            rules=self.rules,
+        )
+        game_state._frozen_from = self
+        return game_state
+
+    # --- Branching helpers ---
+
+    def get_player(self, player_id: str) -> FrozenPlayer | None:
+        return self.players.get(player_id)
+
+    def evolve(self, **changes) -> 'PersistentGameState':
+        """Returns a branch with top-level fields replaced."""
+        return dataclasses.replace(self, **changes)
+
+    def with_player(self, player_id: str, **changes) -> 'PersistentGameState':
+        """Returns a branch in which one player's fields are replaced."""
+        player = dataclasses.replace(self.players[player_id], **changes)
+        return dataclasses.replace(self, players=self.players.set(player_id, player))
+
+    def with_zone(self, zone_id: str, **changes) -> 'PersistentGameState':
+        """Returns a branch in which one zone's fields are replaced."""
+        zone = dataclasses.replace(self.zones[zone_id], **changes)
+        return dataclasses.replace(self, zones=self.zones.set(zone_id, zone))
+
+    def with_gates(self, gate_layout: Dict[str, str]) -> 'PersistentGameState':
+        """Returns a branch with a different Qi Men gate layout."""
+        return dataclasses.replace(self, qimen_gates=PMap(gate_layout))
+
+
+class TimelineAdapter:
+    """Runs `Game` phase methods against persistent snapshots instead of the game's own state."""
+
+    PHASES = {
+        "TIME": "_execute_time_phase",
+        "PLACEMENT": "_execute_placement_phase",
+        "MOVEMENT": "_execute_movement_phase",
+        "INTERPRETATION": "_execute_interpretation_phase",
+        "RESOLUTION": "_execute_resolution_phase",
+        "UPKEEP": "_execute_upkeep_phase",
+    }
+
+    def __init__(self, game: 'Game'):
+        self.game = game
+
+    def run(self, snapshot: PersistentGameState, step: Callable[['Game'], Any]) -> PersistentGameState:
+        """Runs `step(game)` on a working copy of the snapshot and returns the resulting snapshot."""
+        original_state = self.game.game_state
+        self.game.use_state(snapshot.thaw())
+        try:
+            step(self.game)
+            return PersistentGameState.freeze(self.game.game_state)
+        finally:
+            self.game.use_state(original_state)
+
+    def run_phase(self, snapshot: PersistentGameState, phase: str) -> PersistentGameState:
+        return self.run(snapshot, lambda game: getattr(game, self.PHASES[phase])())
+
+    def run_round(self, snapshot: PersistentGameState, round_number: int | None = None) -> PersistentGameState:
+        turn = round_number if round_number is not None else snapshot.current_turn
+        return self.run(snapshot, lambda game: game.run_round(turn))
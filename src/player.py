@@ -2,31 +2,61 @@ import logging
 from dataclasses import dataclass, field
 from typing import List, Dict, Any
 from .card import Card
+from .card_collection import CardCollection
+from .status_store import StatusStore
+from .rules import DEFAULT_RULES
+from .versioning import Versioned
+from . import zobrist
 
 @dataclass
-class Player:
+class Player(Versioned):
     """Represents a player in the game."""
+    _HASHED_FIELDS = frozenset({"health", "gold", "yin_yang", "position", "is_eliminated", "played_card", "has_moved"})
+    _AGGREGATED_FIELDS = frozenset({"hand", "status_effects"})
+
     player_id: str
     name: str
-    health: int = 200
-    gold: int = 100
+    health: int = DEFAULT_RULES.starting_health
+    gold: int = DEFAULT_RULES.starting_gold
     yin_yang: int = 0
     position: str | None = None
     is_eliminated: bool = False
 
-    hand: List[Card] = field(default_factory=list)
-    status_effects: List[Dict[str, Any]] = field(default_factory=list)
+    hand: CardCollection = field(default_factory=CardCollection)
+    status_effects: StatusStore = field(default_factory=StatusStore)
 
     played_card: Card | None = None
     has_moved: bool = False
 
+    # Called with the player when health drops from above zero to zero or below.
+    # Set by the owning Game; not a dataclass field and never pickled.
+    _on_health_depleted = None
+
     def __repr__(self) -> str:
-        statuses = [s.get('status_id') for s in self.status_effects]
-        return f"Player(id='{self.player_id}', name='{self.name}', health={self.health}, gold={self.gold}, position='{self.position}', statuses={statuses})"
+        return f"Player(id='{self.player_id}', name='{self.name}', health={self.health}, gold={self.gold}, position='{self.position}', statuses={list(self.status_effects.ids())})"
+
+    @property
+    def version(self) -> int:
+        return self._version + self.hand.version + self.status_effects.version
+
+    @property
+    def hash(self) -> int:
+        """Zobrist hash of the player's position, bucketed resources, hand and statuses."""
+        return (self._zhash
+                ^ zobrist.mix(self.hand.zhash, zobrist.key("hand", self.player_id))
+                ^ zobrist.mix(self.status_effects.zhash, zobrist.key("statuses", self.player_id)))
+
+    def _zobrist_key(self, name: str, value: Any) -> int:
+        if isinstance(value, Card):
+            value = value.card_id
+        return zobrist.key("player", self.player_id, name, zobrist.bucket(name, value))
 
     def to_dict(self) -> Dict[str, Any]:
-        """Serializes the Player object to a dictionary."""
-        return {
+        """Serializes the Player object to a dictionary. The result is cached and must not be modified."""
+        cached = self._cached_dict()
+        if cached is not None:
+            return cached
+        return self._store_dict({
             "player_id": self.player_id,
             "name": self.name,
             "health": self.health,
@@ -35,17 +65,16 @@ class Player:
             "position": self.position,
             "is_eliminated": self.is_eliminated,
             "hand": [card.to_dict() for card in self.hand],
-            "status_effects": self.status_effects,
+            "status_effects": self.status_effects.to_list(),
             "played_card": self.played_card.to_dict() if self.played_card else None,
-        }
+        })
 
     def add_card_to_hand(self, card: Card):
         self.hand.append(card)
 
     def play_card(self, card_id: str) -> Card | None:
-        card_to_play = next((card for card in self.hand if card.card_id == card_id), None)
+        card_to_play = self.hand.remove_by_id(card_id)
         if card_to_play:
-            self.hand.remove(card_to_play)
             self.played_card = card_to_play
             return card_to_play
         return None
@@ -60,9 +89,17 @@ class Player:
             return self.yin_yang >= value
         return False
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_on_health_depleted', None)
+        return state
+
     def change_resource(self, resource_type: str, value: int):
         if resource_type == "health":
+            was_alive = self.health > 0
             self.health += value
+            if was_alive and self.health <= 0 and self._on_health_depleted is not None:
+                self._on_health_depleted(self)
         elif resource_type == "gold":
             self.gold += value
         elif resource_type == "yin_yang":
@@ -71,29 +108,22 @@ class Player:
             logging.warning(f"Unknown resource type '{resource_type}'")
 
     def add_status(self, status: Dict[str, Any]):
-        """Adds a new status effect to the player."""
-        self.status_effects.append(status)
+        """Adds a new status effect to the player, stacking or refreshing an existing one."""
+        self.status_effects.add(status)
         logging.info(f"Status Applied: {status.get('status_id')} to {self.name} for {status.get('duration')} turn(s).")
 
+    def has_status(self, status_id: str) -> bool:
+        """Checks in O(1) whether the player currently has a status."""
+        return status_id in self.status_effects
+
     def remove_status(self, status_id: str):
         """Removes a status effect by its ID."""
-        status_to_remove = next((s for s in self.status_effects if s.get("status_id") == status_id), None)
-        if status_to_remove:
-            self.status_effects.remove(status_to_remove)
+        if self.status_effects.remove(status_id) is not None:
             logging.info(f"Status Removed: {status_id} from {self.name}.")
         else:
             logging.warning(f"Attempted to remove status {status_id}, but it was not found on {self.name}.")
 
     def tick_statuses(self):
-        """Decrements the duration of all temporary statuses and removes expired ones."""
-        # We iterate over a copy of the list to allow safe removal
-        for status in self.status_effects[:]:
-            # Permanent statuses should not have their duration ticked down.
-            if status.get('is_permanent', False):
-                continue
-
-            if 'duration' in status:
-                status['duration'] -= 1
-                if status['duration'] <= 0:
-                    self.status_effects.remove(status)
-                    logging.info(f"Status Expired: {status.get('status_id')} on {self.name}.")
\ No newline at end of file
+        """Advances status durations by one turn and removes expired ones. Permanent statuses never expire."""
+        for status in self.status_effects.tick():
+            logging.info(f"Status Expired: {status.get('status_id')} on {self.name}.")
@@ -0,0 +1,79 @@
+# src/policy.py
+
+"""
+Decision policies: the objects that make choices on behalf of players.
+
+The game phases and the effect engine enumerate the legal action codes for a
+decision (see `actions.py`) and ask the player's policy to pick one. Bots,
+remote clients and test scripts plug in by implementing `choose`.
+"""
+
+import random
+from typing import List
+
+from .actions import ActionKind, index_for, kind_of
+
+# Forward-declare to avoid circular import
+if False:
+    from .game_state import GameState
+    from .player import Player
+
+
+class DecisionPolicy:
+    """Base class for decision policies."""
+
+    def choose(self, game_state: 'GameState', player: 'Player', actions: List[int]) -> int:
+        """Returns one of the legal action codes in `actions` (never called with an empty list)."""
+        raise NotImplementedError
+
+
+class RandomPolicy(DecisionPolicy):
+    """Picks uniformly among the legal actions."""
+
+    def __init__(self, rng: random.Random | None = None):
+        self.rng = rng or random
+
+    def choose(self, game_state: 'GameState', player: 'Player', actions: List[int]) -> int:
+        return self.rng.choice(actions)
+
+
+class FirstActionPolicy(DecisionPolicy):
+    """Always picks the first legal action. Useful for deterministic tests."""
+
+    def choose(self, game_state: 'GameState', player: 'Player', actions: List[int]) -> int:
+        return actions[0]
+
+
+class PrototypePolicy(DecisionPolicy):
+    """
+    The engine's original behaviour: random placements, moves and duel cards,
+    but always the first CHOICE option and the first eligible target.
+    """
+
+    def __init__(self, rng: random.Random | None = None):
+        self.rng = rng or random
+
+    def choose(self, game_state: 'GameState', player: 'Player', actions: List[int]) -> int:
+        if kind_of(actions[0]) in (ActionKind.CHOOSE_OPTION, ActionKind.CHOOSE_TARGET):
+            return actions[0]
+        return self.rng.choice(actions)
+
+
+class HeuristicPolicy(DecisionPolicy):
+    """
+    A cheap baseline for bots and rollouts: random placements and moves, the
+    fewest-strokes card in a duel (fewer strokes wins), the first option and
+    the first target.
+    """
+
+    def __init__(self, rng: random.Random | None = None):
+        self.rng = rng or random
+
+    def choose(self, game_state: 'GameState', player: 'Player', actions: List[int]) -> int:
+        kind = kind_of(actions[0])
+        if kind == ActionKind.DUEL_CARD:
+            card = game_state.card_registry.card
+            return min(actions, key=lambda code: card(index_for(code)).strokes)
+        if kind in (ActionKind.CHOOSE_OPTION, ActionKind.CHOOSE_TARGET):
+            return actions[0]
+        return self.rng.choice(actions)
@@ -6,6 +6,8 @@ including the distribution of the Eight Gates (八门) across the palaces
 for each Ju (局) and the effects associated with each gate.
 """
 
+from .interning import intern_effect
+
 # --- Gate Distribution Map (阳遁九局八门分布图) ---
 # Maps Ju number -> Palace Name -> Gate ID
 YANG_JU_GATE_DISTRIBUTION = {
@@ -103,6 +105,8 @@ GATE_EFFECTS = {
         }
     },
 }
+# Share action nodes with the loaded cards (see interning.py)
+GATE_EFFECTS = intern_effect(GATE_EFFECTS)
 
 def get_gate_layout_for_ju(ju_number: int) -> dict:
     """Returns the gate distribution for a given Ju number."""
@@ -112,4 +116,11 @@ def get_gate_layout_for_ju(ju_number: int) -> dict:
 
 def get_effect_for_gate(gate_name: str) -> dict | None:
     """Returns the effect JSON for a given gate name."""
-    return GATE_EFFECTS.get(gate_name, {}).get("effect")
\ No newline at end of file
+    return GATE_EFFECTS.get(gate_name, {}).get("effect")
+
+
+_GATE_INDEX = {name: i for i, name in enumerate(GATE_EFFECTS)}
+
+def gate_index(gate_name: str) -> int:
+    """Returns the gate's position in GATE_EFFECTS (a compact ID for event logs), or -1."""
+    return _GATE_INDEX.get(gate_name, -1)
\ No newline at end of file
@@ -0,0 +1,159 @@
+# src/room_commands.py
+
+"""
+Per-room command scheduling for the socket server.
+
+Each game room runs its commands ('start_game', 'next_round', 'reset_game')
+one at a time from a `CommandQueue`, so a burst of clicks cannot run rounds
+concurrently or queue an unbounded backlog:
+
+- A command that is already pending is coalesced into it. A command that
+  arrives while the same command is executing queues one follow-up, which
+  later copies join: ten clicks on "next round" during a round run one more
+  round after it, not ten.
+- 'reset_game' drops everything pending before it, which was aimed at the
+  game it replaces; `submit` returns the requesters of the dropped commands
+  so the server can tell them.
+
+Each requester may tag its sends with a request id. A command keeps the ids
+of every send it absorbed, per requester, so replies name exactly the sends
+they answer: a send queued as the follow-up is not answered by the command
+that was already running.
+- The queue holds at most `max_depth` pending commands and rejects the rest,
+  so the wait of an accepted command is bounded by `max_depth` commands,
+  however much traffic the room receives.
+
+State pushes go through a `BroadcastLimiter`: at most one per room per frame
+interval; a push requested sooner is delayed to the end of the interval and
+merged with any other request made in the meantime.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, NamedTuple
+
+# Commands that mean the same thing however often they are sent before they run
+IDEMPOTENT_COMMANDS = frozenset({"start_game", "next_round", "reset_game"})
+# Commands that make everything queued before them moot
+SUPERSEDING_COMMANDS = frozenset({"reset_game"})
+
+MAX_DEPTH = 4
+FRAME_INTERVAL = 0.05  # Seconds between state pushes to a room
+
+QUEUED, COALESCED, REJECTED = "queued", "coalesced", "rejected"
+
+
+class Submission(NamedTuple):
+    status: str  # QUEUED, COALESCED or REJECTED
+    start_worker: bool  # Whether the caller must start a worker to drain the queue
+    # Pending commands this one dropped (name -> requester -> request ids); they will never run
+    superseded: Dict[str, Dict[str, List[Any]]]
+
+
+@dataclass
+class Command:
+    """A pending command and every connection that asked for it, with the ids of their requests."""
+    name: str
+    submitted: float
+    requesters: Dict[str, List[Any]] = field(default_factory=dict)
+
+
+class CommandQueue:
+    """The pending and executing commands of one room. Thread-safe."""
+
+    def __init__(self, max_depth: int = MAX_DEPTH):
+        self.max_depth = max_depth
+        self._lock = threading.Lock()
+        # Keyed by name for idempotent commands, by (name, sequence) for others
+        self._pending: 'OrderedDict[Any, Command]' = OrderedDict()
+        self._sequence = 0
+        self.running: Command | None = None
+        # Whether a worker is draining the queue; see `submit`
+        self._draining = False
+        self.stats: Dict[str, int] = {QUEUED: 0, COALESCED: 0, REJECTED: 0, "superseded": 0, "executed": 0}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def submit(self, name: str, requester: str | None = None, request_id: Any = None,
+               now: float | None = None) -> Submission:
+        """Adds a command; see `Submission`."""
+        now = time.monotonic() if now is None else now
+        superseded: Dict[str, Dict[str, List[Any]]] = {}
+        with self._lock:
+            idempotent = name in IDEMPOTENT_COMMANDS
+            # Only pending commands coalesce: one that is running was asked for before this request
+            command = self._pending.get(name) if idempotent else None
+            if command is not None:
+                status = COALESCED
+            else:
+                if name in SUPERSEDING_COMMANDS:
+                    for dropped in self._pending.values():
+                        requests = superseded.setdefault(dropped.name, {})
+                        for dropped_requester, request_ids in dropped.requesters.items():
+                            requests.setdefault(dropped_requester, []).extend(request_ids)
+                    self.stats["superseded"] += len(self._pending)
+                    self._pending.clear()
+                if len(self._pending) >= self.max_depth:
+                    self.stats[REJECTED] += 1
+                    return Submission(REJECTED, False, superseded)
+                key = name if idempotent else (name, self._sequence)
+                self._sequence += 1
+                command = self._pending[key] = Command(name, now)
+                status = QUEUED
+            if requester is not None:
+                command.requesters.setdefault(requester, []).append(request_id)
+            self.stats[status] += 1
+            start_worker = not self._draining
+            self._draining = True
+            return Submission(status, start_worker, superseded)
+
+    def next(self) -> Command | None:
+        """Starts the oldest pending command; None (and the worker should stop) once the queue is empty."""
+        with self._lock:
+            if not self._pending:
+                self._draining = False
+                return None
+            _, self.running = self._pending.popitem(last=False)
+            self.stats["executed"] += 1
+            return self.running
+
+    def complete(self) -> Dict[str, List[Any]]:
+        """Ends the running command and returns everyone who asked for it, coalesced requests included."""
+        with self._lock:
+            requesters = dict(self.running.requesters) if self.running is not None else {}
+            self.running = None
+            return requesters
+
+
+class BroadcastLimiter:
+    """At most one state push per `interval` seconds; requests in between are merged into one delayed push."""
+
+    def __init__(self, interval: float = FRAME_INTERVAL):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._last = float("-inf")
+        self._scheduled = False
+
+    def request(self, now: float | None = None) -> float | None:
+        """
+        0 if the push may go out now, a delay after which the caller must push
+        (and call `flushed`), or None if a delayed push is already scheduled.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._scheduled:
+                return None
+            wait = self._last + self.interval - now
+            if wait <= 0:
+                self._last = now
+                return 0.0
+            self._scheduled = True
+            return wait
+
+    def flushed(self, now: float | None = None):
+        with self._lock:
+            self._scheduled = False
+            self._last = time.monotonic() if now is None else now
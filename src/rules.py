@@ -0,0 +1,52 @@
+# src/rules.py
+
+"""
+Tunable balance constants, gathered in one immutable object so that balance
+sweeps can vary them without touching the phase logic.
+"""
+
+import dataclasses
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Any, Dict
+
+
+@dataclass(frozen=True)
+class RulesConfig:
+    # Time phase: zone values set by the current stem and branch
+    tian_beneficial_reward: int = 5     # Gold reward on a beneficial Tian zone
+    di_beneficial_relief: int = 3       # Penalty reduction on a beneficial Di zone
+    di_harmful_penalty: int = 5         # Penalty on a harmful Di zone
+
+    # Resolution phase
+    zhong_gong_tax_rate: float = 0.10   # Share of gold paid on Zhong Gong (rounded up)
+
+    # Lun Dao
+    duel_stake: int = 5                 # Gold the loser pays the winner
+
+    # Targeting
+    local_choice_targets: bool = False  # Large lobby: a single-opponent choice is among same-zone players, if any
+
+    # Setup
+    starting_health: int = 200
+    starting_gold: int = 100
+    hand_size: int = 7
+    fund_per_player: int = 100
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dataclasses.asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'RulesConfig':
+        """Builds a config from a (possibly partial) dict; unknown keys are an error."""
+        return cls(**data)
+
+    @property
+    def key(self) -> str:
+        """A stable digest of the values, usable as a cache key across processes and runs."""
+        payload = json.dumps(self.to_dict(), sort_keys=True)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+DEFAULT_RULES = RulesConfig()
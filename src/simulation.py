@@ -0,0 +1,124 @@
+# src/simulation.py
+
+"""
+Helpers for running many headless games quickly: bots, tournaments and
+balance sweeps all play full rounds without anyone reading the log.
+"""
+
+import contextlib
+import io
+import logging
+import random
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Sequence
+
+from .actions import ActionKind, card_for, kind_of
+from .events import EventRecorder
+from .game import Game
+from .policy import DecisionPolicy
+from .player import Player
+from .rules import RulesConfig
+
+# Forward-declare to avoid circular import
+if False:
+    from .game_state import GameState
+
+
+@contextlib.contextmanager
+def quiet_logging(level: int = logging.CRITICAL):
+    """
+    Fast mode: disables every log record at or below `level` for the duration.
+    The phases log several lines per player per round, which dominates the cost
+    of a simulated round when a handler is attached.
+    """
+    previous = logging.root.manager.disable
+    logging.disable(level)
+    try:
+        yield
+    finally:
+        logging.disable(previous)
+
+
+def final_score(player: Player) -> int:
+    """Ranks players at the end of a game: eliminated players score 0, everyone else health plus gold."""
+    return 0 if player.is_eliminated else max(0, player.health) + max(0, player.gold)
+
+
+@dataclass
+class GameResult:
+    seed: int
+    rounds: int
+    scores: List[int]          # Final score per seat
+    eliminated: List[bool]     # Per seat
+    gold: List[int]            # Per seat
+    health: List[int]          # Per seat
+
+    @property
+    def ranking(self) -> List[int]:
+        """Seat indices from best to worst."""
+        return sorted(range(len(self.scores)), key=lambda seat: -self.scores[seat])
+
+
+def play_game(policies: Sequence[DecisionPolicy], assets_path: str, seed: int, max_rounds: int = 20,
+              test_cards: List[str] | None = None, rules: RulesConfig | None = None,
+              on_round: Callable[[Game, int], None] | None = None,
+              recorder: EventRecorder | None = None, large_lobby: bool = False) -> GameResult:
+    """
+    Plays one headless game with one policy per seat and returns the final scores.
+    The game ends after `max_rounds` or when at most one player is left.
+    `on_round(game, round_number)` is called after every round, e.g., to sample a metric.
+    A `recorder` receives the game's events, tagged with the seed as the game ID.
+    `large_lobby` plays in the large-lobby execution mode (see lobby.py).
+    Seeding the module-level RNG makes deck order (and any policy that uses it) reproducible.
+    """
+    random.seed(seed)
+    names = [f"Seat {i + 1}" for i in range(len(policies))]
+    game = Game(player_names=names, assets_path_str=assets_path, rules=rules, large_lobby=large_lobby)
+    with quiet_logging(), contextlib.redirect_stdout(io.StringIO()):
+        if recorder is not None:
+            recorder.game_id = seed
+            game.set_recorder(recorder)
+        game.setup(test_cards=test_cards)
+        for player, policy in zip(game.game_state.players, policies):
+            game.set_policy(player.player_id, policy)
+
+        rounds = 0
+        while rounds < max_rounds and len(game.active_players) > 1:
+            rounds += 1
+            game.run_round(rounds)
+            if on_round is not None:
+                on_round(game, rounds)
+
+    players = game.game_state.players
+    return GameResult(
+        seed=seed,
+        rounds=rounds,
+        scores=[final_score(p) for p in players],
+        eliminated=[p.is_eliminated for p in players],
+        gold=[p.gold for p in players],
+        health=[p.health for p in players],
+    )
+
+
+def seat_results(result: GameResult) -> Dict[int, float]:
+    """Per-seat outcome in [0, 1]: 1 for the sole winner, shared on ties, 0 otherwise."""
+    best = max(result.scores)
+    winners = [seat for seat, score in enumerate(result.scores) if score == best]
+    return {seat: (1.0 / len(winners) if seat in winners else 0.0) for seat in range(len(result.scores))}
+
+
+class PlacementCounter(DecisionPolicy):
+    """Wraps a policy and counts how often it places each of the watched cards (every card if none are given)."""
+
+    def __init__(self, policy: DecisionPolicy, card_ids: Sequence[str] | None = None):
+        self.policy = policy
+        self.watch_all = card_ids is None
+        self.plays: Dict[str, int] = {card_id: 0 for card_id in card_ids or ()}
+
+    def choose(self, game_state: 'GameState', player: Player, actions: List[int]) -> int:
+        choice = self.policy.choose(game_state, player, actions)
+        if kind_of(choice) == ActionKind.PLACE_CARD:
+            card_id = card_for(game_state, choice).card_id
+            if card_id in self.plays or self.watch_all:
+                self.plays[card_id] = self.plays.get(card_id, 0) + 1
+        return choice
@@ -0,0 +1,172 @@
+# src/static_assets.py
+
+"""
+Immutable static content and how to serve it cheaply.
+
+Every `StaticFile` is an in-memory body with a strong ETag (a digest of the
+body) and, for text types, precompressed gzip (and brotli, if installed)
+variants built once at startup. `AssetManifest` gives each file under a
+directory a content-hashed name such as `cards/basic/basic_01_qian.<hash>.png`;
+a hashed URL never changes meaning, so it is served with a year-long
+`immutable` cache lifetime and clients only fetch it again when the file, and
+therefore its URL, changes. Entry points that cannot be renamed (`/`, the
+unversioned catalog URL) are served with `no-cache` instead, which makes
+clients revalidate them with `If-None-Match` and usually get a 304.
+
+`catalog_file` builds the document behind the catalog endpoint: the
+`WireCatalog` (cards, zones, gates, phases) plus the hashed URLs of the card
+images, versioned by the asset-bundle hash.
+"""
+
+import gzip
+import json
+import mimetypes
+from hashlib import blake2b
+from pathlib import Path
+from typing import Dict, Iterable, Tuple
+
+try:
+    import brotli
+except ImportError:  # Optional: only gzip variants are built
+    brotli = None
+
+# Forward-declare to avoid circular import
+if False:
+    from .wire import WireCatalog
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+COMPRESSIBLE_TYPES = {"text/html", "text/css", "text/plain", "application/json", "application/javascript",
+                      "text/javascript", "image/svg+xml"}
+# A variant is kept only if it is at most this fraction of the original size
+MAX_VARIANT_RATIO = 0.9
+# Server preference among the encodings a client accepts
+ENCODINGS = ("br", "gzip")
+
+
+def content_hash(data: bytes) -> str:
+    return blake2b(data, digest_size=8).hexdigest()
+
+
+def hashed_name(relative: str, digest: str) -> str:
+    """`relative` with the first 12 digits of `digest` before its extension."""
+    directory, _, name = relative.rpartition("/")
+    stem, dot, suffix = name.rpartition(".")
+    hashed = f"{stem}.{digest[:12]}.{suffix}" if dot and stem else f"{name}.{digest[:12]}"
+    return f"{directory}/{hashed}" if directory else hashed
+
+
+def accepted_encodings(accept_encoding: str | None) -> set:
+    """The content codings an `Accept-Encoding` header allows (q > 0)."""
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding and q > 0:
+            accepted.add(coding.lower())
+    return accepted
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+class StaticFile:
+    """One immutable body with its strong ETag and precompressed variants."""
+
+    def __init__(self, body: bytes, content_type: str, cache_control: str = IMMUTABLE):
+        self.body = body
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.digest = content_hash(body)
+        # encoding -> compressed body
+        self.variants: Dict[str, bytes] = {}
+        if content_type.split(";")[0].strip() in COMPRESSIBLE_TYPES:
+            compressed = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                compressed["br"] = brotli.compress(body)
+            self.variants = {encoding: data for encoding, data in compressed.items()
+                             if len(data) <= len(body) * MAX_VARIANT_RATIO}
+
+    def etag(self, encoding: str | None = None) -> str:
+        # Strong validators are per representation, so each variant has its own
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+    def choose_encoding(self, accept_encoding: str | None) -> str | None:
+        accepted = accepted_encodings(accept_encoding)
+        return next((e for e in ENCODINGS if e in self.variants and e in accepted), None)
+
+    def response(self, if_none_match: str | None = None, accept_encoding: str | None = None,
+                 cache_control: str | None = None) -> Tuple[int, Dict[str, str], bytes]:
+        """(status, headers, body) for a GET with the given request headers."""
+        encoding = self.choose_encoding(accept_encoding)
+        headers = {"ETag": self.etag(encoding), "Cache-Control": cache_control or self.cache_control}
+        if self.variants:
+            headers["Vary"] = "Accept-Encoding"
+        if if_none_match and _etag_matches(if_none_match, headers["ETag"]):
+            return 304, headers, b""
+        body = self.variants[encoding] if encoding else self.body
+        headers["Content-Type"] = self.content_type
+        headers["Content-Length"] = str(len(body))
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return 200, headers, body
+
+
+def _content_type(name: str) -> str:
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    return f"{content_type}; charset=utf-8" if content_type.startswith("text/") else content_type
+
+
+class AssetManifest:
+    """Content-hashed URLs for the files under a directory (all of them, or the given relative paths)."""
+
+    def __init__(self, root: Path, url_prefix: str, paths: Iterable[str] | None = None):
+        self.url_prefix = url_prefix.rstrip("/")
+        # hashed name -> file
+        self.files: Dict[str, StaticFile] = {}
+        # relative path -> hashed URL
+        self.urls: Dict[str, str] = {}
+        self._by_path: Dict[str, StaticFile] = {}
+        if paths is None:
+            paths = sorted(p.relative_to(root).as_posix() for p in root.rglob("*")
+                           if p.is_file() and not p.name.startswith("."))
+        for relative in paths:
+            static = StaticFile((root / relative).read_bytes(), _content_type(relative))
+            name = hashed_name(relative, static.digest)
+            self.files[name] = self._by_path[relative] = static
+            self.urls[relative] = f"{self.url_prefix}/{name}"
+
+    def url_for(self, relative: str) -> str:
+        return self.urls[relative]
+
+    def file_for(self, relative: str) -> StaticFile:
+        return self._by_path[relative]
+
+    def get(self, name: str) -> StaticFile | None:
+        return self.files.get(name)
+
+
+def catalog_file(catalog: 'WireCatalog', images: AssetManifest | None = None) -> StaticFile:
+    """
+    The catalog document: `catalog.to_dict()` plus `images` (relative image
+    path -> hashed URL) and `card_images` (card id -> hashed URL, for images
+    named after a card).
+    """
+    document = catalog.to_dict()
+    urls = images.urls if images is not None else {}
+    card_ids = {card["card_id"] for card in catalog.cards}
+    document["images"] = urls
+    document["card_images"] = {Path(relative).stem: url for relative, url in urls.items()
+                               if Path(relative).stem in card_ids}
+    body = json.dumps(document, ensure_ascii=False, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    return StaticFile(body, "application/json")
@@ -0,0 +1,131 @@
+import heapq
+from typing import Any, Dict, Iterator, List, Tuple
+
+from . import zobrist
+
+# Statuses whose values accumulate when re-applied (e.g., two GUARDs block more damage).
+# Every other status refreshes: the newer value wins and the later expiry is kept.
+STACKING_STATUSES = {"GUARD", "DAMAGE_BOOST", "ACTION_COST_INCREASED"}
+
+
+class StatusStore:
+    """
+    Holds a player's status effects keyed by status_id.
+
+    Expirations are tracked as absolute ticks in a min-heap, so `tick()` only
+    touches the statuses that actually expire on that upkeep. Stale heap entries
+    (left behind by refreshes or removals) are discarded lazily. `zhash` is the
+    XOR of the Zobrist keys of the active status IDs.
+    """
+
+    def __init__(self, statuses: List[Dict[str, Any]] | None = None):
+        self._statuses: Dict[str, Dict[str, Any]] = {}
+        self._expiry: Dict[str, int] = {}
+        self._heap: List[Tuple[int, str]] = []
+        self._clock = 0
+        self.version = 0
+        self.zhash = 0
+        for status in statuses or []:
+            self.add(status)
+
+    def __contains__(self, status_id: str) -> bool:
+        return status_id in self._statuses
+
+    def __len__(self) -> int:
+        return len(self._statuses)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for status_id, status in self._statuses.items():
+            self._sync_duration(status_id, status)
+            yield status
+
+    def __repr__(self) -> str:
+        return f"StatusStore({list(self._statuses)})"
+
+    def ids(self):
+        """Returns a live view of the active status IDs."""
+        return self._statuses.keys()
+
+    def get(self, status_id: str) -> Dict[str, Any] | None:
+        status = self._statuses.get(status_id)
+        if status is not None:
+            self._sync_duration(status_id, status)
+        return status
+
+    def add(self, status: Dict[str, Any]) -> Dict[str, Any]:
+        """Adds a status, applying the stacking rules if it is already present. Returns the stored status."""
+        status_id = status.get("status_id")
+        existing = self._statuses.get(status_id)
+
+        if existing is None:
+            stored = dict(status)
+            stored.setdefault("stacks", 1)
+            self._statuses[status_id] = stored
+            self.zhash ^= zobrist.key("status", status_id)
+        else:
+            stored = existing
+            if status_id in STACKING_STATUSES or status.get("stacking") == "stack":
+                if isinstance(stored.get("value"), int) and isinstance(status.get("value"), int):
+                    stored["value"] += status["value"]
+                stored["stacks"] = stored.get("stacks", 1) + 1
+            elif status.get("value") is not None:
+                stored["value"] = status["value"]
+            stored["is_permanent"] = stored.get("is_permanent", False) or status.get("is_permanent", False)
+
+        if status.get("duration") == "PERMANENT":
+            stored["is_permanent"] = True
+
+        if stored.get("is_permanent", False):
+            self._expiry.pop(status_id, None)
+        elif isinstance(status.get("duration"), int):
+            # Event-bound durations such as "NEXT_ATTACK" are not tied to upkeep and never tick.
+            expires_at = self._clock + status["duration"]
+            if existing is None or expires_at > self._expiry.get(status_id, expires_at - 1):
+                self._expiry[status_id] = expires_at
+                heapq.heappush(self._heap, (expires_at, status_id))
+
+        self._sync_duration(status_id, stored)
+        self.version += 1
+        return stored
+
+    def remove(self, status_id: str) -> Dict[str, Any] | None:
+        """Removes a status by its ID. Its heap entry is left to be discarded lazily."""
+        self._expiry.pop(status_id, None)
+        status = self._statuses.pop(status_id, None)
+        if status is not None:
+            self.zhash ^= zobrist.key("status", status_id)
+            self.version += 1
+        return status
+
+    def clear(self):
+        self._statuses.clear()
+        self._expiry.clear()
+        self._heap.clear()
+        self.zhash = 0
+        self.version += 1
+
+    def tick(self) -> List[Dict[str, Any]]:
+        """Advances the store by one upkeep and returns the statuses that expired."""
+        self._clock += 1
+        if self._expiry:
+            self.version += 1  # Remaining durations change even if nothing expires
+        expired = []
+        while self._heap and self._heap[0][0] <= self._clock:
+            expires_at, status_id = heapq.heappop(self._heap)
+            if self._expiry.get(status_id) != expires_at:
+                continue  # Stale entry from a refresh or removal
+            del self._expiry[status_id]
+            status = self._statuses.pop(status_id)
+            self.zhash ^= zobrist.key("status", status_id)
+            status["duration"] = 0
+            expired.append(status)
+        return expired
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        """Serializes the active statuses to a list of dictionaries."""
+        return [dict(status) for status in self]
+
+    def _sync_duration(self, status_id: str, status: Dict[str, Any]):
+        expires_at = self._expiry.get(status_id)
+        if expires_at is not None:
+            status["duration"] = expires_at - self._clock
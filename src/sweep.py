@@ -0,0 +1,215 @@
+# src/sweep.py
+
+"""
+Balance sweeps over `RulesConfig`.
+
+A sweep plays the same seeds under every rules config from a grid (or a random
+sample of a search space) across a process pool and summarizes each config.
+Game results are cached on disk by (setup, config, seed), where the setup
+covers the policy, seat count, round limit and a fingerprint of the card data.
+Re-running a sweep, or widening its grid, only simulates the new points.
+
+Usage:
+    python -m src.sweep --param duel_stake=3,5,10 --param zhong_gong_tax_rate=0.05,0.1 --games 100
+    python -m src.sweep --mode random --samples 20 --param starting_gold=50:150 --param hand_size=5,7,9
+"""
+
+import argparse
+import dataclasses
+import itertools
+import json
+import logging
+import os
+import random
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+from .game_loader import GameLoader
+from .rules import RulesConfig
+from .simulation import GameResult, play_game, seat_results
+from .tournament import make_policy
+
+RULE_FIELDS = {f.name: f.type for f in dataclasses.fields(RulesConfig)}
+
+
+def parse_param(text: str) -> Tuple[str, Any]:
+    """Parses "name=v1,v2,..." into a list of values, or "name=lo:hi" into a (lo, hi) range for random search."""
+    name, _, values = text.partition("=")
+    name = name.strip()
+    if name not in RULE_FIELDS:
+        raise ValueError(f"Unknown rules field '{name}'. Choose from: {', '.join(RULE_FIELDS)}")
+    cast = float if RULE_FIELDS[name] in (float, "float") else int
+    if ":" in values:
+        lo, hi = values.split(":")
+        return name, (cast(lo), cast(hi))
+    return name, [cast(v) for v in values.split(",")]
+
+
+def grid(space: Dict[str, Any]) -> Iterator[RulesConfig]:
+    names = list(space)
+    for values in itertools.product(*(space[n] for n in names)):
+        yield RulesConfig(**dict(zip(names, values)))
+
+
+def random_search(space: Dict[str, Any], samples: int, rng: random.Random) -> Iterator[RulesConfig]:
+    for _ in range(samples):
+        values = {}
+        for name, choices in space.items():
+            if isinstance(choices, tuple):
+                lo, hi = choices
+                values[name] = rng.randint(lo, hi) if isinstance(lo, int) else round(rng.uniform(lo, hi), 4)
+            else:
+                values[name] = rng.choice(choices)
+        yield RulesConfig(**values)
+
+
+def assets_fingerprint(assets_path: str) -> str:
+    """Digest of every card file, so cached results are dropped when the card data changes."""
+    return GameLoader(Path(assets_path)).bundle_hash()
+
+
+class ResultCache:
+    """An append-only JSON Lines file of game results keyed by (setup, rules, seed)."""
+
+    def __init__(self, path: str | None):
+        self.path = Path(path) if path else None
+        self._results: Dict[Tuple[str, str, int], Dict[str, Any]] = {}
+        if self.path is not None and self.path.exists():
+            with self.path.open('r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._results[(entry["setup"], entry["rules"], entry["seed"])] = entry["result"]
+
+    def get(self, setup: str, rules: RulesConfig, seed: int) -> GameResult | None:
+        data = self._results.get((setup, rules.key, seed))
+        return GameResult(**data) if data is not None else None
+
+    def add(self, setup: str, rules: RulesConfig, results: Sequence[GameResult]):
+        lines = []
+        for result in results:
+            data = dataclasses.asdict(result)
+            self._results[(setup, rules.key, result.seed)] = data
+            lines.append(json.dumps({"setup": setup, "rules": rules.key, "seed": result.seed, "result": data}))
+        if self.path is not None and lines:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open('a', encoding='utf-8') as f:
+                f.write("\n".join(lines) + "\n")
+
+
+def play_config(rules: RulesConfig, seeds: List[int], assets_path: str, seats: int, max_rounds: int,
+                policy_spec: str) -> List[GameResult]:
+    """Plays one game per seed under a rules config. Runs in a pool process."""
+    return [
+        play_game([make_policy(policy_spec) for _ in range(seats)], assets_path, seed, max_rounds=max_rounds, rules=rules)
+        for seed in seeds
+    ]
+
+
+@dataclass
+class ConfigSummary:
+    rules: RulesConfig
+    games: int
+    mean_rounds: float
+    elimination_rate: float    # Share of players eliminated
+    mean_gold: float           # Final gold per player
+    score_spread: float        # Mean per-game standard deviation of final scores
+    first_seat_win_rate: float
+
+    @classmethod
+    def from_results(cls, rules: RulesConfig, results: Sequence[GameResult]) -> 'ConfigSummary':
+        players = [(g, e) for r in results for g, e in zip(r.gold, r.eliminated)]
+        return cls(
+            rules=rules,
+            games=len(results),
+            mean_rounds=statistics.fmean(r.rounds for r in results),
+            elimination_rate=sum(e for _, e in players) / len(players),
+            mean_gold=statistics.fmean(g for g, _ in players),
+            score_spread=statistics.fmean(statistics.pstdev(r.scores) for r in results),
+            first_seat_win_rate=statistics.fmean(seat_results(r)[0] for r in results),
+        )
+
+
+def run_sweep(configs: Sequence[RulesConfig], assets_path: str, games: int, seats: int = 2, max_rounds: int = 20,
+              policy_spec: str = "heuristic", workers: int = 0, cache: ResultCache | None = None,
+              seed: int = 0) -> List[ConfigSummary]:
+    """Plays `games` seeds under every config (only the uncached ones) and summarizes each config."""
+    cache = cache or ResultCache(None)
+    setup = f"{policy_spec}|{seats}|{max_rounds}|{assets_fingerprint(assets_path)}"
+    seeds = list(range(seed, seed + games))
+
+    missing = {}
+    for rules in configs:
+        uncached = [s for s in seeds if cache.get(setup, rules, s) is None]
+        if uncached:
+            missing[rules] = uncached
+    logging.info(f"Sweep: {len(configs)} configs x {games} seeds, {sum(map(len, missing.values()))} games to simulate.")
+
+    if workers > 0 and missing:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(play_config, rules, chunk, assets_path, seats, max_rounds, policy_spec): rules
+                for rules, uncached in missing.items()
+                for chunk in _chunks(uncached, max(1, len(uncached) // workers))
+            }
+            for future, rules in futures.items():
+                cache.add(setup, rules, future.result())
+    else:
+        for rules, uncached in missing.items():
+            cache.add(setup, rules, play_config(rules, uncached, assets_path, seats, max_rounds, policy_spec))
+
+    return [ConfigSummary.from_results(rules, [cache.get(setup, rules, s) for s in seeds]) for rules in configs]
+
+
+def _chunks(items: List[int], size: int) -> Iterator[List[int]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def format_table(summaries: Sequence[ConfigSummary], varied: Sequence[str]) -> str:
+    header = list(varied) + ["games", "rounds", "eliminated", "gold", "score spread", "seat 1 wins"]
+    lines = ["| " + " | ".join(header) + " |", "|" + " ---: |" * len(header)]
+    for s in summaries:
+        values = [str(getattr(s.rules, name)) for name in varied] + [
+            str(s.games), f"{s.mean_rounds:.1f}", f"{s.elimination_rate:.1%}", f"{s.mean_gold:.1f}",
+            f"{s.score_spread:.1f}", f"{s.first_seat_win_rate:.1%}",
+        ]
+        lines.append("| " + " | ".join(values) + " |")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep balance constants over simulated games.")
+    parser.add_argument('--param', action='append', default=[], help="name=v1,v2 (grid or random) or name=lo:hi (random)")
+    parser.add_argument('--mode', choices=('grid', 'random'), default='grid')
+    parser.add_argument('--samples', type=int, default=20, help="Configs to draw in random mode")
+    parser.add_argument('--games', type=int, default=50, help="Seeds per config")
+    parser.add_argument('--assets', type=str, default='tianji-fix-data-and/assets')
+    parser.add_argument('--seats', type=int, default=2)
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--policy', type=str, default='heuristic')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--cache', type=str, default='tianji-fix-data-and/metrics/sweep_cache.jsonl')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    space = dict(parse_param(p) for p in args.param)
+    if args.mode == 'grid':
+        if any(isinstance(v, tuple) for v in space.values()):
+            parser.error("Ranges (lo:hi) are only supported in random mode.")
+        configs = list(grid(space))
+    else:
+        configs = list(random_search(space, args.samples, random.Random(args.seed)))
+    configs = list(dict.fromkeys(configs))  # Random search may draw the same point twice
+
+    summaries = run_sweep(configs, args.assets, args.games, seats=args.seats, max_rounds=args.rounds,
+                          policy_spec=args.policy, workers=args.workers, cache=ResultCache(args.cache), seed=args.seed)
+    print(format_table(summaries, list(space)))
+
+
+if __name__ == '__main__':
+    main()
@@ -60,6 +60,55 @@ class TestEffectEngine(unittest.TestCase):
 
         self.assertIn("PERM_SHIELD", [s['status_id'] for s in self.p1.status_effects])
 
+    def test_status_expiry_and_stacking(self):
+        """Verify statuses expire on the right upkeep and that re-applying refreshes or stacks them."""
+        self.p1.add_status({"status_id": "CANNOT_MOVE", "duration": 1})
+        self.p1.add_status({"status_id": "POSITIVE_GAIN_DOUBLED", "duration": 2})
+        self.p1.add_status({"status_id": "GUARD", "duration": 2, "value": 5})
+        self.p1.add_status({"status_id": "GUARD", "duration": 1, "value": 3})
+        self.assertTrue(self.p1.has_status("CANNOT_MOVE"))
+        self.assertEqual(self.p1.status_effects.get("GUARD")["value"], 8)
+
+        self.p1.tick_statuses()
+        self.assertFalse(self.p1.has_status("CANNOT_MOVE"))
+        self.assertEqual(self.p1.status_effects.get("POSITIVE_GAIN_DOUBLED")["duration"], 1)
+
+        # Refreshing extends the expiry instead of adding a second entry
+        self.p1.add_status({"status_id": "POSITIVE_GAIN_DOUBLED", "duration": 3})
+        self.p1.tick_statuses()
+        self.assertTrue(self.p1.has_status("POSITIVE_GAIN_DOUBLED"))
+        self.assertFalse(self.p1.has_status("GUARD"))
+        self.assertEqual(len(self.p1.status_effects), 1)
+
+        # Event-bound durations don't expire on upkeep
+        self.p1.add_status({"status_id": "DAMAGE_BOOST", "duration": "NEXT_ATTACK", "value": 5})
+        self.p1.tick_statuses()
+        self.assertTrue(self.p1.has_status("DAMAGE_BOOST"))
+
+    def test_choice_uses_decision_policy(self):
+        """Verify CHOICE only offers affordable options and that targets come from the decision callback."""
+        offered = []
+        def decide(player, actions):
+            offered.append(list(actions))
+            return actions[-1]
+        engine = EffectEngine(self.gs, decide=decide)
+
+        choice_effect = {
+            "actions": [{"action": "CHOICE", "params": {"target": "SELF", "options": [
+                {"description": "too expensive", "cost": [{"resource": "gold", "value": 999}]},
+                {"description": "pay 5 gold", "cost": [{"resource": "gold", "value": 5}],
+                 "effect": {"actions": [{"action": "DEAL_DAMAGE", "params": {"target": "OPPONENT_CHOICE_SINGLE", "value": 7}}]}},
+            ]}}]
+        }
+        engine.queue_effect(choice_effect, self.p1)
+        engine.resolve_effects()
+
+        self.assertEqual(len(offered[0]), 1)           # Only the affordable option
+        self.assertEqual(len(offered[1]), 2)           # Both opponents are valid targets
+        self.assertEqual(self.p1.gold, 15)
+        self.assertEqual(self.p3.health, 93)           # The last target offered was picked
+        self.assertEqual(self.p2.health, 100)
+
     def test_targeting_same_zone(self):
         """Verify targeting players in the same zone."""
         zone_effect = {
@@ -0,0 +1,56 @@
+import unittest
+import logging
+import tempfile
+import zipfile
+
+from src.events import EventKind, EventRecorder, chunk_paths, iter_chunks
+from src.event_query import aggregate
+from src.policy import HeuristicPolicy
+from src.simulation import play_game
+
+class TestEvents(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(level=logging.WARNING)
+        self.assets_path = "tianji-fix-data-and/assets"
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_gold_events_account_for_every_change(self):
+        """Verify that the recorded gold changes add up to each player's final gold."""
+        with EventRecorder(self.tmp.name, chunk_size=64) as recorder:
+            result = play_game([HeuristicPolicy() for _ in range(3)], self.assets_path, seed=3, recorder=recorder)
+        self.assertGreater(len(chunk_paths(self.tmp.name)), 1)
+
+        gold = aggregate(self.tmp.name, group_by="player", kind=EventKind.RESOURCE_CHANGE, resource="gold")
+        self.assertEqual([100 + gold.get(seat, (0, 0))[1] for seat in range(3)], result.gold)
+        self.assertEqual({game for chunk in iter_chunks(self.tmp.name, fields=["game"]) for game in chunk["game"]}, {3})
+
+    def test_chunks_are_npy_archives(self):
+        """Verify that each chunk holds one .npy member per field with a NumPy header."""
+        with EventRecorder(self.tmp.name) as recorder:
+            play_game([HeuristicPolicy(), HeuristicPolicy()], self.assets_path, seed=1, max_rounds=2, recorder=recorder)
+        with zipfile.ZipFile(chunk_paths(self.tmp.name)[0]) as zf:
+            data = zf.read("amount.npy")
+        self.assertEqual(data[:8], b"\x93NUMPY\x01\x00")
+        header_len = int.from_bytes(data[8:10], "little")
+        self.assertEqual((10 + header_len) % 64, 0)
+        self.assertIn(b"'descr': '<i4'", data[10:10 + header_len])
+        self.assertEqual(len(data) - 10 - header_len, 4 * recorder.events_written)
+
+    def test_existing_chunks_are_not_overwritten(self):
+        """Verify that a second recorder refuses a directory with chunks from an earlier run, unless told to replace them."""
+        with EventRecorder(self.tmp.name, chunk_size=8) as recorder:
+            play_game([HeuristicPolicy(), HeuristicPolicy()], self.assets_path, seed=1, max_rounds=3, recorder=recorder)
+        self.assertGreater(recorder.chunks_written, 1)
+        with self.assertRaises(FileExistsError):
+            EventRecorder(self.tmp.name)
+        EventRecorder(self.tmp.name, prefix="other").close()
+
+        with EventRecorder(self.tmp.name, overwrite=True) as recorder:
+            play_game([HeuristicPolicy(), HeuristicPolicy()], self.assets_path, seed=2, max_rounds=1, recorder=recorder)
+        self.assertEqual(len(chunk_paths(self.tmp.name)), recorder.chunks_written)
+        self.assertEqual({game for chunk in iter_chunks(self.tmp.name, fields=["game"]) for game in chunk["game"]}, {2})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,4 @@
+import pickle
 import unittest
 import logging
 from unittest.mock import patch
@@ -5,6 +6,14 @@ from unittest.mock import patch
 from src.game import Game
 from src.player import Player
 from src.card import Card
+from src.card_collection import CardCollection
+from src.deck import DeckType
+from src.policy import FirstActionPolicy
+from src.mcts import MCTSPolicy
+from src.persistent_state import PersistentGameState
+from src.transposition import TranspositionTable
+from src.rules import RulesConfig
+from src import actions as act
 
 class TestGameLoop(unittest.TestCase):
 
@@ -89,5 +98,307 @@ class TestGameLoop(unittest.TestCase):
         #休门 (+10 health) should have been triggered and resolved.
         self.assertEqual(self.bob.health, initial_bob_health + 10)
 
+    def test_hand_index(self):
+        """Tests that injected test cards leave the deck and that hands are indexed by card type."""
+        game = Game(player_names=["Alice", "Bob"], assets_path_str=self.assets_path)
+        game.setup(test_cards=["basic_14_da_you"])
+        alice = game.game_state.get_player("1")
+
+        self.assertIsNotNone(alice.hand.get("basic_14_da_you"))
+        self.assertNotIn("basic_14_da_you", [c.card_id for c in game.game_state.basic_deck])
+        self.assertEqual(len(alice.hand.of_type('basic')), len(alice.hand))
+
+        played = alice.play_card("basic_14_da_you")
+        self.assertIs(alice.played_card, played)
+        self.assertNotIn(played, alice.hand.of_type('basic'))
+        strokes = [c.strokes for c in alice.hand.sorted_by_strokes('basic')]
+        self.assertEqual(strokes, sorted(strokes))
+
+    def test_deck_reshuffle(self):
+        """Tests that an empty deck reshuffles its discard pile back in place."""
+        deck = self.game.game_state.celestial_stem_deck
+        drawn = [deck.draw() for _ in range(len(deck))]
+        for card in drawn:
+            deck.discard(card)
+        self.assertEqual(len(deck), 0)
+        self.assertEqual(deck.discard_pile(), drawn)
+
+        self.game._reshuffle_if_needed(DeckType.CELESTIAL_STEM)
+        self.assertEqual(deck.discard_count, 0)
+        self.assertEqual(sorted(c.card_id for c in deck), sorted(c.card_id for c in drawn))
+
+    def test_deck_remove_by_id(self):
+        """Tests that removals by id stay correct as draws and appends move cards around the index."""
+        deck = self.game.game_state.basic_deck
+        expected = list(deck)
+        first = expected[0]
+        removed = deck.remove_by_id(first.card_id)
+        self.assertEqual(removed.card_id, first.card_id)
+        # Swap-removal moves the top card into the freed slot
+        expected[expected.index(removed)] = expected.pop()
+
+        drawn = deck.draw()
+        self.assertIs(drawn, expected.pop())
+        deck.append(drawn)
+        expected.append(drawn)
+        self.assertIs(deck.remove_by_id(drawn.card_id), drawn)
+        expected.remove(drawn)
+        self.assertEqual(list(deck), expected)
+
+        deck.shuffle()
+        for card in list(deck):
+            self.assertEqual(deck.remove_by_id(card.card_id).card_id, card.card_id)
+        self.assertEqual(len(deck), 0)
+        self.assertIsNone(deck.remove_by_id(first.card_id))
+
+    def test_cached_to_dict(self):
+        """Tests that to_dict reuses unchanged sub-dicts and that mutations bump the state version."""
+        gs = self.game.game_state
+        first = gs.to_dict()
+        self.assertIs(gs.to_dict(), first)
+
+        version = gs.state_version
+        self.alice.gold += 7
+        self.assertGreater(gs.state_version, version)
+
+        second = gs.to_dict()
+        self.assertIsNot(second, first)
+        self.assertEqual(second["players"][0]["gold"], self.alice.gold)
+        self.assertIs(second["players"][1], first["players"][1])
+        self.assertIs(second["game_board"], first["game_board"])
+
+        gs.game_board.get_zone("li_tian").gold_reward = 5
+        third = gs.to_dict()
+        self.assertEqual(third["game_board"]["zones"]["li_tian"]["gold_reward"], 5)
+        self.assertIs(third["game_board"]["zones"]["kan_di"], first["game_board"]["zones"]["kan_di"])
+
+        # A replaced container restarts its own count; the owner's version must still never repeat
+        version, hand = self.alice.version, self.alice.to_dict()["hand"]
+        self.alice.hand = CardCollection()
+        self.alice.hand.extend(list(self.bob.hand)[:len(hand) - 1])
+        self.assertGreater(self.alice.version, version)
+        self.assertEqual(len(self.alice.to_dict()["hand"]), len(hand) - 1)
+
+    def test_legal_actions_and_policy(self):
+        """Tests that phases take decisions from the player's policy, among the enumerated legal actions."""
+        gs = self.game.game_state
+        gs.set_phase("MOVEMENT")
+        moves = act.legal_actions(gs, self.alice)
+        self.assertEqual({act.zone_for(gs, code) for code in moves}, {"li_ren", "zhong_gong"})
+        self.assertFalse(act.is_legal(gs, self.alice, act.encode(act.ActionKind.MOVE, gs.game_board.zone_index("kan_di"))))
+
+        self.game.set_policy(self.alice.player_id, FirstActionPolicy())
+        first_card = act.card_for(gs, act.legal_placements(gs, self.alice)[0])
+        self.game._execute_placement_phase()
+        self.assertIs(self.alice.played_card, first_card)
+
+    def test_legal_decisions(self):
+        """Tests that is_legal checks moves against has_moved and mid-resolution decisions against what is on offer."""
+        gs = self.game.game_state
+        gs.set_phase("MOVEMENT")
+        to_li_ren = act.encode(act.ActionKind.MOVE, gs.game_board.zone_index("li_ren"))
+        self.assertTrue(act.is_legal(gs, self.alice, to_li_ren))
+        self.alice.has_moved = True
+        self.assertFalse(act.is_legal(gs, self.alice, to_li_ren))
+
+        duel = act.Decision(act.ActionKind.DUEL_CARD)
+        card_code = act.legal_duel_cards(gs, self.alice)[0]
+        self.assertTrue(act.is_legal(gs, self.alice, card_code, duel))
+        self.assertFalse(act.is_legal(gs, self.alice, act.legal_duel_cards(gs, self.bob)[0], duel))
+
+        choice = act.Decision(act.ActionKind.CHOOSE_OPTION, options=[
+            {"cost": [{"resource": "gold", "value": 1000}]},
+            {"cost": []},
+        ])
+        self.assertFalse(act.is_legal(gs, self.alice, act.encode(act.ActionKind.CHOOSE_OPTION, 0), choice))
+        self.assertTrue(act.is_legal(gs, self.alice, act.encode(act.ActionKind.CHOOSE_OPTION, 1), choice))
+        self.assertFalse(act.is_legal(gs, self.alice, act.encode(act.ActionKind.CHOOSE_OPTION, 2), choice))
+
+        target = act.Decision(act.ActionKind.CHOOSE_TARGET, candidates=[self.bob])
+        self.assertTrue(act.is_legal(gs, self.alice, act.encode(act.ActionKind.CHOOSE_TARGET, gs.seat_of(self.bob)), target))
+        self.assertFalse(act.is_legal(gs, self.alice, act.encode(act.ActionKind.CHOOSE_TARGET, gs.seat_of(self.alice)), target))
+
+    def test_mcts_policy(self):
+        """Tests that the MCTS bot picks legal actions and carries its subtree into the next decision."""
+        bot = MCTSPolicy(time_budget=5.0, max_iterations=30, rollout_rounds=1)
+        self.game.set_policy(self.alice.player_id, bot)
+        self.game._execute_time_phase()
+
+        self.game._execute_placement_phase()
+        self.assertIsNotNone(self.alice.played_card)
+        self.assertEqual(bot.last_stats.iterations, 30)
+        self.assertGreater(bot.last_stats.nodes_per_second, 0)
+
+        # The round resumes from the movement phase; the search below the chosen placement is reused
+        self.game._execute_movement_phase()
+        self.assertIn(self.alice.position, {"li_ren", "zhong_gong"})
+        self.assertGreater(bot.last_stats.reused_visits, 0)
+
+    def test_mcts_searches_its_move(self):
+        """Tests that a fresh MCTS bot grows MOVE children at a movement decision instead of falling back."""
+        class RecordingFallback(FirstActionPolicy):
+            calls = 0
+
+            def choose(self, game_state, player, actions):
+                RecordingFallback.calls += game_state is live_state
+                return super().choose(game_state, player, actions)
+
+        live_state = self.game.game_state
+        self.game._execute_time_phase()
+        self.game._execute_placement_phase()
+        bot = MCTSPolicy(time_budget=5.0, max_iterations=20, rollout_rounds=1, fallback=RecordingFallback())
+        self.game.set_policy(self.alice.player_id, bot)
+        self.game._execute_movement_phase()
+
+        root_actions = list(bot.last_stats.root_visits)
+        self.assertTrue(root_actions)
+        self.assertTrue(all(act.kind_of(a) == act.ActionKind.MOVE for a in root_actions))
+        self.assertEqual(bot.last_stats.reused_visits, 0)
+        self.assertEqual(RecordingFallback.calls, 0)
+
+    def test_zobrist_hash(self):
+        """Tests that the incremental state hash tracks mutations and matches a freshly built copy."""
+        gs = self.game.game_state
+        start = gs.hash
+        self.alice.gold += 1    # Same bucket: 50 -> 51
+        self.assertEqual(gs.hash, start)
+        self.alice.gold += 10
+        self.assertNotEqual(gs.hash, start)
+        self.alice.gold -= 11
+        self.assertEqual(gs.hash, start)
+
+        card = next(iter(self.alice.hand))
+        self.alice.play_card(card.card_id)
+        self.assertNotEqual(gs.hash, start)
+        self.alice.hand.append(card)
+        self.alice.played_card = None
+        self.assertEqual(gs.hash, start)
+
+        self.game.run_round(1)
+        self.game.run_round(2)
+        self.assertEqual(PersistentGameState.freeze(gs).thaw().hash, gs.hash)
+
+    def test_transposition_table_replacement(self):
+        """Tests that a full bucket keeps the heavier entry and yields old generations."""
+        table = TranspositionTable(capacity=2)
+        table.store(0, "a", weight=5)
+        table.store(2, "b", weight=1)
+        self.assertFalse(table.store(4, "c", weight=0))  # Lighter than both occupants
+        self.assertTrue(table.store(4, "c", weight=3))   # Replaces "b"
+        self.assertEqual((table.get(0), table.get(2), table.get(4)), ("a", None, "c"))
+
+        table.new_generation()
+        self.assertTrue(table.store(6, "d", weight=0))
+        self.assertEqual(table.get(6), "d")
+        self.assertEqual(len(table), 2)
+
+    def test_rules_config(self):
+        """Tests that setup and the duel read their constants from the game's rules config."""
+        rules = RulesConfig(starting_gold=30, starting_health=80, hand_size=5, fund_per_player=40, duel_stake=12)
+        game = Game(player_names=["Alice", "Bob"], assets_path_str=self.assets_path, rules=rules)
+        game.setup()
+        alice, bob = game.game_state.players
+        self.assertEqual((alice.gold, alice.health, len(alice.hand)), (30, 80, 5))
+        self.assertEqual(game.game_state.game_fund, 80)
+
+        alice.hand.clear()
+        bob.hand.clear()
+        alice.add_card_to_hand(Card(card_id="c1", name="C1", card_type="basic", strokes=3))
+        bob.add_card_to_hand(Card(card_id="c2", name="C2", card_type="basic", strokes=9))
+        game._trigger_lun_dao(alice, bob)
+        self.assertEqual((alice.gold, bob.gold), (42, 18))
+        self.assertNotEqual(rules.key, RulesConfig().key)
+
+    def test_interpretation_dispatch(self):
+        """Tests the per-department effect table and the Luo Shu/department interpretation order."""
+        default = {"actions": [{"action": "GAIN_RESOURCE", "params": {"target": "SELF", "resource": "gold", "value": 1}}]}
+        tian = {"actions": [{"action": "GAIN_RESOURCE", "params": {"target": "SELF", "resource": "gold", "value": 7}}]}
+        card = Card(card_id="c", name="C", card_type="basic", effect=default,
+                    core_mechanism={"variants": {"tian": {"effect": tian}}})
+        self.assertEqual(card.department_effects, (tian, default, default, default))
+
+        # Kan (Luo Shu 1) resolves before Li (9); within a palace, tian before di
+        order = []
+        self.game.effect_engine.queue_effect = lambda effect, player: order.append((player.name, effect))
+        self.game.effect_engine.resolve_effects = lambda: None
+        self.alice.position, self.bob.position = "li_tian", "kan_di"
+        self.alice.played_card, self.bob.played_card = card, card
+        self.game._execute_interpretation_phase()
+        self.assertEqual(order, [("Bob", default), ("Alice", tian)])
+
+        order.clear()
+        self.bob.position = "li_di"
+        self.game._execute_interpretation_phase()
+        self.assertEqual([name for name, _ in order], ["Alice", "Bob"])
+
+    def test_event_driven_elimination(self):
+        """Tests that health crossing zero marks the player and the next check eliminates them."""
+        active = self.game.active_players
+        self.assertIs(self.game.active_players, active)  # No rebuild between eliminations
+        self.bob.change_resource("health", -self.bob.health)
+        self.alice.change_resource("health", -5)
+        self.assertEqual(self.game._depleted, [self.bob])
+        self.assertFalse(self.bob.is_eliminated)
+
+        self.game._apply_eliminations()
+        self.assertTrue(self.bob.is_eliminated)
+        self.assertEqual(self.game.active_players, [self.alice])
+        self.assertEqual(active, [self.alice, self.bob])  # Lists handed out earlier are not modified
+
+        # Healed before the check: not eliminated
+        self.alice.change_resource("health", -self.alice.health)
+        self.alice.change_resource("health", 10)
+        self.game._apply_eliminations()
+        self.assertFalse(self.alice.is_eliminated)
+        self.assertNotIn('_on_health_depleted', pickle.loads(pickle.dumps(self.alice)).__dict__)
+
+    def test_large_lobby(self):
+        """Tests large-lobby setup, per-zone Lun Dao pairing and batched group effects."""
+        game = Game(player_names=[f"P{i}" for i in range(120)], assets_path_str=self.assets_path, large_lobby=True)
+        game.setup()
+        players = game.game_state.players
+        self.assertTrue(all(p.position for p in players))
+        self.assertTrue(all(len(p.hand) == game.rules.hand_size for p in players))
+
+        duels = []
+        game._trigger_lun_dao = lambda challenger, defender: duels.extend((challenger, defender))
+        game._execute_movement_phase()
+        self.assertTrue(duels)
+        self.assertEqual(len(duels), len(set(map(id, duels))))  # Nobody duels twice in a round
+        for challenger, defender in zip(duels[::2], duels[1::2]):
+            self.assertEqual(challenger.position, defender.position)
+
+        # Group changes are deferred, then match applying them one player at a time
+        engine = game.effect_engine
+        source = players[0]
+        before = [(p.gold, p.health) for p in players]
+        engine.queue_effect({"actions": [
+            {"action": "LOSE_RESOURCE", "params": {"target": "OPPONENT_ALL", "resource": "gold", "value": 3}},
+            {"action": "DEAL_DAMAGE", "params": {"target": "ALL_PLAYERS", "value": 2}},
+        ]}, source)
+        engine.queue_effect({"actions": [
+            {"action": "GAIN_RESOURCE", "params": {"target": "SELF", "resource": "gold", "value": 1}},
+        ]}, players[1])
+        engine.resolve_effects()
+        expected = [(gold - (3 if p is not source else 0) + (1 if p is players[1] else 0), health - 2)
+                    for p, (gold, health) in zip(players, before)]
+        self.assertEqual([(p.gold, p.health) for p in players], expected)
+
+        # Single-opponent choices stay open to every opponent unless the rules narrow them to the zone
+        offered = []
+
+        class RecordingPolicy(FirstActionPolicy):
+            def choose(self, game_state, player, actions):
+                offered.append(len(actions))
+                return super().choose(game_state, player, actions)
+
+        game.set_policy(source.player_id, RecordingPolicy())
+        neighbours = [p for p in players if p.position == source.position and p is not source]
+        self.assertTrue(neighbours)
+        engine._get_targets("OPPONENT_CHOICE_SINGLE", source)
+        game.game_state.rules = RulesConfig(local_choice_targets=True)
+        engine._get_targets("OPPONENT_CHOICE_SINGLE", source)
+        self.assertEqual(offered, [len(players) - 1, len(neighbours)])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
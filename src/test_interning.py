@@ -0,0 +1,51 @@
+import copy
+import pickle
+import unittest
+
+from src.effect_engine import EffectEngine
+from src.game_state import GameState
+from src.interning import FrozenDict, Interner, intern_effect
+from src import qimen as qm
+
+
+class TestInterning(unittest.TestCase):
+
+    def test_equal_subtrees_are_shared(self):
+        interner = Interner()
+        gain = {"action": "GAIN_RESOURCE", "params": {"target": "SELF", "resource": "gold", "value": 5}}
+        a = interner.intern({"actions": [gain, {"action": "DRAW_CARD", "params": {"count": 1}}]})
+        b = interner.intern({"actions": [dict(gain)], "cost": []})
+        self.assertIs(a["actions"][0], b["actions"][0])
+        self.assertIsInstance(a, FrozenDict)
+        self.assertIsInstance(a["actions"], tuple)
+        # Key order does not matter; value types do (1 == True == 1.0 in Python)
+        self.assertIs(interner.intern({"x": 1, "y": 2}), interner.intern({"y": 2, "x": 1}))
+        self.assertIsNot(interner.intern({"x": 1}), interner.intern({"x": True}))
+        self.assertIsNot(interner.intern({"x": 1}), interner.intern({"x": 1.0}))
+
+    def test_nodes_are_immutable_and_survive_copies(self):
+        node = Interner().intern({"params": {"value": 3}})
+        with self.assertRaises(TypeError):
+            node["params"] = {}
+        with self.assertRaises(TypeError):
+            node.update(x=1)
+        self.assertIs(copy.deepcopy(node), node)
+        restored = pickle.loads(pickle.dumps(node))
+        self.assertEqual(restored, node)
+        self.assertIsInstance(restored, FrozenDict)
+
+    def test_gate_effects_share_nodes_and_cache_priority(self):
+        # Cards interned by the loader get the very nodes the gates use
+        gain_gold = {"action": "GAIN_RESOURCE", "params": {"target": "SELF", "resource": "gold", "value": 5}}
+        self.assertIs(intern_effect(gain_gold), qm.GATE_EFFECTS["开"]["effect"]["actions"][0])
+
+        interner = Interner()
+        engine = EffectEngine(GameState())
+        effect = interner.intern({"actions": [{"action": "MODIFY_RULE", "params": {"rule_id": "r"}}]})
+        self.assertEqual(engine._get_effect_priority(effect), 2)
+        self.assertEqual(engine._get_effect_priority(effect), 2)
+        self.assertEqual(engine._get_effect_priority({"actions": []}), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import pickle
+import unittest
+
+from src.loadtest import LatencyTracker, LevelResult, find_saturation, format_report, percentile
+
+
+class TestLoadTest(unittest.TestCase):
+
+    def test_latency_tracking_and_merge(self):
+        """Verify that replies resolve exactly the sends they name and that process results merge and pickle."""
+        result = LevelResult(clients=2, duration=10.0)
+        tracker = LatencyTracker(result)
+        first = tracker.sent("next_round", 1.0)
+        second = tracker.sent("next_round", 1.5)
+        tracker.done([first, second], 2.0)  # Both sends were coalesced into one round
+        running = tracker.sent("next_round", 2.5)
+        follow_up = tracker.sent("next_round", 3.0)  # Queued behind the running round
+        tracker.done([running], 3.5)
+        tracker.done([follow_up], 5.0)
+        rejected = tracker.sent("start_game", 3.0)
+        tracker.rejected([rejected], 3.25)
+        dropped = [tracker.sent("next_round", 4.0), tracker.sent("next_round", 4.5)]
+        tracker.rejected(dropped, 5.0)  # A reset dropped both
+        tracker.done(dropped, 6.0)  # Already resolved
+        self.assertEqual(result.latencies["next_round"], [1000.0, 500.0, 1000.0, 2000.0])
+        self.assertEqual((result.completed["next_round"], result.rejected["start_game"]), (4, 1))
+        self.assertEqual(result.latencies["next_round (rejected)"], [1000.0, 500.0])
+
+        merged = LevelResult()
+        merged.merge(pickle.loads(pickle.dumps(result.to_plain())))
+        merged.merge(result.to_plain())
+        row = merged.row()
+        self.assertEqual((row["clients"], row["sent/s"], row["done/s"], row["rejected"]), (4, 1.4, 0.8, 6))
+        self.assertAlmostEqual(row["reject %"], 300 / 7)
+        self.assertEqual(row["p50 ms"], 1000.0)
+        self.assertEqual(percentile([5, 1, 4, 2, 3], 90), 5)
+
+    def test_saturation_point(self):
+        """Verify that the first level over the latency or rejection budget, or with stalled throughput, is reported."""
+        def row(clients, sent, done, p99, reject=0.0):
+            return {"clients": clients, "failed": 0, "sent/s": sent, "done/s": done, "p99 ms": p99, "reject %": reject}
+
+        rows = [row(10, 2, 2, 20.0), row(100, 20, 19, 40.0), row(1000, 200, 20, 90.0), row(2000, 400, 20, 900.0)]
+        self.assertEqual(find_saturation(rows, slo_ms=250, min_gain=0.1)["clients"], 1000)
+        self.assertEqual(find_saturation(rows, slo_ms=50, min_gain=100)["clients"], 1000)
+        self.assertIsNone(find_saturation(rows[:2], slo_ms=250, min_gain=0.1))
+        # Fast answers can still be rejections: a full queue is saturation too
+        rows[1] = row(100, 20, 19, 10.0, reject=30.0)
+        self.assertEqual(find_saturation(rows, slo_ms=250, min_gain=0.1)["clients"], 100)
+        self.assertIsNone(find_saturation(rows[:2], slo_ms=250, min_gain=0.1, max_reject=50.0))
+        self.assertIn("Saturation at 1000 clients", format_report(rows, rows[2], 250))
+
+
+if __name__ == '__main__':
+    unittest.main()
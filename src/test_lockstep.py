@@ -0,0 +1,62 @@
+import json
+import logging
+import random
+import unittest
+
+from src.lockstep import LockstepClient, LockstepHost, state_checksum
+from src.mcts import MCTSPolicy
+
+
+class TestLockstep(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(level=logging.WARNING)
+        self.assets_path = "tianji-fix-data-and/assets"
+        self.host = LockstepHost(["A", "B", "C"], self.assets_path, seed=7)
+
+    def test_client_replays_rounds_from_decisions(self):
+        """Verify that a client fed only the seed and per-round decisions stays in sync with the host."""
+        client = LockstepClient(self.assets_path)
+        self.assertTrue(client.start(self.host.start()))
+        for _ in range(6):
+            random.random()  # Other users of the module-level RNG must not affect the game
+            message = self.host.run_round()
+            self.assertTrue(client.apply_round(message))
+            self.assertLess(len(json.dumps(message)), len(json.dumps(self.host.snapshot(), ensure_ascii=False)) // 10)
+        self.assertEqual(client.game.game_state.to_dict()["players"], self.host.game.game_state.to_dict()["players"])
+
+        # A client joining late catches up from the start message and the history
+        late = LockstepClient(self.assets_path)
+        self.assertTrue(late.start(self.host.start_message))
+        self.assertTrue(all(late.apply_round(message) for message in self.host.history))
+
+    def test_mcts_host_stays_in_sync(self):
+        """Verify that MCTS searches don't consume the game's random sequence, whatever their iteration count."""
+        host = LockstepHost(["A", "B", "C"], self.assets_path, seed=0,
+                            policy=MCTSPolicy(time_budget=0.01, rng=random.Random(0)))
+        client = LockstepClient(self.assets_path)
+        self.assertTrue(client.start(host.start()))
+        for _ in range(12):
+            self.assertTrue(client.apply_round(host.run_round()))
+
+    def test_desync_is_detected(self):
+        """Verify that tampered decisions or checksums are reported as a desync."""
+        client = LockstepClient(self.assets_path)
+        client.start(self.host.start())
+        message = dict(self.host.run_round())
+        message["checksum"] = "0" * 16
+        self.assertFalse(client.apply_round(message))
+
+        other = LockstepClient(self.assets_path)
+        other.start(self.host.start_message)
+        message = dict(self.host.history[0])
+        message["decisions"] = message["decisions"][:-2]  # One decision missing
+        self.assertFalse(other.apply_round(message))
+
+        snapshot = self.host.snapshot()
+        self.assertEqual(snapshot["checksum"], state_checksum(self.host.game.game_state))
+        self.assertFalse(self.host.accepts(1, "not-the-same-cards"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+import random
+import statistics
+
+from src.metrics import GameRecord, MetricsAggregate, QuantileSketch, RunningStats
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(7)
+        self.values = [rng.gauss(100, 30) for _ in range(5000)]
+
+    def test_running_stats_merge(self):
+        """Verify that merged Welford partials match the statistics of all values."""
+        left, right = RunningStats(), RunningStats()
+        for x in self.values[:1234]:
+            left.add(x)
+        for x in self.values[1234:]:
+            right.add(x)
+        left.merge(right)
+        self.assertEqual(left.count, len(self.values))
+        self.assertAlmostEqual(left.mean, statistics.fmean(self.values))
+        self.assertAlmostEqual(left.variance, statistics.variance(self.values))
+        self.assertEqual((left.min, left.max), (min(self.values), max(self.values)))
+
+    def test_quantile_sketch(self):
+        """Verify that merged sketches answer quantiles within their relative accuracy in bounded memory."""
+        a, b = QuantileSketch(), QuantileSketch()
+        for i, x in enumerate(self.values):
+            (a if i % 2 else b).add(x)
+        a.merge(b)
+        ordered = sorted(self.values)
+        for q in (0.1, 0.5, 0.9, 0.99):
+            exact = ordered[int(q * (len(ordered) - 1))]
+            self.assertAlmostEqual(a.quantile(q), exact, delta=abs(exact) * 0.021)
+
+        small = QuantileSketch(max_buckets=16)
+        for x in range(1, 10000):
+            small.add(x)
+        self.assertLessEqual(len(small.positive), 16)
+        self.assertAlmostEqual(small.quantile(0.99), 9900, delta=9900 * 0.02)
+
+    def test_aggregate_roundtrip(self):
+        """Verify that partial aggregates survive serialization and merge into the metrics file shape."""
+        partial = MetricsAggregate()
+        partial.add_game(GameRecord(rounds=12, outcomes=[1.0, 0.0], gold=[120, 40], health=[200, 150],
+                                    plays=[{"basic_01_qian": 2}, {"basic_01_qian": 1, "basic_02_kun": 1}],
+                                    gold_curve=[1.0, 0.9]))
+        total = MetricsAggregate.from_dict(partial.to_dict())
+        total.merge(partial)
+
+        metrics = total.to_metrics_json()
+        self.assertEqual(metrics["games"], 2)
+        self.assertEqual(metrics["card_usage"], {"basic_01_qian": 6, "basic_02_kun": 2})
+        self.assertEqual(metrics["card_winrate"], {"basic_01_qian": 0.5, "basic_02_kun": 0.0})
+        self.assertEqual(metrics["avg_game_length"], 12)
+        self.assertEqual(metrics["game_length"]["p50"], 12)
+        self.assertEqual(metrics["resource_curve"], [1.0, 0.9])
+
+if __name__ == '__main__':
+    unittest.main()
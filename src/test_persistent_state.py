@@ -0,0 +1,75 @@
+import unittest
+import logging
+
+from src.game import Game
+from src.persistent import PMap, PVector
+from src.persistent_state import PersistentGameState, TimelineAdapter
+
+class TestPersistentState(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(level=logging.WARNING)
+        self.game = Game(player_names=["Alice", "Bob"], assets_path_str="tianji-fix-data-and/assets")
+        self.game.setup()
+        self.snapshot = PersistentGameState.freeze(self.game.game_state)
+        self.adapter = TimelineAdapter(self.game)
+
+    def test_collections_are_persistent(self):
+        """Verify that updates return new collections and leave the originals untouched."""
+        m1 = PMap({"a": 1, "b": 2})
+        m2 = m1.set("a", 10).set("c", 3)
+        self.assertEqual(dict(m1.items()), {"a": 1, "b": 2})
+        self.assertEqual(dict(m2.items()), {"a": 10, "b": 2, "c": 3})
+
+        v1 = PVector(range(100))
+        v2 = v1.append(100).set(0, -1)
+        last, v3 = v2.pop()
+        self.assertEqual(list(v1), list(range(100)))
+        self.assertEqual(v2[0], -1)
+        self.assertEqual(last, 100)
+        self.assertEqual(len(v3), 100)
+
+    def test_branches_share_unchanged_nodes(self):
+        """Verify that a phase run through the adapter only replaces what it changed."""
+        after_time = self.adapter.run_phase(self.snapshot, "TIME")
+
+        # The time phase doesn't touch players, so they are shared with the parent snapshot
+        for player_id in self.snapshot.player_order:
+            self.assertIs(after_time.players[player_id], self.snapshot.players[player_id])
+        # Zones outside Tian/Di departments are never updated by the time phase
+        self.assertIs(after_time.zones["zhong_gong"], self.snapshot.zones["zhong_gong"])
+        # The parent snapshot still has no stem drawn
+        self.assertIsNone(self.snapshot.current_celestial_stem)
+        self.assertIsNotNone(after_time.current_celestial_stem)
+
+    def test_thaw_is_lazy(self):
+        """Verify that a thawed state only materializes the zones and decks that are used."""
+        game_state = self.snapshot.thaw()
+        zones = game_state.game_board.zones
+        self.assertEqual(list(zones), list(self.snapshot.zone_order))
+        self.assertEqual(zones.thawed(), [])
+
+        zones["li_tian"].gold_reward = 7
+        self.assertEqual([zone_id for zone_id, _ in zones.thawed()], ["li_tian"])
+        self.assertEqual(game_state.decks.thawed(), [])
+
+        refrozen = PersistentGameState.freeze(game_state)
+        self.assertEqual(refrozen.zones["li_tian"].gold_reward, 7)
+        self.assertIs(refrozen.zones["kan_di"], self.snapshot.zones["kan_di"])
+        self.assertEqual(refrozen.zone_order, self.snapshot.zone_order)
+
+    def test_what_if_branch(self):
+        """Verify that two branches from the same snapshot evolve independently."""
+        rich = self.snapshot.with_player("1", gold=500)
+        self.assertEqual(self.snapshot.get_player("1").gold, 100)
+        self.assertIs(rich.get_player("2"), self.snapshot.get_player("2"))
+
+        branch = self.adapter.run_phase(rich, "RESOLUTION")
+        self.assertGreaterEqual(branch.get_player("1").gold, 0)
+        self.assertEqual(rich.get_player("1").gold, 500)
+        # The game's own state is restored after running a branch
+        self.assertIs(self.game.game_state, self.game.effect_engine.game_state)
+        self.assertEqual(self.game.game_state.get_player("1").gold, 100)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+
+from src.room_commands import COALESCED, QUEUED, REJECTED, BroadcastLimiter, CommandQueue
+
+
+class TestRoomCommands(unittest.TestCase):
+
+    def test_coalescing_and_bounded_depth(self):
+        """Verify that repeated commands merge, resets supersede the queue and the depth is bounded."""
+        queue = CommandQueue(max_depth=3)
+        self.assertEqual(queue.submit("next_round", "a", 1)[:2], (QUEUED, True))
+        running = queue.next()
+        # Clicks while the round runs queue one follow-up round, which later clicks join
+        self.assertEqual(queue.submit("next_round", "b", 1)[:2], (QUEUED, False))
+        self.assertEqual(queue.submit("next_round", "a", 2)[:2], (COALESCED, False))
+        self.assertEqual(queue.submit("next_round", "c")[:2], (COALESCED, False))
+        self.assertEqual(queue.submit("start_game", "a", 3).status, QUEUED)
+        self.assertEqual(queue.submit("custom", "a", 4).status, QUEUED)
+        self.assertEqual(queue.submit("custom", "a", 5).status, REJECTED)
+        self.assertEqual(running.name, "next_round")
+        # Only the send that started the round is answered by it, not the follow-up from the same client
+        self.assertEqual(queue.complete(), {"a": [1]})
+
+        # A reset drops the pending commands and returns who was waiting for them
+        submission = queue.submit("reset_game", "d", 1)
+        self.assertEqual(submission.status, QUEUED)
+        self.assertEqual(submission.superseded, {"next_round": {"b": [1], "a": [2], "c": [None]},
+                                                 "start_game": {"a": [3]}, "custom": {"a": [4]}})
+        self.assertEqual(queue.next().name, "reset_game")
+        self.assertEqual(queue.complete(), {"d": [1]})
+        self.assertIsNone(queue.next())
+        # The worker stopped, so the next command must start a new one
+        self.assertEqual(queue.submit("next_round")[:2], (QUEUED, True))
+        self.assertEqual(queue.stats["superseded"], 3)
+
+    def test_broadcast_limiter(self):
+        """Verify that pushes within a frame interval are merged into one delayed push."""
+        limiter = BroadcastLimiter(interval=0.05)
+        self.assertEqual(limiter.request(now=10.0), 0.0)
+        self.assertAlmostEqual(limiter.request(now=10.01), 0.04)
+        self.assertIsNone(limiter.request(now=10.02))
+        limiter.flushed(now=10.05)
+        self.assertGreater(limiter.request(now=10.06), 0)
+        limiter.flushed(now=10.1)
+        self.assertEqual(limiter.request(now=10.2), 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
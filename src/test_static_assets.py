@@ -0,0 +1,58 @@
+import gzip
+import json
+import logging
+import unittest
+from pathlib import Path
+
+from src.game import Game
+from src.static_assets import REVALIDATE, AssetManifest, StaticFile, catalog_file, hashed_name
+from src.wire import WireCatalog, compact_state, expand_state
+
+
+class TestStaticAssets(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(level=logging.WARNING)
+        self.assets_path = Path("tianji-fix-data-and/assets")
+
+    def test_conditional_and_compressed_responses(self):
+        """Verify ETag revalidation and that compressed variants are chosen by Accept-Encoding."""
+        static = StaticFile(b'{"zones": []}' * 100, "application/json")
+        status, headers, body = static.response(accept_encoding="gzip;q=0.5, identity")
+        self.assertEqual((status, headers["Content-Encoding"]), (200, "gzip"))
+        self.assertEqual(gzip.decompress(body), static.body)
+        self.assertEqual(static.response(if_none_match=headers["ETag"], accept_encoding="gzip")[0], 304)
+        # Another representation's ETag does not validate this one
+        status, headers, body = static.response(if_none_match=headers["ETag"], accept_encoding="gzip;q=0")
+        self.assertEqual((status, body), (200, static.body))
+        self.assertNotIn("Content-Encoding", headers)
+        self.assertEqual(static.response(cache_control=REVALIDATE)[1]["Cache-Control"], REVALIDATE)
+
+        # Already-compressed content gets no variants
+        self.assertEqual(StaticFile(b"\x89PNG", "image/png").variants, {})
+
+    def test_manifest_and_catalog(self):
+        """Verify content-hashed image URLs and an id-only state that expands back with the catalog."""
+        self.assertEqual(hashed_name("cards/a.b.png", "0123456789abcdef"), "cards/a.b.0123456789ab.png")
+        images = AssetManifest(self.assets_path / "images", "/assets")
+        url = images.url_for("cards/basic/basic_01_qian.png")
+        self.assertTrue(url.startswith("/assets/cards/basic/basic_01_qian."))
+        name = url[len("/assets/"):]
+        self.assertEqual(images.get(name).body, (self.assets_path / "images/cards/basic/basic_01_qian.png").read_bytes())
+
+        game = Game(["A", "B"], str(self.assets_path))
+        game.setup()
+        catalog = WireCatalog.for_game(game)
+        document = json.loads(catalog_file(catalog, images).body)
+        self.assertEqual(document["version"], game.loader.bundle_hash())
+        self.assertEqual(document["card_images"]["basic_01_qian"], url)
+
+        state = game.game_state.to_dict()
+        compact = compact_state(state)
+        self.assertNotIn("palace", next(iter(compact["game_board"]["zones"].values())))
+        self.assertTrue(all(isinstance(card, str) for card in compact["players"][0]["hand"]))
+        self.assertEqual(expand_state(compact, WireCatalog.from_dict(document)), state)
+
+
+if __name__ == '__main__':
+    unittest.main()
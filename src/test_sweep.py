@@ -0,0 +1,30 @@
+import unittest
+import logging
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+from src import sweep
+from src.rules import RulesConfig
+
+class TestSweep(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(level=logging.WARNING)
+        self.assets_path = "tianji-fix-data-and/assets"
+
+    def test_cached_points_are_not_replayed(self):
+        """Verify that a repeated sweep only simulates (config, seed) pairs it hasn't seen."""
+        configs = list(sweep.grid({"duel_stake": [3, 10]}))
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_path = str(Path(tmp) / "cache.jsonl")
+            first = sweep.run_sweep(configs, self.assets_path, games=3, max_rounds=2, cache=sweep.ResultCache(cache_path))
+
+            with patch.object(sweep, "play_config", wraps=sweep.play_config) as play:
+                configs.append(RulesConfig(duel_stake=20))
+                again = sweep.run_sweep(configs, self.assets_path, games=3, max_rounds=2, cache=sweep.ResultCache(cache_path))
+            self.assertEqual(play.call_count, 1)  # Only the new config
+            self.assertEqual(again[:2], first)
+
+if __name__ == '__main__':
+    unittest.main()
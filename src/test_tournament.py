@@ -0,0 +1,46 @@
+import unittest
+import logging
+import tempfile
+from pathlib import Path
+
+from src.tournament import MatchResult, Tournament, fit_ratings, schedule
+
+class TestTournament(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(level=logging.WARNING)
+        self.assets_path = "tianji-fix-data-and/assets"
+
+    def test_schedule_rotates_seats(self):
+        """Verify that every pairing is played from both seats."""
+        matchups = [m.agents for m, _ in zip(schedule(["a", "b", "c"], seats=2), range(6))]
+        self.assertEqual(sorted(matchups), sorted([("a", "b"), ("b", "a"), ("a", "c"), ("c", "a"), ("b", "c"), ("c", "b")]))
+
+    def test_fit_ratings(self):
+        """Verify that a dominant agent is rated higher and that more games narrow the interval."""
+        def results(count):
+            return [MatchResult(i, ("strong", "weak"), i, [300, 100], [1.0, 0.0], 20) for i in range(count)]
+        few = fit_ratings(["strong", "weak"], results(10))
+        many = fit_ratings(["strong", "weak"], results(10) + [MatchResult(99, ("weak", "strong"), 0, [100, 300], [0.0, 1.0], 20)] * 30)
+        self.assertGreater(few["strong"][0], few["weak"][0])
+        self.assertAlmostEqual(few["strong"][0] + few["weak"][0], 3000)
+        self.assertLess(many["strong"][1], few["strong"][1])
+
+    def test_checkpoint_resume(self):
+        """Verify that a resumed tournament keeps earlier games and continues the schedule."""
+        with tempfile.TemporaryDirectory() as tmp:
+            checkpoint = str(Path(tmp) / "tournament.json")
+            first = Tournament(["random", "heuristic"], self.assets_path, max_rounds=3, ci_target=0,
+                               max_games=4, batch_size=2, checkpoint_path=checkpoint)
+            first.run()
+            resumed = Tournament(["random", "heuristic"], self.assets_path, max_rounds=3, ci_target=0,
+                                 max_games=6, batch_size=2, checkpoint_path=checkpoint)
+            resumed.run()
+            self.assertEqual([r.index for r in resumed.results], list(range(6)))
+            self.assertEqual(resumed.results[:4], first.results)
+
+            with self.assertRaises(ValueError):
+                Tournament(["random", "first"], self.assets_path, checkpoint_path=checkpoint).run()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import json
+import logging
+import random
+import unittest
+
+from src import wire
+from src.game import Game
+from src.wire import BINARY, JSON, MSGPACK, WireCatalog, WireChannel, WireDecoder, negotiate
+
+
+class TestWire(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(level=logging.WARNING)
+        random.seed(5)
+        self.game = Game(["A", "B", "C"], "tianji-fix-data-and/assets")
+        self.game.setup()
+        # The client gets the catalog as JSON
+        self.catalog = WireCatalog.for_game(self.game)
+        self.client_catalog = WireCatalog.from_dict(json.loads(json.dumps(self.catalog.to_dict())))
+
+    def expected(self) -> dict:
+        return json.loads(json.dumps(self.game.game_state.to_dict()))
+
+    def test_binary_round_trip_with_patches(self):
+        """Verify that binary states and patches decode to exactly the `to_dict` output, at a fraction of its size."""
+        channel = WireChannel(BINARY, self.catalog)
+        client = WireDecoder(BINARY, self.client_catalog)
+        self.game.game_state.players[0].add_status({"status_id": "TEST", "duration": 2, "value": 3,
+                                                    "is_permanent": False, "note": [1]})
+        for round_number in range(1, 6):
+            state = self.game.game_state.to_dict()
+            message = channel.message(state)
+            self.assertEqual(client.decode(message), self.expected())
+            self.assertLess(len(message), len(json.dumps(state, ensure_ascii=False).encode()) // 10)
+            self.game.run_round(round_number)
+
+        # A client joining late starts from the snapshot, then follows the patches
+        late = WireDecoder(BINARY, self.client_catalog)
+        self.assertEqual(late.decode(channel.snapshot()), client.state)
+        message = channel.message(self.game.game_state.to_dict())
+        self.assertEqual(late.decode(message), self.expected())
+        self.assertEqual(client.decode(message), self.expected())
+
+    def test_named_durations_and_seeded_games(self):
+        """Verify that statuses with named durations round-trip, through every round of several seeded games."""
+        self.game.game_state.players[1].add_status({"status_id": "SHIELD", "duration": "NEXT_ATTACK", "value": 1})
+        channel = WireChannel(BINARY, self.catalog)
+        client = WireDecoder(BINARY, self.client_catalog)
+        self.assertEqual(client.decode(channel.message(self.game.game_state.to_dict())), self.expected())
+
+        for seed in range(5):
+            random.seed(seed)
+            game = Game(["A", "B", "C", "D"], "tianji-fix-data-and/assets")
+            game.setup()
+            catalog = WireCatalog.for_game(game)
+            channel = WireChannel(BINARY, catalog)
+            client = WireDecoder(BINARY, WireCatalog.from_dict(json.loads(json.dumps(catalog.to_dict()))))
+            for round_number in range(1, 9):
+                game.run_round(round_number)
+                state = game.game_state.to_dict()
+                self.assertEqual(client.decode(channel.message(state)), json.loads(json.dumps(state)))
+
+    def test_deflate_above_threshold(self):
+        """Verify that only frames above the threshold are deflated, and that they still decode."""
+        channel = WireChannel(JSON, self.catalog, deflate=True, threshold=100)
+        client = WireDecoder(JSON, self.client_catalog)
+        message = channel.message(self.game.game_state.to_dict())
+        self.assertTrue(message[0] & wire.FLAG_DEFLATE)
+        self.assertEqual(client.decode(message), self.expected())
+        self.assertEqual(wire.frame(b"tiny", deflate=True, threshold=100), b"\x00tiny")
+
+    def test_negotiation(self):
+        """Verify that the best common format is picked, with plain JSON as the fallback."""
+        self.assertEqual(negotiate([JSON, BINARY]), BINARY)
+        self.assertEqual(negotiate(["cbor"]), JSON)
+        self.assertEqual(negotiate(None), JSON)
+        if wire.msgpack is None:
+            self.assertEqual(negotiate([MSGPACK, JSON]), JSON)
+            self.assertRaises(ValueError, WireChannel, MSGPACK, self.catalog)
+        else:
+            self.assertEqual(negotiate([MSGPACK, JSON]), MSGPACK)
+
+
+if __name__ == '__main__':
+    unittest.main()
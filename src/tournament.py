@@ -0,0 +1,262 @@
+# src/tournament.py
+
+"""
+Round-robin tournaments between decision policies.
+
+Every combination of agents meets in every seat rotation, so no agent profits
+from always moving first. Games run in a process pool and are rated with a
+Bradley-Terry fit reported on the Elo scale (95% confidence intervals from the
+fit's standard errors). The schedule repeats until every interval is narrower
+than the target or the game limit is reached. Finished games are written to a
+JSON checkpoint after every batch, so an interrupted run resumes where it
+stopped.
+
+Usage:
+    python -m src.tournament --agents random heuristic "mcts:time_budget=0.02" --workers 4 \
+        --checkpoint metrics/tournament.json
+"""
+
+import argparse
+import ast
+import itertools
+import json
+import logging
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+from .mcts import MCTSPolicy
+from .policy import DecisionPolicy, FirstActionPolicy, HeuristicPolicy, PrototypePolicy, RandomPolicy
+from .simulation import GameResult, play_game, seat_results
+
+AGENT_TYPES = {
+    "random": RandomPolicy,
+    "first": FirstActionPolicy,
+    "prototype": PrototypePolicy,
+    "heuristic": HeuristicPolicy,
+    "mcts": MCTSPolicy,
+}
+
+ELO_SCALE = 400 / math.log(10)
+
+
+def make_policy(spec: str) -> DecisionPolicy:
+    """Builds a policy from a spec such as "heuristic" or "mcts:time_budget=0.05,rollout_rounds=1"."""
+    name, _, args = spec.partition(":")
+    if name not in AGENT_TYPES:
+        raise ValueError(f"Unknown agent type '{name}'. Choose from: {', '.join(AGENT_TYPES)}")
+    kwargs = {}
+    for arg in filter(None, args.split(",")):
+        key, _, value = arg.partition("=")
+        kwargs[key.strip()] = ast.literal_eval(value.strip())
+    return AGENT_TYPES[name](**kwargs)
+
+
+@dataclass
+class Matchup:
+    index: int
+    agents: Tuple[str, ...]   # Agent spec per seat
+    seed: int
+
+
+@dataclass
+class MatchResult:
+    index: int
+    agents: Tuple[str, ...]
+    seed: int
+    scores: List[int]
+    outcomes: List[float]     # Per seat, see `seat_results`
+    rounds: int
+
+
+def schedule(agents: Sequence[str], seats: int, base_seed: int = 0) -> Iterator[Matchup]:
+    """Endless round-robin: every agent combination in every seat rotation, cycle after cycle."""
+    index = 0
+    while True:
+        for combo in itertools.combinations(agents, seats):
+            for shift in range(seats):
+                yield Matchup(index, combo[shift:] + combo[:shift], base_seed + index)
+                index += 1
+
+
+def play_matchup(matchup: Matchup, assets_path: str, max_rounds: int) -> MatchResult:
+    """Plays one scheduled game. Runs in a pool process, so policies are built here from their specs."""
+    policies = [make_policy(spec) for spec in matchup.agents]
+    try:
+        result: GameResult = play_game(policies, assets_path, matchup.seed, max_rounds=max_rounds)
+    finally:
+        for policy in policies:
+            if hasattr(policy, "close"):
+                policy.close()
+    outcomes = seat_results(result)
+    return MatchResult(matchup.index, matchup.agents, matchup.seed, result.scores,
+                       [outcomes[seat] for seat in range(len(policies))], result.rounds)
+
+
+def fit_ratings(agents: Sequence[str], results: Sequence[MatchResult],
+                prior_games: float = 1.0, iterations: int = 200) -> Dict[str, Tuple[float, float]]:
+    """
+    Fits Bradley-Terry strengths to every pairwise outcome within each game and
+    returns {agent: (elo, ci95)} with the ratings centered on 1500. Each pair of
+    agents starts with `prior_games` virtual draws, which keeps unbeaten agents finite.
+    """
+    index = {agent: i for i, agent in enumerate(agents)}
+    n = len(agents)
+    wins = [[prior_games / 2] * n for _ in range(n)]
+    for i in range(n):
+        wins[i][i] = 0.0
+    for result in results:
+        for a, b in itertools.combinations(range(len(result.agents)), 2):
+            i, j = index[result.agents[a]], index[result.agents[b]]
+            if i == j:
+                continue
+            if result.outcomes[a] > result.outcomes[b]:
+                wins[i][j] += 1
+            elif result.outcomes[a] < result.outcomes[b]:
+                wins[j][i] += 1
+            else:
+                wins[i][j] += 0.5
+                wins[j][i] += 0.5
+    games = [[wins[i][j] + wins[j][i] for j in range(n)] for i in range(n)]
+
+    # Minorization-maximization updates (Hunter, 2004)
+    strength = [1.0] * n
+    for _ in range(iterations):
+        updated = []
+        for i in range(n):
+            denominator = sum(games[i][j] / (strength[i] + strength[j]) for j in range(n) if j != i)
+            updated.append(sum(wins[i]) / denominator if denominator else strength[i])
+        norm = math.exp(sum(math.log(s) for s in updated) / n)
+        strength = [s / norm for s in updated]
+
+    ratings = {}
+    for agent, i in index.items():
+        information = sum(
+            games[i][j] * strength[i] * strength[j] / (strength[i] + strength[j]) ** 2
+            for j in range(n) if j != i
+        )
+        ci = 1.96 * ELO_SCALE / math.sqrt(information) if information else float("inf")
+        ratings[agent] = (1500 + ELO_SCALE * math.log(strength[i]), ci)
+    return ratings
+
+
+class Tournament:
+    """
+    Schedules, plays and rates a round-robin tournament.
+
+    Args:
+        agents: Agent specs (see `make_policy`).
+        seats: Players per game.
+        workers: Pool processes (0 plays in-process).
+        ci_target: Stop once every agent's 95% interval half-width is at most this many Elo points.
+        min_games / max_games: Bounds on the number of games played.
+        checkpoint_path: JSON file to resume from and save to after every batch.
+    """
+
+    def __init__(self, agents: Sequence[str], assets_path: str, seats: int = 2, max_rounds: int = 20,
+                 workers: int = 0, ci_target: float = 50.0, min_games: int | None = None, max_games: int = 2000,
+                 batch_size: int | None = None, checkpoint_path: str | None = None, seed: int = 0):
+        if len(set(agents)) != len(agents) or len(agents) < seats:
+            raise ValueError("A tournament needs at least `seats` distinct agents.")
+        for spec in agents:
+            make_policy(spec)  # Fail fast on bad specs
+        self.agents = list(agents)
+        self.assets_path = assets_path
+        self.seats = seats
+        self.max_rounds = max_rounds
+        self.workers = workers
+        self.ci_target = ci_target
+        cycle = math.comb(len(agents), seats) * seats
+        self.min_games = min_games if min_games is not None else cycle
+        self.max_games = max_games
+        self.batch_size = batch_size or max(cycle, 4 * max(workers, 1))
+        self.checkpoint_path = Path(checkpoint_path) if checkpoint_path else None
+        self.seed = seed
+        self.results: List[MatchResult] = []
+
+    @property
+    def config(self) -> Dict:
+        """The settings a checkpoint must match to be resumed."""
+        return {"agents": self.agents, "seats": self.seats, "max_rounds": self.max_rounds, "seed": self.seed}
+
+    def ratings(self) -> Dict[str, Tuple[float, float]]:
+        return fit_ratings(self.agents, self.results)
+
+    def converged(self) -> bool:
+        if len(self.results) < self.min_games:
+            return False
+        return all(ci <= self.ci_target for _, ci in self.ratings().values())
+
+    def run(self) -> Dict[str, Tuple[float, float]]:
+        self._load_checkpoint()
+        done = {r.index for r in self.results}
+        pending = (m for m in schedule(self.agents, self.seats, self.seed) if m.index not in done)
+
+        pool = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 0 else None
+        try:
+            while len(self.results) < self.max_games and not self.converged():
+                batch = list(itertools.islice(pending, min(self.batch_size, self.max_games - len(self.results))))
+                if pool is not None:
+                    futures = [pool.submit(play_matchup, m, self.assets_path, self.max_rounds) for m in batch]
+                    self.results.extend(f.result() for f in futures)
+                else:
+                    self.results.extend(play_matchup(m, self.assets_path, self.max_rounds) for m in batch)
+                self._save_checkpoint()
+                logging.info(f"Tournament: {len(self.results)} games played. " + self.format_ratings(self.ratings()))
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        return self.ratings()
+
+    @staticmethod
+    def format_ratings(ratings: Dict[str, Tuple[float, float]]) -> str:
+        ordered = sorted(ratings.items(), key=lambda item: -item[1][0])
+        return ", ".join(f"{agent}: {elo:.0f} ± {ci:.0f}" for agent, (elo, ci) in ordered)
+
+    def _load_checkpoint(self):
+        if self.checkpoint_path is None or not self.checkpoint_path.exists():
+            return
+        with self.checkpoint_path.open('r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get("config") != self.config:
+            raise ValueError(f"Checkpoint {self.checkpoint_path} was written for a different tournament: {data.get('config')}")
+        self.results = [MatchResult(**{**r, "agents": tuple(r["agents"])}) for r in data["results"]]
+        logging.info(f"Resuming tournament from {self.checkpoint_path} ({len(self.results)} games).")
+
+    def _save_checkpoint(self):
+        if self.checkpoint_path is None:
+            return
+        self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.checkpoint_path.with_suffix(self.checkpoint_path.suffix + ".tmp")
+        with temp_path.open('w', encoding='utf-8') as f:
+            json.dump({"config": self.config, "results": [asdict(r) for r in self.results]}, f)
+        os.replace(temp_path, self.checkpoint_path)  # Atomic, so an interruption never leaves a torn file
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a round-robin tournament between decision policies.")
+    parser.add_argument('--agents', nargs='+', required=True, help=f"Agent specs, e.g. heuristic or mcts:time_budget=0.05 ({', '.join(AGENT_TYPES)})")
+    parser.add_argument('--assets', type=str, default='tianji-fix-data-and/assets')
+    parser.add_argument('--seats', type=int, default=2)
+    parser.add_argument('--rounds', type=int, default=20, help="Maximum rounds per game")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--ci', type=float, default=50.0, help="Target 95%% interval half-width in Elo points")
+    parser.add_argument('--max-games', type=int, default=2000)
+    parser.add_argument('--checkpoint', type=str, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    tournament = Tournament(args.agents, args.assets, seats=args.seats, max_rounds=args.rounds, workers=args.workers,
+                            ci_target=args.ci, max_games=args.max_games, checkpoint_path=args.checkpoint, seed=args.seed)
+    ratings = tournament.run()
+    print(f"[tournament] {len(tournament.results)} games")
+    for agent, (elo, ci) in sorted(ratings.items(), key=lambda item: -item[1][0]):
+        print(f"  {agent:40s} {elo:7.1f} ± {ci:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+# src/transposition.py
+
+"""
+A bounded transposition table keyed by `GameState.hash`, shared by bots and
+simulators that keep running into the same states.
+"""
+
+from typing import Any, List
+
+
+class TranspositionTable:
+    """
+    A fixed-size, two-way set-associative table.
+
+    Each hash maps to a bucket of two slots. Storing a hash that is already
+    present updates it in place; otherwise the new entry takes an empty slot,
+    then a slot left over from an older generation, then the slot with the
+    lower weight (e.g., fewer visits or a shallower search). Entries with a
+    lower weight than both occupants are dropped, so well-researched states
+    survive a flood of one-off ones. Call `new_generation()` when the entries
+    of earlier searches should yield to new ones (e.g., once per game turn).
+    """
+
+    def __init__(self, capacity: int = 1 << 16):
+        size = 2
+        while size < capacity:
+            size <<= 1
+        self.capacity = size
+        self._mask = size - 1
+        self._keys: List[int | None] = [None] * size
+        self._values: List[Any] = [None] * size
+        self._weights: List[int] = [0] * size
+        self._generations: List[int] = [0] * size
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, state_hash: int) -> bool:
+        return self._find(state_hash) is not None
+
+    def get(self, state_hash: int, default: Any = None) -> Any:
+        slot = self._find(state_hash)
+        if slot is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return self._values[slot]
+
+    def store(self, state_hash: int, value: Any, weight: int = 0) -> bool:
+        """Stores a value for a hash. Returns False if the replacement policy dropped it."""
+        slot = self._find(state_hash)
+        if slot is None:
+            slot = self._victim(state_hash & self._mask & ~1, weight)
+            if slot is None:
+                return False
+            if self._keys[slot] is None:
+                self._count += 1
+        self._keys[slot] = state_hash
+        self._values[slot] = value
+        self._weights[slot] = weight
+        self._generations[slot] = self.generation
+        return True
+
+    def new_generation(self):
+        self.generation += 1
+
+    def clear(self):
+        self._keys = [None] * self.capacity
+        self._values = [None] * self.capacity
+        self._count = 0
+
+    def _find(self, state_hash: int) -> int | None:
+        base = state_hash & self._mask & ~1
+        if self._keys[base] == state_hash:
+            return base
+        if self._keys[base + 1] == state_hash:
+            return base + 1
+        return None
+
+    def _victim(self, base: int, weight: int) -> int | None:
+        for slot in (base, base + 1):
+            if self._keys[slot] is None:
+                return slot
+        for slot in (base, base + 1):
+            if self._generations[slot] != self.generation:
+                return slot
+        slot = base if self._weights[base] <= self._weights[base + 1] else base + 1
+        return slot if weight >= self._weights[slot] else None
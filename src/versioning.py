@@ -0,0 +1,72 @@
+from typing import Any, Dict, FrozenSet
+
+_MISSING = object()
+
+
+class Versioned:
+    """
+    Mixin for mutable models that need cheap change detection.
+
+    Every assignment to a public attribute that actually changes its value bumps
+    `_version`. Serializers use the version to decide whether a cached dict can
+    be reused instead of rebuilding it.
+
+    A model whose `version` adds up the versions of what it owns lists those
+    fields in `_AGGREGATED_FIELDS`. Replacing one carries the old value's
+    version into `_version`, so the sum never returns to a value it had (a
+    fresh container restarts its own count at zero).
+
+    Subclasses that list fields in `_HASHED_FIELDS` also get an incremental
+    Zobrist hash in `_zhash`: the same assignment XORs the old value's key out
+    and the new value's key in (see `_zobrist_key`).
+    """
+    _HASHED_FIELDS: FrozenSet[str] = frozenset()
+    _AGGREGATED_FIELDS: FrozenSet[str] = frozenset()
+    _zhash: int = 0
+    _version: int = 0
+    _dict_cache: Dict[str, Any] | None = None
+    _dict_cache_version: int = -1
+
+    def __setattr__(self, name: str, value: Any):
+        if name[0] != '_':
+            old = self.__dict__.get(name, _MISSING)
+            if old is not value and (old is _MISSING or old != value):
+                bump = 1
+                if old is not _MISSING and name in self._AGGREGATED_FIELDS:
+                    bump += _carried_version(old)
+                object.__setattr__(self, '_version', self._version + bump)
+                if name in self._HASHED_FIELDS:
+                    zhash = self._zhash ^ self._zobrist_key(name, value)
+                    if old is not _MISSING:
+                        zhash ^= self._zobrist_key(name, old)
+                    object.__setattr__(self, '_zhash', zhash)
+        object.__setattr__(self, name, value)
+
+    @property
+    def version(self) -> int:
+        """A counter that increases whenever the model (or anything it owns) changes."""
+        return self._version
+
+    def _zobrist_key(self, name: str, value: Any) -> int:
+        raise NotImplementedError
+
+    def _cached_dict(self) -> Dict[str, Any] | None:
+        """Returns the cached serialization if it is still current."""
+        if self._dict_cache_version == self.version:
+            return self._dict_cache
+        return None
+
+    def _store_dict(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        self._dict_cache = data
+        self._dict_cache_version = self.version
+        return data
+
+
+def _carried_version(value: Any) -> int:
+    """The version a replaced value contributed to its owner's `version`: its own, or its items' summed."""
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_carried_version(item) for item in value)
+    version = getattr(value, "version", 0)
+    return version if isinstance(version, int) else 0
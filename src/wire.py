@@ -0,0 +1,585 @@
+# src/wire.py
+
+"""
+Wire formats for game-state updates.
+
+`game_state_update` sends `GameState.to_dict()` as JSON: every message repeats
+keys like "gold_reward", the static description of all 24 zones and the name
+of every card in every hand. A client can instead negotiate one of:
+
+- `tjb1`: a compact binary encoding. Records are (field id, value) pairs from
+  the schemas below, integers are varints (zigzag for signed values), and
+  zones, cards, palaces, gates and phases are sent as indexes into a
+  `WireCatalog` the client receives once. After the first full state, a
+  channel sends patches that only carry the changed fields, players and zones.
+- `msgpack`: the id-only state (`compact_state`) in MessagePack, if `msgpack`
+  is installed.
+- `json`: the id-only state as compact UTF-8 JSON.
+
+The id-only state is `to_dict` with cards replaced by their ids and zones by
+their changing fields; the rest comes from the catalog, which clients fetch
+once from the cacheable catalog endpoint (see static_assets.py).
+
+Every frame starts with a flags byte; with `FLAG_DEFLATE` the rest is a raw
+deflate stream. A channel deflates frames above its threshold if the client
+asked for it. `WireDecoder` inverts all of this and reproduces the `to_dict`
+output exactly, so it doubles as the reference client.
+"""
+
+import json
+import zlib
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+from .events import PHASES
+
+try:
+    import msgpack
+except ImportError:  # Optional: the format is simply not offered
+    msgpack = None
+
+# Forward-declare to avoid circular import
+if False:
+    from .card import Card
+    from .game import Game
+    from .game_board import GameBoard
+
+WIRE_VERSION = 2
+BINARY, MSGPACK, JSON = "tjb1", "msgpack", "json"
+# Server preference, best first
+PREFERENCE = (BINARY, MSGPACK, JSON)
+
+FLAG_DEFLATE = 1
+DEFLATE_THRESHOLD = 512  # Bytes; smaller frames don't shrink enough to pay for the CPU
+
+KIND_STATE, KIND_PATCH = 0, 1
+
+# Value kinds. Catalog kinds are sent as index + 1, 0 is None, and a value missing
+# from the catalog falls back to its literal (JSON for cards, a string otherwise).
+# INT_OR_STR is a tag (INT_TAG, STR_TAG, or JSON_TAG for anything else) and then the value.
+UINT, SINT, BOOL, STR, JSON_VALUE, CARD, CARDS, ZONE, PHASE, STATUSES, INT_OR_STR = range(11)
+INT_TAG, STR_TAG, JSON_TAG = range(3)
+
+# (field id, to_dict key, kind). Field id 0 ends a record.
+STATE_FIELDS = (
+    (1, "state_version", UINT),
+    (2, "current_turn", SINT),
+    (3, "current_phase", PHASE),
+    (4, "active_player_id", STR),
+    (5, "ju_number", SINT),
+    (6, "game_fund", SINT),
+    (7, "current_celestial_stem", CARD),
+    (8, "current_terrestrial_branch", CARD),
+)
+# Sections of a state record, after its fields
+PLAYERS_SECTION, ZONES_SECTION, GATES_SECTION = 9, 10, 11
+
+PLAYER_FIELDS = (
+    (1, "player_id", STR),
+    (2, "name", STR),
+    (3, "health", SINT),
+    (4, "gold", SINT),
+    (5, "yin_yang", SINT),
+    (6, "position", ZONE),
+    (7, "is_eliminated", BOOL),
+    (8, "hand", CARDS),
+    (9, "status_effects", STATUSES),
+    (10, "played_card", CARD),
+)
+# The rest of a zone's dict is static and comes from the catalog
+ZONE_FIELDS = (
+    (1, "gold_reward", SINT),
+    (2, "gold_penalty", SINT),
+)
+# Statuses are free-form dicts: only the keys present are sent, other keys go in STATUS_EXTRA as JSON
+STATUS_FIELDS = (
+    (1, "status_id", STR),
+    (2, "duration", INT_OR_STR),  # A round count, or a named duration such as "NEXT_ATTACK"
+    (3, "value", JSON_VALUE),
+    (4, "is_permanent", BOOL),
+)
+STATUS_EXTRA = 15
+_STATUS_KEYS = {name for _, name, _ in STATUS_FIELDS}
+_DYNAMIC_ZONE_KEYS = tuple(name for _, name, _ in ZONE_FIELDS)
+
+_DEFAULTS = {UINT: 0, SINT: 0, BOOL: False, STR: "", JSON_VALUE: None, CARD: None, ZONE: None,
+             PHASE: PHASES[0], INT_OR_STR: 0}
+
+
+def _default(kind: int) -> Any:
+    return [] if kind in (CARDS, STATUSES) else _DEFAULTS[kind]
+
+
+def available_formats() -> Tuple[str, ...]:
+    return tuple(f for f in PREFERENCE if f != MSGPACK or msgpack is not None)
+
+
+def negotiate(offered: Iterable[str]) -> str:
+    """The server's preferred format among those a client offers; plain JSON if there is none in common."""
+    offered = set(offered or ())
+    return next((f for f in available_formats() if f in offered), JSON)
+
+
+class WireCatalog:
+    """The static tables the binary format indexes into. Sent to a client once."""
+
+    def __init__(self, cards: Sequence[Dict[str, Any]], zones: Sequence[Dict[str, Any]],
+                 gates: Sequence[str], phases: Sequence[str] = PHASES, version: str = ""):
+        # The asset-bundle hash the cards were loaded from
+        self.version = version
+        self.cards = list(cards)
+        self.zones = list(zones)
+        self.zone_ids = [zone["zone_id"] for zone in self.zones]
+        self.palaces = list(dict.fromkeys(zone["palace"] for zone in self.zones))
+        self.gates = list(gates)
+        self.phases = list(phases)
+        self._card_index = {card["card_id"]: i for i, card in enumerate(self.cards)}
+        self._zone_index = {zone_id: i for i, zone_id in enumerate(self.zone_ids)}
+        self._palace_index = {palace: i for i, palace in enumerate(self.palaces)}
+        self._gate_index = {gate: i for i, gate in enumerate(self.gates)}
+        self._phase_index = {phase: i for i, phase in enumerate(self.phases)}
+
+    @classmethod
+    def build(cls, cards: Iterable['Card'], board: 'GameBoard', version: str = "") -> 'WireCatalog':
+        """Catalog of the given cards (sorted by id) and the board's zones (in board order)."""
+        from .qimen import GATE_EFFECTS
+        unique = {card.card_id: card for card in cards}
+        zones = [{key: value for key, value in zone.to_dict().items() if key not in _DYNAMIC_ZONE_KEYS}
+                 for zone in board.zones.values()]
+        return cls([unique[card_id].to_dict() for card_id in sorted(unique)], zones, list(GATE_EFFECTS),
+                   version=version)
+
+    @classmethod
+    def for_game(cls, game: 'Game') -> 'WireCatalog':
+        """Catalog of every card in the game's asset bundle and of its board."""
+        decks = game.loader.load_all_cards()
+        return cls.build((card for cards in decks.values() for card in cards), game.game_state.game_board,
+                         version=game.loader.bundle_hash())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"version": self.version, "cards": self.cards, "zones": self.zones, "gates": self.gates,
+                "phases": self.phases}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'WireCatalog':
+        return cls(data["cards"], data["zones"], data["gates"], data["phases"], data.get("version", ""))
+
+
+# --- Id-only states ---
+
+def _card_id(card: Dict[str, Any] | None) -> str | None:
+    return card and card["card_id"]
+
+
+def compact_state(state: Dict[str, Any]) -> Dict[str, Any]:
+    """`state` with cards as card ids and zones as their changing fields only, for clients with the catalog."""
+    compact = dict(state)
+    for key in ("current_celestial_stem", "current_terrestrial_branch"):
+        if key in compact:
+            compact[key] = _card_id(compact[key])
+    players = []
+    for player in state.get("players", []):
+        player = dict(player)
+        player["hand"] = [card["card_id"] for card in player.get("hand", [])]
+        player["played_card"] = _card_id(player.get("played_card"))
+        players.append(player)
+    compact["players"] = players
+    if "game_board" in state:
+        board = state["game_board"]
+        compact["game_board"] = {
+            "zones": {zone_id: {key: zone[key] for key in _DYNAMIC_ZONE_KEYS}
+                      for zone_id, zone in board["zones"].items()},
+            "qimen_gates": board["qimen_gates"],
+        }
+    return compact
+
+
+def expand_state(compact: Dict[str, Any], catalog: WireCatalog) -> Dict[str, Any]:
+    """Inverse of `compact_state`."""
+    def card(card_id: str | None) -> Dict[str, Any] | None:
+        if card_id is None:
+            return None
+        i = catalog._card_index.get(card_id)
+        return catalog.cards[i] if i is not None else {"card_id": card_id}
+
+    state = dict(compact)
+    for key in ("current_celestial_stem", "current_terrestrial_branch"):
+        if key in state:
+            state[key] = card(state[key])
+    players = []
+    for player in compact.get("players", []):
+        player = dict(player)
+        player["hand"] = [card(card_id) for card_id in player.get("hand", [])]
+        player["played_card"] = card(player.get("played_card"))
+        players.append(player)
+    state["players"] = players
+    if "game_board" in compact:
+        board = compact["game_board"]
+        zones = {}
+        for zone_id, dynamic in board["zones"].items():
+            i = catalog._zone_index.get(zone_id)
+            zone = dict(catalog.zones[i]) if i is not None else {"zone_id": zone_id}
+            zone.update(dynamic)
+            zones[zone_id] = zone
+        state["game_board"] = {"zones": zones, "qimen_gates": board["qimen_gates"]}
+    return state
+
+
+# --- Varints ---
+
+def _write_uvarint(out: bytearray, n: int):
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _write_svarint(out: bytearray, n: int):
+    _write_uvarint(out, n << 1 if n >= 0 else (-n << 1) - 1)
+
+
+def _write_str(out: bytearray, s: str):
+    data = s.encode("utf-8")
+    _write_uvarint(out, len(data))
+    out += data
+
+
+class _Reader:
+    def __init__(self, data: bytes, pos: int = 0):
+        self.data = data
+        self.pos = pos
+
+    def uvarint(self) -> int:
+        result = shift = 0
+        while True:
+            byte = self.data[self.pos]
+            self.pos += 1
+            result |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return result
+            shift += 7
+
+    def svarint(self) -> int:
+        n = self.uvarint()
+        return n >> 1 if not n & 1 else -((n + 1) >> 1)
+
+    def str(self) -> str:
+        length = self.uvarint()
+        self.pos += length
+        return self.data[self.pos - length:self.pos].decode("utf-8")
+
+
+# --- Binary encoding ---
+
+class BinaryEncoder:
+    """Encodes `to_dict` states, and patches between them, against a catalog."""
+
+    def __init__(self, catalog: WireCatalog):
+        self.catalog = catalog
+
+    def encode(self, state: Dict[str, Any], previous: Dict[str, Any] | None = None) -> bytes:
+        """A full state, or with `previous` a patch that turns `previous` into `state`."""
+        out = bytearray((WIRE_VERSION, KIND_STATE if previous is None else KIND_PATCH))
+        self._write_fields(out, STATE_FIELDS, state, previous)
+
+        players = state.get("players", [])
+        old_players = previous.get("players", []) if previous is not None else []
+        changed = [(seat, p) for seat, p in enumerate(players)
+                   if seat >= len(old_players) or old_players[seat] is not p and old_players[seat] != p]
+        if changed:
+            _write_uvarint(out, PLAYERS_SECTION)
+            _write_uvarint(out, len(changed))
+            for seat, player in changed:
+                _write_uvarint(out, seat)
+                self._write_fields(out, PLAYER_FIELDS, player, old_players[seat] if seat < len(old_players) else None)
+
+        board = state.get("game_board", {})
+        old_board = previous.get("game_board", {}) if previous is not None else {}
+        zones, old_zones = board.get("zones", {}), old_board.get("zones", {})
+        changed_zones = [(zone_id, zone) for zone_id, zone in zones.items()
+                         if old_zones.get(zone_id) is not zone and old_zones.get(zone_id) != zone]
+        if changed_zones:
+            _write_uvarint(out, ZONES_SECTION)
+            _write_uvarint(out, len(changed_zones))
+            for zone_id, zone in changed_zones:
+                _write_uvarint(out, self.catalog._zone_index[zone_id])
+                self._write_fields(out, ZONE_FIELDS, zone, old_zones.get(zone_id))
+
+        gates = board.get("qimen_gates", {})
+        if previous is None and gates or previous is not None and gates != old_board.get("qimen_gates", {}):
+            _write_uvarint(out, GATES_SECTION)
+            _write_uvarint(out, len(gates))
+            for palace, gate in gates.items():
+                _write_uvarint(out, self.catalog._palace_index[palace])
+                _write_uvarint(out, self.catalog._gate_index[gate])
+        out.append(0)
+        return bytes(out)
+
+    def _write_fields(self, out: bytearray, fields, record: Dict[str, Any], previous: Dict[str, Any] | None):
+        # Full records skip default values; patches skip unchanged ones
+        for field_id, name, kind in fields:
+            value = record.get(name)
+            if previous is None:
+                default = _default(kind)
+                if value == default and type(value) is type(default):
+                    continue
+            elif name in previous and previous[name] == value:
+                continue
+            _write_uvarint(out, field_id)
+            self._write_value(out, kind, value)
+        out.append(0)
+
+    def _write_value(self, out: bytearray, kind: int, value: Any):
+        if kind == UINT:
+            _write_uvarint(out, value)
+        elif kind == SINT:
+            _write_svarint(out, value)
+        elif kind == BOOL:
+            out.append(1 if value else 0)
+        elif kind == STR:
+            _write_str(out, value)
+        elif kind == JSON_VALUE:
+            _write_str(out, json.dumps(value, ensure_ascii=False, separators=(",", ":")))
+        elif kind == INT_OR_STR:
+            if isinstance(value, int) and not isinstance(value, bool):
+                out.append(INT_TAG)
+                _write_svarint(out, value)
+            elif isinstance(value, str):
+                out.append(STR_TAG)
+                _write_str(out, value)
+            else:
+                out.append(JSON_TAG)
+                self._write_value(out, JSON_VALUE, value)
+        elif kind == CARD:
+            self._write_indexed(out, value and value["card_id"], self.catalog._card_index,
+                                lambda: json.dumps(value, ensure_ascii=False, separators=(",", ":")))
+        elif kind == CARDS:
+            _write_uvarint(out, len(value))
+            for card in value:
+                self._write_value(out, CARD, card)
+        elif kind == ZONE:
+            self._write_indexed(out, value, self.catalog._zone_index, lambda: value)
+        elif kind == PHASE:
+            self._write_indexed(out, value, self.catalog._phase_index, lambda: value)
+        elif kind == STATUSES:
+            _write_uvarint(out, len(value))
+            for status in value:
+                for field_id, name, field_kind in STATUS_FIELDS:
+                    if name in status:
+                        _write_uvarint(out, field_id)
+                        self._write_value(out, field_kind, status[name])
+                extra = {key: v for key, v in status.items() if key not in _STATUS_KEYS}
+                if extra:
+                    _write_uvarint(out, STATUS_EXTRA)
+                    self._write_value(out, JSON_VALUE, extra)
+                out.append(0)
+
+    @staticmethod
+    def _write_indexed(out: bytearray, key: Any, index: Dict[Any, int], literal: Callable[[], str]):
+        if key is None:
+            out.append(0)
+            return
+        i = index.get(key)
+        if i is not None:
+            _write_uvarint(out, i + 2)
+        else:
+            out.append(1)
+            _write_str(out, literal())
+
+
+class BinaryDecoder:
+    """Rebuilds `to_dict` states from binary frames, given the previous state for patches."""
+
+    def __init__(self, catalog: WireCatalog):
+        self.catalog = catalog
+
+    def decode(self, data: bytes, previous: Dict[str, Any] | None = None) -> Dict[str, Any]:
+        if data[0] != WIRE_VERSION:
+            raise ValueError(f"Unsupported wire version {data[0]}")
+        is_patch = data[1] == KIND_PATCH
+        if is_patch and previous is None:
+            raise ValueError("Received a patch without a previous state")
+        reader = _Reader(data, 2)
+        base = previous if is_patch else None
+        state = self._read_fields(reader, STATE_FIELDS, base)
+
+        players = list(base["players"]) if base else []
+        zones = dict(base["game_board"]["zones"]) if base else {
+            zone["zone_id"]: self._default_zone(zone) for zone in self.catalog.zones}
+        gates = base["game_board"]["qimen_gates"] if base else {}
+        while True:
+            section = reader.uvarint()
+            if section == 0:
+                break
+            count = reader.uvarint()
+            if section == PLAYERS_SECTION:
+                for _ in range(count):
+                    seat = reader.uvarint()
+                    old = players[seat] if seat < len(players) else None
+                    player = self._read_fields(reader, PLAYER_FIELDS, old)
+                    if seat < len(players):
+                        players[seat] = player
+                    else:
+                        players.append(player)
+            elif section == ZONES_SECTION:
+                for _ in range(count):
+                    zone_id = self.catalog.zone_ids[reader.uvarint()]
+                    zones[zone_id] = self._read_fields(reader, ZONE_FIELDS, zones[zone_id])
+            elif section == GATES_SECTION:
+                gates = {}
+                for _ in range(count):
+                    palace = self.catalog.palaces[reader.uvarint()]
+                    gates[palace] = self.catalog.gates[reader.uvarint()]
+            else:
+                raise ValueError(f"Unknown section {section}")
+
+        state["players"] = players
+        state["game_board"] = {"zones": zones, "qimen_gates": gates}
+        return state
+
+    @staticmethod
+    def _default_zone(static: Dict[str, Any]) -> Dict[str, Any]:
+        zone = dict(static)
+        zone.update((name, _default(kind)) for _, name, kind in ZONE_FIELDS)
+        return zone
+
+    def _read_fields(self, reader: _Reader, fields, previous: Dict[str, Any] | None) -> Dict[str, Any]:
+        by_id = {field_id: (name, kind) for field_id, name, kind in fields}
+        record = dict(previous) if previous is not None else {name: _default(kind) for _, name, kind in fields}
+        while True:
+            field_id = reader.uvarint()
+            if field_id == 0:
+                return record
+            name, kind = by_id[field_id]
+            record[name] = self._read_value(reader, kind)
+
+    def _read_value(self, reader: _Reader, kind: int) -> Any:
+        if kind == UINT:
+            return reader.uvarint()
+        if kind == SINT:
+            return reader.svarint()
+        if kind == BOOL:
+            return reader.uvarint() != 0
+        if kind == STR:
+            return reader.str()
+        if kind == JSON_VALUE:
+            return json.loads(reader.str())
+        if kind == INT_OR_STR:
+            tag = reader.uvarint()
+            if tag == INT_TAG:
+                return reader.svarint()
+            return reader.str() if tag == STR_TAG else json.loads(reader.str())
+        if kind == CARD:
+            return self._read_indexed(reader, self.catalog.cards, json.loads)
+        if kind == CARDS:
+            return [self._read_value(reader, CARD) for _ in range(reader.uvarint())]
+        if kind == ZONE:
+            return self._read_indexed(reader, self.catalog.zone_ids, str)
+        if kind == PHASE:
+            return self._read_indexed(reader, self.catalog.phases, lambda s: s)
+        if kind == STATUSES:
+            return [self._read_status(reader) for _ in range(reader.uvarint())]
+        raise ValueError(f"Unknown value kind {kind}")
+
+    def _read_status(self, reader: _Reader) -> Dict[str, Any]:
+        by_id = {field_id: (name, kind) for field_id, name, kind in STATUS_FIELDS}
+        status = {}
+        while True:
+            field_id = reader.uvarint()
+            if field_id == 0:
+                return status
+            if field_id == STATUS_EXTRA:
+                status.update(self._read_value(reader, JSON_VALUE))
+            else:
+                name, kind = by_id[field_id]
+                status[name] = self._read_value(reader, kind)
+
+    @staticmethod
+    def _read_indexed(reader: _Reader, table: List[Any], literal: Callable[[str], Any]) -> Any:
+        tag = reader.uvarint()
+        if tag == 0:
+            return None
+        if tag == 1:
+            return literal(reader.str())
+        return table[tag - 2]
+
+
+# --- Frames and channels ---
+
+def frame(payload: bytes, deflate: bool, threshold: int = DEFLATE_THRESHOLD) -> bytes:
+    if deflate and len(payload) > threshold:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, -15)  # Raw deflate, no zlib header
+        return bytes((FLAG_DEFLATE,)) + compressor.compress(payload) + compressor.flush()
+    return b"\x00" + payload
+
+
+def unframe(data: bytes) -> bytes:
+    if data[0] & FLAG_DEFLATE:
+        return zlib.decompress(data[1:], -15)
+    return data[1:]
+
+
+def _encode_document(fmt: str, state: Dict[str, Any]) -> bytes:
+    state = compact_state(state)
+    if fmt == MSGPACK:
+        return msgpack.packb(state, use_bin_type=True)
+    return json.dumps(state, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class WireChannel:
+    """
+    The updates for every connection that negotiated the same format and
+    deflate setting. Binary channels send patches against the last state they
+    sent; a connection that joins late first gets `snapshot()`, the full
+    encoding of that same state.
+    """
+
+    def __init__(self, fmt: str, catalog: WireCatalog, deflate: bool = False, threshold: int = DEFLATE_THRESHOLD):
+        if fmt not in available_formats():
+            raise ValueError(f"Wire format '{fmt}' is not available")
+        self.format = fmt
+        self.deflate = deflate
+        self.threshold = threshold
+        self.encoder = BinaryEncoder(catalog) if fmt == BINARY else None
+        self.members = set()
+        self.last_state: Dict[str, Any] | None = None
+
+    def message(self, state: Dict[str, Any]) -> bytes:
+        """The frame that brings the channel's members from the last state to `state`."""
+        if self.encoder is not None:
+            payload = self.encoder.encode(state, self.last_state)
+        else:
+            payload = _encode_document(self.format, state)
+        self.last_state = state
+        return frame(payload, self.deflate, self.threshold)
+
+    def snapshot(self) -> bytes | None:
+        """A full frame of the last state sent, for a connection joining the channel."""
+        if self.last_state is None:
+            return None
+        if self.encoder is not None:
+            return frame(self.encoder.encode(self.last_state), self.deflate, self.threshold)
+        return frame(_encode_document(self.format, self.last_state), self.deflate, self.threshold)
+
+    def reset(self):
+        """Forgets the last state, e.g., when the game is replaced; the next message is a full state."""
+        self.last_state = None
+
+
+class WireDecoder:
+    """Client side of a channel: turns frames back into `to_dict` states."""
+
+    def __init__(self, fmt: str, catalog: WireCatalog):
+        self.format = fmt
+        self.catalog = catalog
+        self.decoder = BinaryDecoder(catalog) if fmt == BINARY else None
+        self.state: Dict[str, Any] | None = None
+
+    def decode(self, data: bytes) -> Dict[str, Any]:
+        payload = unframe(data)
+        if self.decoder is not None:
+            self.state = self.decoder.decode(payload, self.state)
+        elif self.format == MSGPACK:
+            self.state = expand_state(msgpack.unpackb(payload, raw=False), self.catalog)
+        else:
+            self.state = expand_state(json.loads(payload.decode("utf-8")), self.catalog)
+        return self.state
@@ -0,0 +1,45 @@
+# src/zobrist.py
+
+"""
+Zobrist keys for incremental state hashing.
+
+Each hashed feature (a player's position, a bucketed resource, a card in a
+hand, a status, the current stem...) maps to a fixed random 64-bit key, and a
+model's hash is the XOR of the keys of its current features. Changing a
+feature XORs the old key out and the new key in, so mutators keep hashes up to
+date in O(1). Keys are derived from the feature itself rather than from a
+process-local RNG, so every process (bots' worker pools, the server and its
+clients) computes the same hash for the same state.
+"""
+
+from hashlib import blake2b
+from typing import Any, Dict, Tuple
+
+MASK64 = (1 << 64) - 1
+
+# Resources are hashed by bucket so near-identical states share a hash.
+RESOURCE_BUCKETS = {"health": 10, "gold": 5}
+
+_keys: Dict[Tuple[Any, ...], int] = {}
+
+
+def key(*feature: Any) -> int:
+    """Returns the 64-bit key for a feature, e.g. key("position", "1", "kan_di")."""
+    k = _keys.get(feature)
+    if k is None:
+        digest = blake2b(repr(feature).encode("utf-8"), digest_size=8).digest()
+        k = _keys[feature] = int.from_bytes(digest, "little")
+    return k
+
+
+def bucket(field_name: str, value: Any) -> Any:
+    size = RESOURCE_BUCKETS.get(field_name)
+    return value // size if size and isinstance(value, int) else value
+
+
+def mix(h: int, salt: int) -> int:
+    """Scrambles a sub-hash with a salt (splitmix64 finalizer), so equal sub-hashes of different owners differ."""
+    z = (h ^ salt) & MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+    return z ^ (z >> 31)
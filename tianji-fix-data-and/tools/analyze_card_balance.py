@@ -8,26 +8,39 @@ to support data-driven design and balancing decisions, as required by the
 project's core development guidelines (AGENTS.md).
 
 Key Functions:
-- Parses all generated JSON card files from the `assets/data/cards/` directory.
-- Recursively traverses the data structure of each card to find all actions.
+- Parses all generated JSON card files from the `assets/data/cards/` directory
+  (through `card_source`, the parse pass shared with the linter).
+- Finds all actions of each card through the shared card index (`card_index.py`).
 - Aggregates key metrics, such as resource gains/losses, damage output,
   control effects, and card advantage.
 - Generates a summary report in Markdown format (`metrics/balance_summary.md`)
   that presents these metrics in a human-readable format.
+- With `--simulate`, also estimates each basic card's real marginal impact by
+  playing paired games through the engine (same seed, with and without the card
+  forced into the first player's hand) and adds the simulated columns to the report.
 """
 
-import json
+import argparse
+import math
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from pathlib import Path
-from typing import Any, Dict, List, Iterator
+from typing import Any, Dict, Iterable, List, Tuple
 from collections import defaultdict
 import datetime
 
+from card_index import ActionRef, CardIndex, walk_actions
+from card_source import load_card_documents
+
 # --- 1. Configuration & Constants ---
 
 SCRIPT_DIR = Path(__file__).parent.resolve()
 ROOT_DIR = SCRIPT_DIR.parent
 CARD_DATA_DIR = ROOT_DIR / "assets" / "data" / "cards"
 METRICS_DIR = ROOT_DIR / "metrics"
+ASSETS_DIR = ROOT_DIR / "assets"
+ENGINE_ROOT = ROOT_DIR.parent  # The repository root, which holds the `src` engine package
 
 # Define categories for different actions to group them in the report.
 ACTION_CATEGORIES = {
@@ -39,27 +52,7 @@ ACTION_CATEGORIES = {
     "UTILITY": {"MOVE", "SWAP_POSITION", "SWAP_RESOURCES", "SWAP_HAND_CARDS", "SWAP_DISCARD_PILES", "LOOKUP", "CHOICE", "CREATE_ENTITY", "DESTROY_ENTITY"},
 }
 
-# --- 2. Data Parsing and Traversal ---
-
-def get_all_card_files(base_dir: Path) -> Iterator[Path]:
-    """Yields all .json files from the card data directory."""
-    if not base_dir.is_dir():
-        print(f"Error: Card data directory not found at '{base_dir}'")
-        return
-    yield from base_dir.rglob("*.json")
-
-def find_actions_recursively(data: Any) -> Iterator[Dict[str, Any]]:
-    """Recursively finds and yields all action objects within a card's data."""
-    if isinstance(data, dict):
-        if "action" in data and "params" in data:
-            yield data
-        for value in data.values():
-            yield from find_actions_recursively(value)
-    elif isinstance(data, list):
-        for item in data:
-            yield from find_actions_recursively(item)
-
-# --- 3. Metrics Aggregation ---
+# --- 2. Metrics Aggregation ---
 
 class BalanceAnalyzer:
     """Analyzes a collection of cards and aggregates balance metrics."""
@@ -74,18 +67,27 @@ class BalanceAnalyzer:
             "total_damage": 0,
             "control_effects": defaultdict(int),
             "card_advantage": 0,
-            "cards_with_high_risk_actions": defaultdict(set)
+            "cards_with_high_risk_actions": defaultdict(set),
+            # Static per-card sums, shown next to the simulated columns
+            "per_card": defaultdict(lambda: {"gold": 0, "health": 0, "damage": 0}),
         }
         self.high_risk_actions = {"MODIFY_RULE", "EXECUTE_LATER", "COPY_EFFECT"}
 
+    def analyze_index(self, index: CardIndex):
+        """Analyzes every card of the shared card index."""
+        for card_id in sorted(index.cards):
+            self.analyze_actions(card_id, index.actions[card_id])
+
     def analyze_card(self, card_data: Dict[str, Any]):
         """Analyzes a single card and updates the aggregate metrics."""
-        self.metrics["total_cards"] += 1
         card_id = card_data.get("id", "UNKNOWN")
+        self.analyze_actions(card_id, walk_actions(card_data, card_id))
 
-        for action in find_actions_recursively(card_data):
-            action_name = action.get("action")
-            if not action_name:
+    def analyze_actions(self, card_id: str, actions: Iterable[ActionRef]):
+        self.metrics["total_cards"] += 1
+        for ref in actions:
+            action, action_name = ref.action, ref.name
+            if not action_name or "params" not in action:
                 continue
 
             self.metrics["total_actions"] += 1
@@ -101,16 +103,20 @@ class BalanceAnalyzer:
             if not isinstance(value, int):
                 value = 0 # Ignore complex values for this static analysis
 
+            card_totals = self.metrics["per_card"][card_id]
             if action_name == "GAIN_RESOURCE":
                 resource = params.get("resource")
                 if resource in ["gold", "health"]:
                     self.metrics["resource_gain"][resource] += value
+                    card_totals[resource] += value
             elif action_name in ["LOSE_RESOURCE", "PAY_COST"]:
                 resource = params.get("resource")
                 if resource in ["gold", "health"]:
                     self.metrics["resource_loss"][resource] += value
+                    card_totals[resource] -= value
             elif action_name == "DEAL_DAMAGE":
                 self.metrics["total_damage"] += value
+                card_totals["damage"] += value
             elif action_name in ACTION_CATEGORIES["CARD_ADVANTAGE"]:
                 count = params.get("count", 0)
                 if isinstance(count, int):
@@ -121,8 +127,8 @@ class BalanceAnalyzer:
                     self.metrics["control_effects"]["discard"] += count
 
 
-    def generate_report(self) -> str:
-        """Generates a Markdown summary of the aggregated metrics."""
+    def generate_report(self, simulated: Dict[str, "CardImpact"] | None = None) -> str:
+        """Generates a Markdown summary of the aggregated metrics, plus simulated impact columns if given."""
         report = [f"# 《天机变》 - 卡牌平衡性量化分析报告\n"]
         report.append(f"> **生成时间:** {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
 
@@ -157,26 +163,182 @@ class BalanceAnalyzer:
         for action, count in sorted_actions:
             report.append(f"| `{action}` | {count} |")
 
+        if simulated:
+            report.append(f"\n## 5. 模拟对局边际影响\n")
+            report.append("静态列为卡牌数据中 `value` 字段的直接求和；模拟列来自成对对局（相同随机种子，首位玩家手牌中强制加入/不加入该卡）的差值，"
+                          "胜率变化附 95% 置信区间，金币/生命变化按每次打出折算。\n")
+            report.append("| 卡牌 | 静态金币 | 静态生命 | 静态伤害 | 样本数 | 平均打出次数 | 胜率变化 | 每次打出金币变化 | 每次打出生命变化 |")
+            report.append("| :--- | ---: | ---: | ---: | ---: | ---: | ---: | ---: | ---: |")
+            for card_id, impact in sorted(simulated.items(), key=lambda item: -item[1].win_delta):
+                static = self.metrics["per_card"].get(card_id, {"gold": 0, "health": 0, "damage": 0})
+                report.append(
+                    f"| `{card_id}` | {static['gold']} | {static['health']} | {static['damage']} | {impact.samples} | "
+                    f"{impact.plays_per_game:.2f} | {impact.win_delta:+.3f} ± {1.96 * impact.win_se:.3f} | "
+                    f"{_format_optional(impact.gold_per_play)} | {_format_optional(impact.health_per_play)} |"
+                )
+
         return "\n".join(report)
 
+# --- 3. Simulation Mode ---
+
+class CardImpact:
+    """Paired-game samples for one card: (win delta, gold delta, health delta, plays) per seed."""
+
+    def __init__(self, card_id: str):
+        self.card_id = card_id
+        self.deltas: List[Tuple[float, int, int, int]] = []
+
+    @property
+    def samples(self) -> int:
+        return len(self.deltas)
+
+    def _mean(self, i: int) -> float:
+        return sum(d[i] for d in self.deltas) / len(self.deltas) if self.deltas else 0.0
+
+    @property
+    def win_delta(self) -> float:
+        return self._mean(0)
+
+    @property
+    def win_se(self) -> float:
+        """Standard error of the mean win-rate delta."""
+        n = len(self.deltas)
+        if n < 2:
+            return float("inf")
+        mean = self.win_delta
+        variance = sum((d[0] - mean) ** 2 for d in self.deltas) / (n - 1)
+        return math.sqrt(variance / n)
+
+    @property
+    def plays_per_game(self) -> float:
+        return self._mean(3)
+
+    @property
+    def gold_per_play(self) -> float | None:
+        return self._mean(1) / self.plays_per_game if self.plays_per_game else None
+
+    @property
+    def health_per_play(self) -> float | None:
+        return self._mean(2) / self.plays_per_game if self.plays_per_game else None
+
+
+def _format_optional(value: float | None) -> str:
+    return "—" if value is None else f"{value:+.1f}"
+
+
+def _import_engine():
+    if str(ENGINE_ROOT) not in sys.path:
+        sys.path.insert(0, str(ENGINE_ROOT))
+
+
+def simulate_card_batch(card_id: str, seeds: List[int], seats: int, max_rounds: int,
+                        policy_spec: str) -> List[Tuple[float, int, int, int]]:
+    """
+    Plays one paired game per seed: a control game and a game with `card_id`
+    forced into the first player's hand. Returns the first player's
+    (win delta, gold delta, health delta, times the card was placed) per pair.
+    Runs in a pool process.
+    """
+    _import_engine()
+    from src.simulation import PlacementCounter, play_game, seat_results
+    from src.tournament import make_policy
+
+    deltas = []
+    for seed in seeds:
+        control = play_game([make_policy(policy_spec) for _ in range(seats)], str(ASSETS_DIR), seed, max_rounds)
+        counter = PlacementCounter(make_policy(policy_spec), [card_id])
+        treated = play_game([counter] + [make_policy(policy_spec) for _ in range(seats - 1)], str(ASSETS_DIR), seed,
+                            max_rounds, test_cards=[card_id])
+        deltas.append((
+            seat_results(treated)[0] - seat_results(control)[0],
+            treated.gold[0] - control.gold[0],
+            treated.health[0] - control.health[0],
+            counter.plays[card_id],
+        ))
+    return deltas
+
+
+def simulate_cards(card_ids: List[str], workers: int, seats: int = 2, max_rounds: int = 10,
+                   policy_spec: str = "heuristic", batch_size: int = 20, min_samples: int = 40,
+                   max_samples: int = 400, target_se: float = 0.03, seed: int = 0) -> Dict[str, CardImpact]:
+    """
+    Estimates every card's marginal impact with adaptive sample sizes: each card
+    gets batches of paired games until the standard error of its win-rate delta
+    drops to `target_se` (after at least `min_samples`) or `max_samples` is reached.
+    Batches of all cards run concurrently in a process pool.
+    """
+    impacts = {card_id: CardImpact(card_id) for card_id in card_ids}
+    next_seed = {card_id: seed + i * max_samples for i, card_id in enumerate(card_ids)}
+
+    def next_batch(card_id: str) -> List[int] | None:
+        impact = impacts[card_id]
+        if impact.samples >= max_samples or (impact.samples >= min_samples and impact.win_se <= target_se):
+            return None
+        count = min(batch_size, max_samples - impact.samples)
+        seeds = list(range(next_seed[card_id], next_seed[card_id] + count))
+        next_seed[card_id] += count
+        return seeds
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        running = {}
+        for card_id in card_ids:
+            seeds = next_batch(card_id)
+            running[pool.submit(simulate_card_batch, card_id, seeds, seats, max_rounds, policy_spec)] = card_id
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                card_id = running.pop(future)
+                impacts[card_id].deltas.extend(future.result())
+                seeds = next_batch(card_id)
+                if seeds:
+                    running[pool.submit(simulate_card_batch, card_id, seeds, seats, max_rounds, policy_spec)] = card_id
+                else:
+                    impact = impacts[card_id]
+                    print(f"  {card_id}: {impact.samples} samples, win delta {impact.win_delta:+.3f} ± {1.96 * impact.win_se:.3f}")
+    return impacts
+
 # --- 4. Main Execution ---
 
 def main():
     """Main function to orchestrate the analysis and report generation."""
+    parser = argparse.ArgumentParser(description="Analyze card balance statically and, optionally, by simulation.")
+    parser.add_argument('--simulate', action='store_true', help="Add simulated marginal-impact columns (runs the engine)")
+    parser.add_argument('--cards', nargs='*', default=None, help="Basic card IDs to simulate (default: all basic cards)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--seats', type=int, default=2)
+    parser.add_argument('--rounds', type=int, default=10, help="Rounds per simulated game")
+    parser.add_argument('--policy', type=str, default="heuristic", help="Policy spec for every seat (see src/tournament.py)")
+    parser.add_argument('--min-samples', type=int, default=40)
+    parser.add_argument('--max-samples', type=int, default=400)
+    parser.add_argument('--target-se', type=float, default=0.03, help="Target standard error of each win-rate delta")
+    args = parser.parse_args()
+
     print("--- Starting Card Balance Analysis ---")
 
     analyzer = BalanceAnalyzer()
 
-    for card_file in get_all_card_files(CARD_DATA_DIR):
-        try:
-            with card_file.open('r', encoding='utf-8') as f:
-                card_data = json.load(f)
-            analyzer.analyze_card(card_data)
-        except (json.JSONDecodeError, IOError) as e:
-            print(f"Warning: Could not parse file {card_file.name}: {e}")
+    if not CARD_DATA_DIR.is_dir():
+        print(f"Error: Card data directory not found at '{CARD_DATA_DIR}'")
+    # Same parse pass as tools/lint_card_data.py, indexed once
+    docs = load_card_documents([CARD_DATA_DIR])
+    for doc in docs:
+        if doc.error or not isinstance(doc.data, dict):
+            print(f"Warning: Could not parse file {doc.source}: {doc.error}")
+    index = CardIndex.from_documents(docs)
+    analyzer.analyze_index(index)
+    basic_card_ids = sorted(index.query(type="basic"))
+
+    simulated = None
+    if args.simulate:
+        # Only basic cards can be forced into a hand (they are dealt from the basic deck)
+        card_ids = args.cards or basic_card_ids
+        print(f"Simulating {len(card_ids)} cards with {args.workers} workers...")
+        simulated = simulate_cards(card_ids, args.workers, seats=args.seats, max_rounds=args.rounds,
+                                   policy_spec=args.policy, min_samples=args.min_samples,
+                                   max_samples=args.max_samples, target_se=args.target_se)
 
     print("Analysis complete. Generating report...")
-    report_content = analyzer.generate_report()
+    report_content = analyzer.generate_report(simulated)
 
     # Ensure the metrics directory exists
     METRICS_DIR.mkdir(exist_ok=True)
@@ -1,34 +1,24 @@
 #!/usr/bin/env python3
 """
-Scan card JSON files for high-risk actions and optionally annotate them with metadata.review = "required".
-Usage: python3 tools/annotate_high_risk.py [--apply]
+Find cards that use high-risk actions (via the shared card index) and optionally
+annotate them with metadata.review = "required".
+Usage: python3 tools/annotate_high_risk.py [--apply] [--variant tian]
 """
 import json
-import os
 import sys
-from typing import List
+from typing import Dict, Set
 
-BASE = 'assets/data/cards'
-RISKS = ['EXECUTE_LATER', 'COPY_EFFECT', 'MODIFY_RULE', 'CREATE_ENTITY', 'SWAP_DISCARD_PILES', 'SWAP_RESOURCE', 'SWAP_HAND_CARDS']
+from card_index import CardIndex
 
-def find_files() -> List[str]:
-    out = []
-    for root, _, files in os.walk(BASE):
-        for f in files:
-            if f.endswith('.json'):
-                out.append(os.path.join(root, f))
-    return out
+RISKS = ['EXECUTE_LATER', 'COPY_EFFECT', 'MODIFY_RULE', 'CREATE_ENTITY', 'SWAP_DISCARD_PILES', 'SWAP_RESOURCE', 'SWAP_RESOURCES', 'SWAP_HAND_CARDS']
 
-def file_has_risk(path: str) -> bool:
-    try:
-        with open(path, 'r', encoding='utf-8') as fh:
-            txt = fh.read()
-            for r in RISKS:
-                if r in txt:
-                    return True
-    except Exception:
-        return False
-    return False
+def find_risky(index: CardIndex, variant: str | None = None) -> Dict[str, Set[str]]:
+    """Maps each card id that uses a high-risk action (in `variant`, if given) to those actions."""
+    hits: Dict[str, Set[str]] = {}
+    for risk in RISKS:
+        for card_id in index.cards_with('action', risk, variant):
+            hits.setdefault(card_id, set()).add(risk)
+    return hits
 
 def annotate(path: str) -> None:
     with open(path, 'r', encoding='utf-8') as fh:
@@ -41,17 +31,15 @@ def annotate(path: str) -> None:
 
 def main():
     apply_changes = '--apply' in sys.argv
-    files = find_files()
-    hits = []
-    for f in files:
-        if file_has_risk(f):
-            hits.append(f)
-            if apply_changes:
-                annotate(f)
+    variant = sys.argv[sys.argv.index('--variant') + 1] if '--variant' in sys.argv else None
+    index = CardIndex.build()
+    hits = find_risky(index, variant)
 
     print(f'Found {len(hits)} high-risk file(s):')
-    for h in hits:
-        print(' -', h)
+    for card_id in sorted(hits):
+        print(' -', index.sources[card_id], '(' + ', '.join(sorted(hits[card_id])) + ')')
+        if apply_changes:
+            annotate(index.sources[card_id])
     if apply_changes:
         print('\nAnnotated all files with metadata.review = "required"')
 
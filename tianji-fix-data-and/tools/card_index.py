@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+In-memory card index shared by the card data tools.
+
+`walk_actions` is the one traversal of a card definition: it yields every
+action object together with the department variant it belongs to (`tian`,
+`di`, `ren` for `core_mechanism.variants`, `trigger` for `triggers`, `effect`
+for anything else) and its JSON path. `CardIndex` runs it once over the card
+bundle and keeps inverted indexes from each feature to the set of card ids:
+
+- `action`: action type, e.g. `COPY_EFFECT`
+- `resource`, `target`, `status`: the `resource`, `target` and `status_id` params
+- `trigger`: trigger condition, e.g. `ON_GAME_START`
+- `variant`: department variants that contain at least one action
+- `type`: card type
+
+Every action feature is indexed both for the card as a whole and per variant,
+so "all cards with `COPY_EFFECT` in a Tian variant" is a single set lookup:
+
+    index.query(action="COPY_EFFECT", variant="tian")
+
+Usage:
+    python tools/card_index.py --action COPY_EFFECT --variant tian
+    python tools/card_index.py --resource gold --type basic
+"""
+
+import argparse
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Set, Tuple
+
+from card_source import CARD_DATA_DIR, CardDocument, load_card_documents
+
+VARIANTS = ("tian", "di", "ren")
+FACETS = ("action", "resource", "target", "status", "trigger", "variant", "type")
+# Facets that describe a single action, and so can be narrowed to a variant
+ACTION_FACETS = ("action", "resource", "target", "status")
+
+
+@dataclass(frozen=True)
+class ActionRef:
+    """One action object inside a card."""
+    card_id: str
+    variant: str          # tian / di / ren / trigger / effect
+    path: str             # JSON path, e.g. "core_mechanism.variants.tian.effect.actions[0]"
+    action: Dict[str, Any]
+
+    @property
+    def name(self) -> str | None:
+        return self.action.get("action")
+
+    @property
+    def params(self) -> Dict[str, Any]:
+        params = self.action.get("params")
+        return params if isinstance(params, dict) else {}
+
+    def features(self) -> Iterator[Tuple[str, str]]:
+        if self.name:
+            yield "action", self.name
+        for facet, key in (("resource", "resource"), ("target", "target"), ("status", "status_id")):
+            value = self.params.get(key)
+            if isinstance(value, str):
+                yield facet, value
+
+
+def walk_actions(card: Dict[str, Any], card_id: str | None = None) -> Iterator[ActionRef]:
+    """Yields every action object in a card definition, including nested ones, in document order."""
+    card_id = card_id or card.get("id", "UNKNOWN")
+
+    def walk(data: Any, path: str, variant: str) -> Iterator[ActionRef]:
+        if isinstance(data, dict):
+            if "action" in data:
+                yield ActionRef(card_id, variant, path, data)
+            for key, value in data.items():
+                yield from walk(value, f"{path}.{key}" if path else key, variant)
+        elif isinstance(data, list):
+            for i, item in enumerate(data):
+                yield from walk(item, f"{path}[{i}]", variant)
+
+    for key, value in card.items():
+        if key == "core_mechanism" and isinstance(value, dict) and isinstance(value.get("variants"), dict):
+            for variant, content in value["variants"].items():
+                yield from walk(content, f"core_mechanism.variants.{variant}", variant)
+        elif key == "triggers":
+            yield from walk(value, key, "trigger")
+        else:
+            yield from walk(value, key, "effect")
+
+
+def trigger_conditions(card: Dict[str, Any]) -> Iterator[str]:
+    triggers = card.get("triggers")
+    for trigger in triggers if isinstance(triggers, list) else []:
+        if isinstance(trigger, dict) and isinstance(trigger.get("condition"), str):
+            yield trigger["condition"]
+
+
+class CardIndex:
+    """Inverted indexes from card features to card ids, built in one pass over the cards."""
+
+    def __init__(self):
+        self.cards: Dict[str, Dict[str, Any]] = {}
+        self.sources: Dict[str, str] = {}
+        self.actions: Dict[str, List[ActionRef]] = {}
+        self._postings: Dict[Tuple[str, ...], Set[str]] = defaultdict(set)
+
+    @classmethod
+    def build(cls, paths: Iterable[Path] = (CARD_DATA_DIR,)) -> 'CardIndex':
+        return cls.from_documents(load_card_documents(paths))
+
+    @classmethod
+    def from_documents(cls, docs: Iterable[CardDocument]) -> 'CardIndex':
+        index = cls()
+        for doc in docs:
+            if isinstance(doc.data, dict):
+                index.add(doc.data, doc.source)
+        return index
+
+    def add(self, card: Dict[str, Any], source: str = ""):
+        card_id = card.get("id", "UNKNOWN")
+        self.cards[card_id] = card
+        self.sources[card_id] = source
+        self.actions[card_id] = list(walk_actions(card, card_id))
+
+        if isinstance(card.get("type"), str):
+            self._postings[("type", card["type"])].add(card_id)
+        for condition in trigger_conditions(card):
+            self._postings[("trigger", condition)].add(card_id)
+        for ref in self.actions[card_id]:
+            self._postings[("variant", ref.variant)].add(card_id)
+            for facet, value in ref.features():
+                self._postings[(facet, value)].add(card_id)
+                self._postings[(facet, value, ref.variant)].add(card_id)
+
+    def __len__(self) -> int:
+        return len(self.cards)
+
+    def cards_with(self, facet: str, value: str, variant: str | None = None) -> FrozenSet[str]:
+        if facet not in FACETS:
+            raise ValueError(f"Unknown facet '{facet}'. Choose from: {', '.join(FACETS)}")
+        key = (facet, value, variant) if variant is not None and facet in ACTION_FACETS else (facet, value)
+        return frozenset(self._postings.get(key, ()))
+
+    def query(self, variant: str | None = None, **facets: str | Iterable[str]) -> Set[str]:
+        """
+        Card ids matching every given facet. A facet given several values
+        matches any of them. With `variant`, action facets must match inside
+        that variant (each facet may match a different action of it).
+        """
+        result: Set[str] | None = None
+        if variant is not None:
+            result = set(self.cards_with("variant", variant))
+        for facet, values in facets.items():
+            values = [values] if isinstance(values, str) else list(values)
+            matches = set().union(*(self.cards_with(facet, v, variant) for v in values))
+            result = matches if result is None else result & matches
+        return set(self.cards) if result is None else result
+
+    def values(self, facet: str) -> List[str]:
+        """Every indexed value of a facet."""
+        return sorted({key[1] for key in self._postings if key[0] == facet and len(key) == 2})
+
+    def find_actions(self, card_ids: Iterable[str] | None = None, variant: str | None = None,
+                     **facets: str) -> Iterator[ActionRef]:
+        """The individual actions (rather than cards) matching all given facets."""
+        for card_id in sorted(self.cards if card_ids is None else card_ids):
+            for ref in self.actions.get(card_id, ()):
+                if variant is not None and ref.variant != variant:
+                    continue
+                features = dict(ref.features())
+                if all(features.get(facet) == value for facet, value in facets.items()):
+                    yield ref
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the card index.")
+    for facet in FACETS:
+        if facet != "variant":
+            parser.add_argument(f'--{facet}', action='append', default=None, help="May be repeated to match any value")
+    parser.add_argument('--variant', choices=VARIANTS + ("trigger", "effect"), default=None)
+    parser.add_argument('--list', choices=FACETS, default=None, help="List the indexed values of a facet")
+    parser.add_argument('--actions', action='store_true', help="Print the matching actions, not just card ids")
+    args = parser.parse_args()
+
+    index = CardIndex.build()
+    if args.list:
+        for value in index.values(args.list):
+            print(f"{value}\t{len(index.cards_with(args.list, value))}")
+        return
+
+    facets = {facet: getattr(args, facet) for facet in FACETS if facet != "variant" and getattr(args, facet)}
+    matches = sorted(index.query(variant=args.variant, **facets))
+    for card_id in matches:
+        print(card_id)
+        if args.actions:
+            action_facets = {f: v[0] for f, v in facets.items() if f in ACTION_FACETS and len(v) == 1}
+            for ref in index.find_actions([card_id], args.variant, **action_facets):
+                print(f"  {ref.path}: {ref.name} {ref.params}")
+    print(f"{len(matches)} / {len(index)} cards.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Shared parse pass for the card data tools.
+
+The linter and the balance analyzer both read card definitions from two kinds
+of sources: the generated `.json` files under `assets/data/cards/` and the
+```json blocks of the Markdown source (`hexagram_interpretations.md`). This
+module parses either kind into `CardDocument`s that carry the content hash of
+the raw text, so results computed from a document (lint errors, static metrics)
+can be cached by hash and reused until the text itself changes.
+
+`ParseCache` keeps the parsed documents of every source keyed by the file's
+modification time and size; asking it again for an unchanged file costs one
+`stat` call. This is what makes the linter's `--watch` mode relint only what
+was edited.
+"""
+
+import hashlib
+import json
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+SCRIPT_DIR = Path(__file__).parent.resolve()
+ROOT_DIR = SCRIPT_DIR.parent
+CARD_DATA_DIR = ROOT_DIR / "assets" / "data" / "cards"
+MARKDOWN_SOURCES = [ROOT_DIR / "hexagram_interpretations.md"]
+
+JSON_BLOCK_RE = re.compile(r"```json\n(.*?)\n```", re.DOTALL)
+
+
+def content_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+@dataclass
+class CardDocument:
+    """One card definition: a card file or one json block of a Markdown source."""
+    source: str                        # "path" for card files, "path:line" for Markdown blocks
+    text: str
+    digest: str                        # content_hash(text)
+    data: Any = None                   # Parsed JSON, None if it failed to parse
+    error: str | None = None           # JSON decode error
+    expected_id: str | None = None     # Card files must carry the id of their file name
+
+    @property
+    def card_id(self) -> str | None:
+        if isinstance(self.data, dict) and self.data.get("id"):
+            return self.data["id"]
+        return self.expected_id
+
+
+def parse_document(source: str, text: str, expected_id: str | None = None) -> CardDocument:
+    doc = CardDocument(source, text, content_hash(text), expected_id=expected_id)
+    try:
+        doc.data = json.loads(text)
+    except json.JSONDecodeError as e:
+        doc.error = str(e)
+    return doc
+
+
+def find_json_blocks(content: str) -> Iterator[Tuple[str, int]]:
+    """Finds all ```json ... ``` blocks in a string and yields them with their line numbers."""
+    for match in JSON_BLOCK_RE.finditer(content):
+        yield match.group(1), content.count("\n", 0, match.start()) + 1
+
+
+def parse_source(path: Path) -> List[CardDocument]:
+    """Parses a card file into one document, or a Markdown file into one document per json block."""
+    text = path.read_text(encoding="utf-8")
+    if path.suffix == ".md":
+        return [parse_document(f"{path}:{line}", block) for block, line in find_json_blocks(text)]
+    return [parse_document(str(path), text, expected_id=path.stem)]
+
+
+def iter_source_files(paths: Iterable[Path]) -> Iterator[Path]:
+    """Expands directories into the card files below them; files are passed through."""
+    for path in paths:
+        if path.is_dir():
+            yield from sorted(path.rglob("*.json"))
+        elif path.exists():
+            yield path
+
+
+class ParseCache:
+    """Parsed documents per source file, reparsed only when the file's mtime or size changes."""
+
+    def __init__(self):
+        self._entries: Dict[Path, Tuple[Tuple[int, int], List[CardDocument]]] = {}
+
+    def documents(self, path: Path) -> List[CardDocument]:
+        stat = path.stat()
+        signature = (stat.st_mtime_ns, stat.st_size)
+        entry = self._entries.get(path)
+        if entry is None or entry[0] != signature:
+            entry = (signature, parse_source(path))
+            self._entries[path] = entry
+        return entry[1]
+
+    def refresh(self, paths: Iterable[Path]) -> Tuple[List[CardDocument], List[Path]]:
+        """
+        Rescans `paths` and returns (documents of new or modified files, files
+        that have disappeared since the last scan).
+        """
+        seen = set()
+        changed = []
+        for path in iter_source_files(paths):
+            seen.add(path)
+            before = self._entries.get(path)
+            try:
+                docs = self.documents(path)
+            except FileNotFoundError:  # Removed between the scan and the read
+                continue
+            if before is None or before[1] is not docs:
+                changed.extend(docs)
+        removed = [path for path in self._entries if path not in seen]
+        for path in removed:
+            del self._entries[path]
+        return changed, removed
+
+    def all_documents(self) -> List[CardDocument]:
+        return [doc for _, docs in self._entries.values() for doc in docs]
+
+
+def load_card_documents(paths: Iterable[Path] = (CARD_DATA_DIR,), cache: ParseCache | None = None) -> List[CardDocument]:
+    """Parses every card file (and Markdown source) under `paths` in one pass."""
+    cache = cache or ParseCache()
+    return [doc for path in iter_source_files(paths) for doc in cache.documents(path)]
@@ -1,35 +1,95 @@
-# Tianji Game Metrics Collector (Stub)
+# Tianji Game Metrics Collector
 # 采集对局数据、卡牌使用率、胜率等核心指标，供平衡性分析
-# 实际采集逻辑需集成到游戏主循环/模拟器
+# 通过引擎批量模拟对局；各进程以流式聚合（Welford 均值/方差、可合并分位数草图、卡牌计数）
+# 汇总自己的对局，主进程合并部分结果，内存占用与对局数量无关
 
 import json
-import random
+import os
+import sys
 import argparse
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-def simulate_metrics():
-    # 示例：生成虚拟数据，实际应由游戏引擎埋点采集
-    cards = [
-        "basic_01_qian", "basic_02_kun", "basic_03_tun", "basic_04_meng", "basic_05_xu",
-        "basic_06_song", "basic_07_shi", "basic_08_bi", "basic_09_xiao_chu", "basic_10_li"
-    ]
-    metrics = {
-        "card_winrate": {cid: round(random.uniform(0.35, 0.65), 3) for cid in cards},
-        "card_usage": {cid: random.randint(100, 500) for cid in cards},
-        "avg_game_length": random.uniform(12, 22),
-        "resource_curve": [random.uniform(0.8, 1.2) for _ in range(10)]
-    }
-    return metrics
+SCRIPT_DIR = Path(__file__).parent.resolve()
+ROOT_DIR = SCRIPT_DIR.parent
+ASSETS_DIR = ROOT_DIR / "assets"
+ENGINE_ROOT = ROOT_DIR.parent  # 仓库根目录，包含引擎 `src` 包
+
+if str(ENGINE_ROOT) not in sys.path:
+    sys.path.insert(0, str(ENGINE_ROOT))
+
+from src.metrics import GameRecord, MetricsAggregate
+from src.simulation import PlacementCounter, play_game, seat_results
+from src.tournament import make_policy
+
+
+def collect_partial(seeds, seats, max_rounds, policy_spec):
+    """在工作进程中模拟一批对局，返回可合并的部分聚合结果（字典形式）"""
+    aggregate = MetricsAggregate()
+    for seed in seeds:
+        counters = [PlacementCounter(make_policy(policy_spec)) for _ in range(seats)]
+        curve = []
+
+        def sample_gold(game, round_number):
+            players = game.game_state.players
+            curve.append(sum(p.gold for p in players) / len(players) / game.rules.starting_gold)
+
+        result = play_game(counters, str(ASSETS_DIR), seed, max_rounds=max_rounds, on_round=sample_gold)
+        outcomes = seat_results(result)
+        aggregate.add_game(GameRecord(
+            rounds=result.rounds,
+            outcomes=[outcomes[seat] for seat in range(seats)],
+            gold=result.gold,
+            health=result.health,
+            plays=[c.plays for c in counters],
+            gold_curve=curve,
+        ))
+    return aggregate.to_dict()
+
+
+def collect_metrics(games, workers, seats=2, max_rounds=20, policy_spec="heuristic", seed=0, chunk_size=50):
+    aggregate = MetricsAggregate()
+    chunks = [list(range(start, min(start + chunk_size, seed + games))) for start in range(seed, seed + games, chunk_size)]
+    if workers > 0:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for partial in pool.map(collect_partial, chunks, [seats] * len(chunks), [max_rounds] * len(chunks),
+                                    [policy_spec] * len(chunks)):
+                aggregate.merge(MetricsAggregate.from_dict(partial))
+    else:
+        for chunk in chunks:
+            aggregate.merge(MetricsAggregate.from_dict(collect_partial(chunk, seats, max_rounds, policy_spec)))
+    return aggregate
+
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--output', type=str, default='metrics/latest_metrics.json')
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--seats', type=int, default=2)
+    parser.add_argument('--rounds', type=int, default=20, help="每局最大回合数")
+    parser.add_argument('--policy', type=str, default='heuristic', help="决策策略，见 src/tournament.py")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--partial-out', type=str, default=None, help="另存可合并的部分聚合结果")
+    parser.add_argument('--merge', nargs='*', default=[], help="合并此前保存的部分聚合结果文件")
     args = parser.parse_args()
-    metrics = simulate_metrics()
+
+    aggregate = collect_metrics(args.games, args.workers, args.seats, args.rounds, args.policy, args.seed) \
+        if args.games > 0 else MetricsAggregate()
+    for path in args.merge:
+        with open(path, 'r', encoding='utf-8') as f:
+            aggregate.merge(MetricsAggregate.from_dict(json.load(f)))
+
+    if args.partial_out:
+        Path(args.partial_out).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.partial_out, 'w', encoding='utf-8') as f:
+            json.dump(aggregate.to_dict(), f)
+
+    metrics = aggregate.to_metrics_json()
     Path(args.output).parent.mkdir(parents=True, exist_ok=True)
     with open(args.output, 'w', encoding='utf-8') as f:
         json.dump(metrics, f, ensure_ascii=False, indent=2)
-    print(f"[metrics] Output written to {args.output}")
+    print(f"[metrics] {aggregate.games} games aggregated. Output written to {args.output}")
 
 if __name__ == '__main__':
     main()
@@ -8,22 +8,34 @@ game engine can consume.
 
 Key Functions:
 - Parses specified Markdown files (`hexagram_interpretations.md`, etc.).
-- Extracts all `json` code blocks.
-- Validates each card's JSON data against the official `card_logic_schema.md`,
-  including enforcement of security parameters for high-risk actions.
-- Generates individual `.json` files for each valid card into the
-  `assets/data/cards/` directory, organized by card type.
+- Extracts all `json` code blocks and keys each one by the hash of its text.
+- Validates the JSON data of every new or edited block against the official
+  `card_logic_schema.md`, including enforcement of security parameters for
+  high-risk actions. Blocks whose hash is already in the manifest are skipped.
+- Writes individual `.json` files for each changed card into the
+  `assets/data/cards/` directory, organized by card type. Files are written
+  atomically and only when their bytes change, so unchanged files keep their
+  mtimes and downstream caches stay valid.
+- Maintains `assets/data/card_manifest.json`, the list of every card file with
+  its type and content hash, which the engine's loader reads directly.
 - Provides detailed error reporting for both JSON syntax and schema violations.
 
 This script is the cornerstone of the "data-driven design" philosophy of the project,
 ensuring that all game logic originates from a single, version-controlled source of truth.
 """
 
+import argparse
+import hashlib
 import json
+import os
 import re
 import sys
+import time
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Iterator, Optional, Set, Tuple
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from card_source import content_hash, find_json_blocks
 
 # --- 1. Configuration & Constants ---
 
@@ -37,6 +49,9 @@ INPUT_FILES = [
     ROOT_DIR / "hexagram_interpretations.md",
 ]
 OUTPUT_DIR = ROOT_DIR / "assets" / "data" / "cards"
+# Read by the engine's GameLoader; kept outside the card directory it describes.
+MANIFEST_PATH = ROOT_DIR / "assets" / "data" / "card_manifest.json"
+MANIFEST_VERSION = 1
 
 # Define card types that are classified as "state" cards.
 STATE_CARD_TYPES = {"stem", "branch", "celestial"}
@@ -160,126 +175,258 @@ class CardSchema:
 
 # --- 3. Markdown Parsing & Data Extraction ---
 
-def find_json_blocks(content: str) -> Iterator[Tuple[str, int]]:
-    """
-    Finds all ```json ... ``` blocks in a string and yields them with their line numbers.
-    """
-    for match in re.finditer(r"```json\n(.*?)\n```", content, re.DOTALL):
-        json_block = match.group(1)
-        line_number = content.count("\n", 0, match.start()) + 1
-        yield json_block, line_number
+@dataclass
+class CardBlock:
+    """One ```json block of a source file, identified by the hash of its text."""
+    text: str
+    digest: str
+    source: str  # "file.md:line"
 
 
-def parse_markdown_file(filepath: Path) -> Iterator[Tuple[Dict[str, Any], str, int]]:
+def parse_markdown_file(filepath: Path) -> List[CardBlock]:
     """
-    Parses a markdown file to extract JSON data blocks.
+    Extracts the JSON blocks of a markdown file without parsing them; only
+    blocks whose hash is not in the manifest are decoded and validated.
     """
     print(f"\nParsing source file: {filepath.name}...")
     try:
         content = filepath.read_text(encoding="utf-8")
-        for block, line_num in find_json_blocks(content):
-            try:
-                yield json.loads(block), filepath.name, line_num
-            except json.JSONDecodeError as e:
-                print(
-                    f"  [Warning] Skipping invalid JSON block in {filepath.name} "
-                    f"near line {line_num}: {e}",
-                    file=sys.stderr,
-                )
-                print(f"  > Block content: {block[:120]}...", file=sys.stderr)
     except FileNotFoundError:
         print(f"  [Error] Source file not found: {filepath}", file=sys.stderr)
-    except Exception as e:
-        print(f"  [Error] An unexpected error occurred while parsing {filepath}: {e}", file=sys.stderr)
+        return []
+    return [CardBlock(block, content_hash(block), f"{filepath.name}:{line_num}")
+            for block, line_num in find_json_blocks(content)]
+
+
+# --- 4. Manifest & File Generation ---
+
+def output_path_for(card: Dict[str, Any], base_output_path: Path) -> Path:
+    """The file a card is generated into, organized by card type."""
+    card_type = card["type"]
+    if card_type in STATE_CARD_TYPES:
+        subfolder_name = "celestial" if card_type == "celestial" else f"{card_type}s"
+        return base_output_path / "state" / subfolder_name / f"{card['id']}.json"
+    return base_output_path / card_type / f"{card['id']}.json"
+
+
+def render_card(card: Dict[str, Any]) -> bytes:
+    return json.dumps(card, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def write_atomic(path: Path, data: bytes):
+    """Writes via a temporary file and a rename, so readers never see a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(path.name + ".tmp")
+    temp_path.write_bytes(data)
+    os.replace(temp_path, path)
 
 
-# --- 4. File Generation ---
+def file_signature(path: Path) -> List[int] | None:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
 
-def generate_card_files(cards: List[Dict[str, Any]], base_output_path: Path):
+class Manifest:
     """
-    Generates individual .json files for each card in the appropriate subdirectory.
+    Every card file under the output directory with its type and content hash,
+    in path order. Generated cards also record the hash of their source block,
+    which is how unchanged blocks are skipped on the next run. `GameLoader`
+    reads the manifest instead of walking the card directory.
     """
-    generated_count = 0
-    print(f"\nGenerating {len(cards)} valid card files...")
 
-    for card in cards:
-        card_type = card["type"]
-        card_id = card["id"]
-
-        if card_type in STATE_CARD_TYPES:
-            subfolder_name = "celestial" if card_type == "celestial" else f"{card_type}s"
-            output_path = base_output_path / "state" / subfolder_name
-        else:
-            output_path = base_output_path / card_type
+    def __init__(self, path: Path, generator: str):
+        self.path = path
+        self.generator = generator
+        self.cards: Dict[str, Dict[str, Any]] = {}
+        self._original = None
+        if path.exists():
+            try:
+                self._original = path.read_bytes()
+                data = json.loads(self._original)
+                if data.get("version") == MANIFEST_VERSION:
+                    self.cards = data.get("cards", {})
+                    if data.get("generator") != generator:
+                        # The schema or the generator changed: every block must be validated again
+                        for entry in self.cards.values():
+                            entry.pop("block", None)
+            except json.JSONDecodeError:
+                pass
+
+    def by_block(self) -> Dict[str, str]:
+        return {entry["block"]: card_id for card_id, entry in self.cards.items() if "block" in entry}
+
+    def record(self, card_id: str, card_type: str, path: Path, data: bytes, block: CardBlock | None = None):
+        entry = {
+            "path": path.relative_to(self.path.parent / "cards").as_posix(),
+            "type": card_type,
+            "hash": hashlib.blake2b(data, digest_size=16).hexdigest(),
+            "stat": file_signature(path),
+        }
+        if block is not None:
+            entry["block"] = block.digest
+            entry["source"] = block.source
+        self.cards[card_id] = entry
+
+    def save(self) -> bool:
+        """Writes the manifest if its content changed; returns whether it did."""
+        cards = dict(sorted(self.cards.items(), key=lambda item: item[1]["path"]))
+        # Adding, removing or renaming a card file changes its directory's mtime, which
+        # tells the loader that the manifest is stale.
+        card_dir = self.path.parent / "cards"
+        directories = {d.relative_to(card_dir).as_posix(): d.stat().st_mtime_ns
+                       for d in [card_dir, *sorted(p for p in card_dir.rglob("*") if p.is_dir())]}
+        data = json.dumps({"version": MANIFEST_VERSION, "generator": self.generator, "directories": directories,
+                           "cards": cards}, ensure_ascii=False, indent=1).encode("utf-8")
+        if data == self._original:
+            return False
+        write_atomic(self.path, data)
+        self._original = data
+        return True
+
+
+def index_other_cards(manifest: Manifest, base_output_path: Path, generated: Set[str]):
+    """
+    Adds the card files that are not generated from Markdown (function, destiny,
+    natal and state cards), rehashing only files whose mtime or size changed.
+    """
+    seen = set()
+    for path in sorted(base_output_path.rglob("*.json")):
+        card_id = path.stem
+        if card_id in generated:
+            continue
+        seen.add(card_id)
+        entry = manifest.cards.get(card_id)
+        if entry is not None and entry.get("stat") == file_signature(path) and "block" not in entry:
+            continue
+        data = path.read_bytes()
+        try:
+            card_type = json.loads(data).get("type")
+        except (json.JSONDecodeError, AttributeError):
+            print(f"  [Warning] Could not read card type from {path}, leaving it out of the manifest.", file=sys.stderr)
+            continue
+        manifest.record(card_id, card_type, path, data)
+    for card_id in [cid for cid in manifest.cards if cid not in generated and cid not in seen]:
+        del manifest.cards[card_id]
 
-        output_path.mkdir(parents=True, exist_ok=True)
-        file_path = output_path / f"{card_id}.json"
 
+def generate_cards(blocks: List[CardBlock], schema: CardSchema, manifest: Manifest, base_output_path: Path,
+                   force: bool = False) -> Tuple[int, int, int]:
+    """
+    Validates the blocks whose hash is not in the manifest and writes the files
+    whose bytes changed. Returns (changed blocks, files written, invalid cards);
+    nothing is written if any card is invalid.
+    """
+    known = {} if force else manifest.by_block()
+    unchanged: Dict[str, CardBlock] = {}
+    changed: List[Tuple[CardBlock, Dict[str, Any]]] = []
+    invalid = 0
+
+    for block in blocks:
+        card_id = known.get(block.digest)
+        entry = manifest.cards.get(card_id) if card_id else None
+        output = base_output_path / entry["path"] if entry else None
+        if entry is not None and entry.get("stat") == file_signature(output):
+            unchanged[card_id] = block
+            continue
         try:
-            with file_path.open("w", encoding="utf-8") as f:
-                json.dump(card, f, ensure_ascii=False, indent=2)
-            generated_count += 1
-        except IOError as e:
-            print(f"  [Error] Failed to write file {file_path}: {e}", file=sys.stderr)
-        except Exception as e:
-            print(f"  [Error] An unexpected error occurred writing {file_path}: {e}", file=sys.stderr)
+            card = json.loads(block.text)
+        except json.JSONDecodeError as e:
+            print(f"  [Error] Invalid JSON block in {block.source}: {e}", file=sys.stderr)
+            print(f"  > Block content: {block.text[:120]}...", file=sys.stderr)
+            invalid += 1
+            continue
+        errors = schema.validate(card)
+        if errors:
+            print(f"  [Validation Error] Card '{card.get('id', 'UNKNOWN')}' from {block.source} is invalid:",
+                  file=sys.stderr)
+            for error in errors:
+                print(f"    - {error}", file=sys.stderr)
+            invalid += 1
+            continue
+        changed.append((block, card))
 
-    print(f"  Successfully generated {generated_count} files.")
+    if invalid:
+        return len(changed) + invalid, 0, invalid
+
+    written = 0
+    defined = set(unchanged)
+    for block, card in changed:
+        card_id = card["id"]
+        if card_id in defined:
+            print(f"  [Warning] Card '{card_id}' is defined more than once; {block.source} wins.", file=sys.stderr)
+        defined.add(card_id)
+        path = output_path_for(card, base_output_path)
+        previous = manifest.cards.get(card_id)
+        if previous is not None and base_output_path / previous["path"] != path:
+            (base_output_path / previous["path"]).unlink(missing_ok=True)  # The card changed type
+        data = render_card(card)
+        if not path.exists() or path.read_bytes() != data:
+            write_atomic(path, data)
+            written += 1
+        manifest.record(card_id, card["type"], path, data, block)
+    for card_id, block in unchanged.items():
+        manifest.cards[card_id]["source"] = block.source  # Lines move when blocks above are edited
+
+    # Cards whose block was deleted from the source: their generated files go too
+    for card_id in [cid for cid, entry in manifest.cards.items() if "block" in entry and cid not in defined]:
+        stale = base_output_path / manifest.cards.pop(card_id)["path"]
+        if stale.exists():
+            stale.unlink()
+            print(f"  Removed {stale.relative_to(base_output_path)} (no longer defined in the source).")
+
+    index_other_cards(manifest, base_output_path, defined)
+    return len(changed), written, 0
 
 
 # --- 5. Main Execution ---
 
 def main():
     """Main function to orchestrate the card data generation process."""
-    print("--- Starting Card Data Generation (v3.0 - Hardened Linter) ---")
+    parser = argparse.ArgumentParser(description="Generate card JSON files from the Markdown card definitions.")
+    parser.add_argument('--force', action='store_true', help="Validate every block again, ignoring the manifest")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    print("--- Starting Card Data Generation (v3.1 - Incremental) ---")
 
     schema = CardSchema(DEFAULT_SCHEMA_PATH)
     if not schema.actions:
         print("\nCould not load schema definitions. Aborting.", file=sys.stderr)
         sys.exit(1)
 
-    all_parsed_cards = []
+    generator = content_hash(Path(__file__).read_text(encoding="utf-8") + "\n".join(sorted(schema.actions)))
+    manifest = Manifest(MANIFEST_PATH, generator)
+
+    blocks = []
     for file_path in INPUT_FILES:
         if not file_path.exists():
             print(f"\n[Warning] Input file not found, skipping: {file_path}", file=sys.stderr)
             continue
-        all_parsed_cards.extend(parse_markdown_file(file_path))
+        blocks.extend(parse_markdown_file(file_path))
 
-    if not all_parsed_cards:
+    if not blocks:
         print("\nNo card data found in any source file. Exiting.", file=sys.stderr)
         return
 
-    valid_cards = []
-    total_cards = len(all_parsed_cards)
-    print(f"\nFound {total_cards} card definitions. Validating against schema...")
-
-    for card_data, filename, line_num in all_parsed_cards:
-        card_id = card_data.get("id", "UNKNOWN")
-        errors = schema.validate(card_data)
-        if errors:
-            print(
-                f"  [Validation Error] Card '{card_id}' from {filename} (line {line_num}) is invalid:",
-                file=sys.stderr,
-            )
-            for error in errors:
-                print(f"    - {error}", file=sys.stderr)
-        else:
-            valid_cards.append(card_data)
-
-    print(f"  Validation complete. {len(valid_cards)} / {total_cards} cards are valid.")
+    print(f"\nFound {len(blocks)} card definitions. Validating changed blocks against schema...")
+    changed, written, invalid = generate_cards(blocks, schema, manifest, OUTPUT_DIR, force=args.force)
 
-    if len(valid_cards) < total_cards:
+    if invalid:
+        print(f"  Validation complete. {invalid} / {changed} changed cards are invalid.", file=sys.stderr)
         print("\nErrors were found. Halting file generation.", file=sys.stderr)
         sys.exit(1)
 
-    if valid_cards:
-        generate_card_files(valid_cards, OUTPUT_DIR)
-    else:
-        print("\nNo valid cards to generate.")
+    manifest_written = manifest.save()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"  {changed} changed block(s), {len(blocks) - changed} unchanged; {written} file(s) written.")
+    print(f"  Manifest {'updated' if manifest_written else 'unchanged'}: {MANIFEST_PATH} ({len(manifest.cards)} cards).")
 
-    print("\n--- Card Data Generation Complete ---")
+    print(f"\n--- Card Data Generation Complete ({elapsed_ms:.0f} ms) ---")
     print(f"Output directory: {OUTPUT_DIR}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
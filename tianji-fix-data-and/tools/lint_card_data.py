@@ -1,7 +1,24 @@
+import argparse
 import json
 import os
 import sys
-from typing import Any, Dict, List, Set
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Set, Tuple
+
+from card_index import walk_actions
+from card_source import CARD_DATA_DIR, MARKDOWN_SOURCES, ROOT_DIR, CardDocument, ParseCache, content_hash
+
+# 缓存：以文件内容哈希（及期望的卡牌 ID）为键保存检查结果；本脚本或其依赖的
+# card_index（动作遍历）、card_source（解析）改动后整体失效
+DEFAULT_CACHE_PATH = ROOT_DIR / ".cache" / "lint_cache.json"
+RULES_FINGERPRINT = content_hash("\0".join(
+    (Path(__file__).parent / name).read_text(encoding="utf-8")
+    for name in (Path(__file__).name, "card_index.py", "card_source.py")
+))
+# 待检查的文件少于此数时直接在本进程中检查，进程池的启动开销不划算
+POOL_THRESHOLD = 64
 
 # --- Schema Definition (based on card_logic_schema.md v3.1) ---
 
@@ -76,20 +93,24 @@ def lint_card(card_data: Dict[str, Any], card_id: str) -> List[str]:
     if card_data.get('id') != card_id:
         errors.append(f"Card ID in file '{card_id}' does not match 'id' field in JSON: '{card_data.get('id')}'")
 
-    # 5. Recursively validate effects and actions
-    # This is a simplified check. A full implementation would be more deeply nested.
+    # 5. Validate the shape of the effect objects
     if 'core_mechanism' in card_data and 'variants' in card_data['core_mechanism']:
         for variant, content in card_data['core_mechanism']['variants'].items():
             if 'effect' in content:
-                errors.extend(_validate_effect_object(content['effect'], f"core_mechanism.variants.{variant}"))
+                errors.extend(_validate_effect_object(content['effect'], f"core_mechanism.variants.{variant}.effect"))
 
     if 'effect' in card_data:
         errors.extend(_validate_effect_object(card_data['effect'], "effect"))
 
+    # 6. Validate every action, including those nested in options and delayed effects,
+    # using the same traversal as the card index
+    for ref in walk_actions(card_data, card_id):
+        errors.extend(_validate_action_object(ref.action, ref.path))
+
     return errors
 
 def _validate_effect_object(effect: Dict[str, Any], path: str) -> List[str]:
-    """Helper to validate an effect object."""
+    """Helper to validate the shape of an effect object; its actions are checked separately."""
     errors = []
     if not isinstance(effect, dict):
         return [f"Effect at '{path}' is not a valid object."]
@@ -99,7 +120,10 @@ def _validate_effect_object(effect: Dict[str, Any], path: str) -> List[str]:
             errors.append(f"'{path}.actions' must be a list.")
         else:
             for i, action in enumerate(effect['actions']):
-                errors.extend(_validate_action_object(action, f"{path}.actions[{i}]"))
+                if not isinstance(action, dict):
+                    errors.append(f"Action at '{path}.actions[{i}]' is not a valid object.")
+                elif 'action' not in action:
+                    errors.append(f"Action at '{path}.actions[{i}]' is missing the 'action' key.")
 
     if 'cost' in effect:
         if not isinstance(effect['cost'], list):
@@ -176,66 +200,202 @@ def _validate_action_object(action: Dict[str, Any], path: str) -> List[str]:
 
     return errors
 
+
+def lint_parsed(data: Any, expected_id: str | None, parse_error: str | None = None) -> List[str]:
+    """Lints one parsed card definition, including the top-level usage_limit semantics check."""
+    if parse_error:
+        return [f"Invalid JSON: {parse_error}"]
+    if not isinstance(data, dict):
+        return ["Card definition must be a JSON object."]
+
+    errors = lint_card(data, expected_id or data.get('id'))
+    if 'usage_limit' in data:
+        ul = data.get('usage_limit')
+        if not isinstance(ul, dict):
+            errors.append("Top-level 'usage_limit' must be an object with 'reset_timing'.")
+        elif not ul.get('reset_timing'):
+            errors.append("Top-level 'usage_limit' must include 'reset_timing' (e.g., end_of_turn).")
+    return errors
+
+
+def _lint_batch(items: List[Tuple[Any, str | None, str | None]]) -> List[List[str]]:
+    """Runs in a pool process."""
+    return [lint_parsed(*item) for item in items]
+
+
+class LintCache:
+    """Lint results keyed by document content hash, persisted as JSON between runs."""
+
+    MAX_ENTRIES = 4096
+
+    def __init__(self, path: Path | None):
+        self.path = path
+        self.results: Dict[str, List[str]] = {}
+        self.hits = 0
+        self.misses = 0
+        if path is not None and path.exists():
+            try:
+                stored = json.loads(path.read_text(encoding='utf-8'))
+                if stored.get('rules') == RULES_FINGERPRINT:
+                    self.results = stored.get('results', {})
+            except (json.JSONDecodeError, OSError):
+                pass  # A damaged cache is just a cold cache
+
+    @staticmethod
+    def key(doc: CardDocument) -> str:
+        # The id check depends on the file name, so identical text under another name is a different entry
+        return f"{doc.digest}:{doc.expected_id or ''}"
+
+    def lint(self, docs: List[CardDocument], workers: int = 0) -> Dict[str, List[str]]:
+        """Returns {doc.source: errors}, linting only documents whose content is not cached."""
+        missing = {}
+        for doc in docs:
+            key = self.key(doc)
+            if key in self.results:
+                self.hits += 1
+            else:
+                missing.setdefault(key, doc)
+        self.misses += len(missing)
+
+        if missing:
+            keys = list(missing)
+            items = [(missing[k].data, missing[k].expected_id, missing[k].error) for k in keys]
+            if workers > 1 and len(items) >= POOL_THRESHOLD:
+                size = -(-len(items) // (workers * 4))
+                batches = [items[i:i + size] for i in range(0, len(items), size)]
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    results = [errors for batch in pool.map(_lint_batch, batches) for errors in batch]
+            else:
+                results = _lint_batch(items)
+            self.results.update(zip(keys, results))
+        return {doc.source: self.results[self.key(doc)] for doc in docs}
+
+    def save(self, recent_docs: List[CardDocument]):
+        """Writes the cache atomically, dropping the least recently linted entries beyond MAX_ENTRIES."""
+        if self.path is None:
+            return
+        for key in dict.fromkeys(self.key(doc) for doc in recent_docs):
+            self.results[key] = self.results.pop(key)
+        for key in list(self.results)[:max(0, len(self.results) - self.MAX_ENTRIES)]:
+            del self.results[key]
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_suffix('.tmp')
+        temp_path.write_text(json.dumps({'rules': RULES_FINGERPRINT, 'results': self.results}), encoding='utf-8')
+        temp_path.replace(self.path)
+
+
+def print_results(docs: List[CardDocument], results: Dict[str, List[str]], verbose: bool = True) -> int:
+    """Prints per-document results and returns the number of errors."""
+    total_errors = 0
+    for doc in docs:
+        errors = results[doc.source]
+        if errors:
+            print(f"\n--- Errors found in {doc.source}:")
+            for error in errors:
+                print(f"  - {error}")
+            total_errors += len(errors)
+        elif verbose:
+            print(f"\n--- {doc.source}: OK")
+    return total_errors
+
+
+def watch(paths: List[Path], cache: LintCache, interval: float, analyze: bool):
+    """Relints files as they change until interrupted."""
+    analyzer_cls = None
+    if analyze:
+        from analyze_card_balance import BalanceAnalyzer
+        analyzer_cls = BalanceAnalyzer
+
+    parse_cache = ParseCache()
+    docs, _ = parse_cache.refresh(paths)
+    results = cache.lint(docs)
+    # Source -> cache key of the version last reported (or loaded at startup)
+    shown = {doc.source: cache.key(doc) for doc in docs}
+    print(f"Watching {len(docs)} card definition(s); {sum(map(len, results.values()))} error(s). Ctrl-C to stop.")
+    try:
+        while True:
+            time.sleep(interval)
+            started = time.perf_counter()
+            changed, removed = parse_cache.refresh(paths)
+            if not changed and not removed:
+                continue
+            for path in removed:
+                for source in [source for source in shown if source == str(path) or source.startswith(f"{path}:")]:
+                    del shown[source]
+            # A Markdown source reparses as a whole; report the blocks that differ from what was last shown,
+            # including edits reverted to a version whose result is still cached
+            fresh = [doc for doc in changed if shown.get(doc.source) != cache.key(doc)]
+            if not fresh and not removed:
+                continue
+            results = cache.lint(changed)
+            shown.update((doc.source, cache.key(doc)) for doc in fresh)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            stamp = time.strftime('%H:%M:%S')
+            errors = print_results(fresh, results, verbose=True)
+            for path in removed:
+                print(f"\n--- {path}: removed")
+            if analyzer_cls is not None:
+                for doc in fresh:
+                    if not results[doc.source] and isinstance(doc.data, dict):
+                        analyzer = analyzer_cls()
+                        analyzer.analyze_card(doc.data)
+                        totals = analyzer.metrics["per_card"][doc.card_id]
+                        print(f"    static: gold {totals['gold']:+d}, health {totals['health']:+d}, "
+                              f"damage {totals['damage']}, actions {analyzer.metrics['total_actions']}")
+            print(f"[{stamp}] relinted {len(fresh)} changed definition(s) in {elapsed_ms:.1f} ms, {errors} error(s).")
+            cache.save(parse_cache.all_documents())
+    except KeyboardInterrupt:
+        cache.save(parse_cache.all_documents())
+        print("\nStopped watching.")
+
+
 def main():
     """
     Main execution function.
-    Lints a specific file or all files in the assets/data/cards directory.
+    Lints specific files (card JSON or Markdown sources) or all files in the
+    assets/data/cards directory, reusing cached results for unchanged content.
     """
-    if len(sys.argv) > 1:
-        filepath = sys.argv[1]
-        if not os.path.exists(filepath):
-            print(f"Error: File not found at '{filepath}'")
+    parser = argparse.ArgumentParser(description="Lint card data against the card logic schema.")
+    parser.add_argument('paths', nargs='*', help="Card files, directories or Markdown sources (default: all card files)")
+    parser.add_argument('--source', action='store_true', help="Also lint the json blocks of hexagram_interpretations.md")
+    parser.add_argument('--watch', action='store_true', help="Keep running and relint files as they change")
+    parser.add_argument('--interval', type=float, default=0.2, help="Polling interval in seconds for --watch")
+    parser.add_argument('--analyze', action='store_true', help="With --watch, print static balance totals of changed cards")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--cache', type=str, default=str(DEFAULT_CACHE_PATH))
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('-q', '--quiet', action='store_true', help="Only print files with errors")
+    args = parser.parse_args()
+
+    paths = [Path(p) for p in args.paths]
+    for path in paths:
+        if not path.exists():
+            print(f"Error: File not found at '{path}'")
             sys.exit(1)
-        files_to_lint = [filepath]
-    else:
-        print("No specific file provided. Searching for all card data files...")
-        base_path = 'assets/data/cards'
-        if not os.path.exists(base_path):
-            print(f"Error: Directory '{base_path}' not found. Run generate_card_data.py first.")
+    if not paths:
+        if not CARD_DATA_DIR.exists():
+            print(f"Error: Directory '{CARD_DATA_DIR}' not found. Run generate_card_data.py first.")
             sys.exit(1)
-
-        files_to_lint = []
-        for root, _, files in os.walk(base_path):
-            for file in files:
-                if file.endswith('.json'):
-                    files_to_lint.append(os.path.join(root, file))
-
-    print(f"Found {len(files_to_lint)} JSON file(s) to lint.")
-    total_errors = 0
-
-    for filepath in files_to_lint:
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-
-            card_id = os.path.splitext(os.path.basename(filepath))[0]
-            errors = lint_card(data, card_id)
-
-            # Top-level usage_limit semantics check
-            if 'usage_limit' in data:
-                ul = data.get('usage_limit')
-                if not isinstance(ul, dict):
-                    errors.append(f"Top-level 'usage_limit' in {filepath} must be an object with 'reset_timing'.")
-                else:
-                    if not ul.get('reset_timing'):
-                        errors.append(f"Top-level 'usage_limit' in {filepath} must include 'reset_timing' (e.g., end_of_turn).")
-
-            if errors:
-                print(f"\n--- Errors found in {filepath}:")
-                for error in errors:
-                    print(f"  - {error}")
-                total_errors += len(errors)
-            else:
-                print(f"\n--- {filepath}: OK")
-
-        except json.JSONDecodeError as e:
-            print(f"\n--- Error decoding JSON in {filepath}:")
-            print(f"  - {e}")
-            total_errors += 1
-        except Exception as e:
-            print(f"\n--- An unexpected error occurred with {filepath}:")
-            print(f"  - {e}")
-            total_errors += 1
+        paths = [CARD_DATA_DIR]
+        # 监视模式下默认同时监视 Markdown 源文件，编辑卡牌时即时反馈
+        if args.watch:
+            paths += MARKDOWN_SOURCES
+    if args.source:
+        paths += MARKDOWN_SOURCES
+
+    cache = LintCache(None if args.no_cache else Path(args.cache))
+    if args.watch:
+        watch(paths, cache, args.interval, args.analyze)
+        return
+
+    started = time.perf_counter()
+    docs, _ = ParseCache().refresh(paths)
+    print(f"Found {len(docs)} card definition(s) to lint.")
+    results = cache.lint(docs, args.workers)
+    total_errors = print_results(docs, results, verbose=not args.quiet)
+    cache.save(docs)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"\n{cache.misses} checked, {cache.hits} cached, {elapsed_ms:.1f} ms.")
 
     if total_errors > 0:
         print(f"\nLinting complete. Found a total of {total_errors} error(s).")
@@ -245,4 +405,4 @@ def main():
         sys.exit(0)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()